@@ -1,15 +1,36 @@
-import requests
 import yaml
 import os
 import sys
 import argparse
 from dotenv import load_dotenv
 
+# share the Lambda's Discord client (keep-alive session + rate limit handling)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "app"))
+from utils.discord_client import DiscordClient
+from utils.command_registration import sync_commands, sync_guilds, DEFAULT_CONCURRENCY
+from routes import router
+
+def read_guild_ids(args):
+    guild_ids = list(args.guild or [])
+    if args.guilds_file:
+        with open(args.guilds_file, "r") as file:
+            guild_ids += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    # keep the order, drop duplicates
+    return list(dict.fromkeys(guild_ids))
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Register Discord commands for Alpha or Prod environment')
     parser.add_argument('environment', choices=['alpha', 'prod'], 
                        help='Environment to register commands for (alpha or prod)')
+    parser.add_argument('--guild', action='append',
+                       help='Register guild scoped commands in this guild instead of global ones (repeatable)')
+    parser.add_argument('--guilds-file',
+                       help='File with one guild id per line, registered like --guild')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                       help=f'Guilds registered at once (default {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Only show what would change')
     
     args = parser.parse_args()
     
@@ -36,8 +57,6 @@ def main():
             print("Error: PROD_DISCORD_APPLICATION_ID not found in environment variables")
             sys.exit(1)
     
-    URL = f"https://discord.com/api/v9/applications/{APPLICATION_ID}/commands"
-    
     print(f"Registering commands for {args.environment.upper()} environment...")
     print(f"Using Application ID: {APPLICATION_ID}")
     
@@ -47,13 +66,37 @@ def main():
     
     # turn it into python object
     commands = yaml.safe_load(yaml_content)
-    headers = {"Authorization": f"Bot {TOKEN}", "Content-Type": "application/json"}
-    
-    # Send the POST request for each command
-    for command in commands:
-        response = requests.post(URL, json=command, headers=headers)
-        command_name = command["name"]
-        print(f"Command {command_name} created: {response.status_code}")
+
+    # don't register commands the bot can't answer
+    problems = router.check_commands(commands)
+    if problems:
+        for problem in problems:
+            print(f"Error: {problem}")
+        sys.exit(1)
+
+    guild_ids = read_guild_ids(args)
+    # one pooled connection per concurrent guild
+    discord = DiscordClient(TOKEN, pool_size=max(args.concurrency, 1))
+
+    # read what is registered and overwrite it in one PUT, only when something changed
+    if guild_ids:
+        results = sync_guilds(discord, APPLICATION_ID, commands, guild_ids, dry_run=args.dry_run, concurrency=args.concurrency)
+    else:
+        results = [sync_commands(discord, APPLICATION_ID, commands, dry_run=args.dry_run)]
+
+    for result in results:
+        if result.error:
+            print(f"{result.scope}: failed: {result.error}")
+        elif result.applied:
+            print(f"{result.scope}: updated {result.diff.describe()}")
+        else:
+            print(f"{result.scope}: {'would update ' if result.diff.changed else ''}{result.diff.describe()}")
+
+    failed = sum(1 for result in results if result.error)
+    applied = sum(1 for result in results if result.applied)
+    print(f"{len(results)} registration(s): {applied} updated, {len(results) - applied - failed} unchanged, {failed} failed")
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
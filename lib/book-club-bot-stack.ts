@@ -2,6 +2,7 @@ import * as cdk from 'aws-cdk-lib';
 import { Construct } from 'constructs';
 import * as lambda from "aws-cdk-lib/aws-lambda";
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
+import * as iam from 'aws-cdk-lib/aws-iam';
 
 export interface BookClubBotStackProps extends cdk.StackProps {
   stage: string;
@@ -24,12 +25,20 @@ export class BookClubBotStack extends cdk.Stack {
         timeout: cdk.Duration.seconds(10),
         architecture: lambda.Architecture.X86_64,
         environment: {
+          STAGE: props.stage,
           DISCORD_PUBLIC_KEY: props.discordPublicKey,
           DISCORD_TOKEN: props.discordToken,
         },
       }
     );
 
+    // Deferred interaction stages re-invoke this function asynchronously.
+    // The ARN is built from the stack name to avoid a circular dependency on the function itself.
+    dockerFunction.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['lambda:InvokeFunction'],
+      resources: [`arn:aws:lambda:${this.region}:${this.account}:function:${this.stackName}-*`],
+    }));
+
     const functionUrl = dockerFunction.addFunctionUrl({
       authType: lambda.FunctionUrlAuthType.NONE,
       cors: {
@@ -40,15 +49,20 @@ export class BookClubBotStack extends cdk.Stack {
     });
 
     // DynamoDB Book table that stores all the books read
-    // Create the table: one partition key (guild) + one sort key (ISO date)
+    // Create the table: one partition key (guild) + one sort key (ISO date the book was finished)
+    // @NOTE replaces the old guild-only BookClubHistory table, which kept one row per guild
+    // (it is retained, not deleted, when this stack updates; scripts/migrate_history.py copies its rows over)
     const historyTable = new dynamodb.Table(
       this,
-      `${props.stage}BookHistory`, 
+      `${props.stage}ReadingHistory`,
       {
-      tableName: `${props.stage}-BookClubHistory`,
+      tableName: `${props.stage}-BookClubReadingHistory`,
       partitionKey: { 
         name: 'guild_id', type: dynamodb.AttributeType.STRING 
       },
+      sortKey: {
+        name: 'finished_at', type: dynamodb.AttributeType.STRING
+      },
       billingMode:  dynamodb.BillingMode.PAY_PER_REQUEST,  // on-demand
       removalPolicy: cdk.RemovalPolicy.RETAIN,             // keep data if stack is destroyed
       }
@@ -93,6 +107,24 @@ export class BookClubBotStack extends cdk.Stack {
     cacheTable.grantReadWriteData(dockerFunction);
     dockerFunction.addEnvironment('CACHE_TABLE', cacheTable.tableName);
 
+    // DynamoDB Guild settings table (e.g. admin_role_id), read together with the
+    // current book and cached search list in one BatchGetItem
+    const guildSettingsTable = new dynamodb.Table(
+      this,
+      `${props.stage}GuildSettings`,
+      {
+        tableName: `${props.stage}-BookClubGuildSettings`,
+        partitionKey: {
+          name: 'guild_id',
+          type: dynamodb.AttributeType.STRING
+        },
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+        removalPolicy: cdk.RemovalPolicy.RETAIN,
+      }
+    );
+    guildSettingsTable.grantReadWriteData(dockerFunction);
+    dockerFunction.addEnvironment('GUILD_SETTINGS_TABLE', guildSettingsTable.tableName);
+
     // Cloudformation output
     new cdk.CfnOutput(this, `${props.stage}FunctionUrl`, {
       value: functionUrl.url,
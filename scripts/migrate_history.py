@@ -0,0 +1,78 @@
+"""
+One-off copy of the old BookClubHistory table (one row per guild, keyed by
+guild_id only) into BookClubReadingHistory (guild_id + finished_at), which /history
+and /search autocomplete read since the reading history change.
+
+The old rows never recorded when the book was finished, so finished_at is taken
+from the book's discussion date (or, failing that, when it was set). Rows already
+copied are skipped, so the script can be re-run safely.
+
+Usage (AWS credentials for the stack's account):
+    python scripts/migrate_history.py alpha [--dry-run]
+    python scripts/migrate_history.py prod
+"""
+import argparse
+from datetime import datetime, timezone
+import boto3
+
+TABLES = {
+    "alpha": ("Alpha-BookClubHistory", "Alpha-BookClubReadingHistory"),
+    "prod": ("Prod-BookClubHistory", "Prod-BookClubReadingHistory"),
+}
+
+
+def finished_at(item):
+    """
+    Sort key for an old history row: its discussion date (MM-DD-YYYY) as an ISO
+    timestamp, else the ISO timestamp of when the book was set.
+    """
+    try:
+        return datetime.strptime(str(item["discussion_date"]), "%m-%d-%Y").replace(tzinfo=timezone.utc).isoformat()
+    except (KeyError, ValueError):
+        return item.get("timestamp") or datetime(1970, 1, 1, tzinfo=timezone.utc).isoformat()
+
+
+def old_rows(table):
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy the old per-guild history table into the reading history table')
+    parser.add_argument('environment', choices=['alpha', 'prod'],
+                       help='Environment to migrate (alpha or prod)')
+    parser.add_argument('--region', default='us-east-2',
+                       help='AWS region of the stack (default us-east-2)')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Only show what would be copied')
+    args = parser.parse_args()
+
+    old_name, new_name = TABLES[args.environment]
+    dynamodb = boto3.resource("dynamodb", region_name=args.region)
+    old_table, new_table = dynamodb.Table(old_name), dynamodb.Table(new_name)
+    print(f"Copying {old_name} into {new_name}...")
+
+    copied = skipped = 0
+    for item in old_rows(old_table):
+        item = {**item, "finished_at": item.get("finished_at") or finished_at(item)}
+        if args.dry_run:
+            print(f"would copy {item['guild_id']}: {item.get('title', 'Unknown Title')} ({item['finished_at']})")
+            copied += 1
+            continue
+        try:
+            new_table.put_item(Item=item, ConditionExpression="attribute_not_exists(finished_at)")
+            copied += 1
+        except new_table.meta.client.exceptions.ConditionalCheckFailedException:
+            skipped += 1
+
+    print(f"Copied {copied} book(s), {skipped} already present.")
+    print(f"Once the copy is verified, {old_name} can be deleted.")
+
+
+if __name__ == "__main__":
+    main()
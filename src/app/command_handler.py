@@ -1,250 +1,189 @@
-from flask import json, jsonify
-import requests
-from config import GOOGLE_BOOKS_API_URL, IN_DEVELOPMENT, DICTIONARY_API_URL
-from utils.aws.dynamodb import get_current_book, cache_book_list, get_cached_book_list
-from utils.utils import random_greeting, make_hello_payload
-from utils.huggingface.textgeneration import query as hf_query
+from config import IN_DEVELOPMENT, STAGE
+from utils.utils import random_greeting
+from utils.huggingface.greeting_pool import GreetingPool
+from utils.search_results import find_books, save_search_results
+from utils.google_books import GoogleBooksError
+from utils.autocomplete import learn_books, suggest
+from utils.concurrency import run_concurrently
+from utils.dictionary import lookup_definition
+from utils.telemetry import annotate
+from helper_functions import history_page, search_page
 
+greeting_pool = GreetingPool(STAGE)
 
-def command_handler(raw_request):
-    """
-    Handles incoming Discord slash command interactions (type 1).
+# Slash command handlers (type 2 interactions), registered in routes.py.
+# Each takes the Interaction and returns a JSON-serializable interaction response.
 
-    Args:
-        raw_request (dict): The raw interaction payload from Discord.
 
-    Returns:
-        dict: A JSON-serializable response conforming to Discord's interaction response format.
-    """
-    # vars needed for each command
-    data = raw_request["data"]
-    command_name = raw_request["data"]["name"]
-    user_id = raw_request["member"]["user"]["id"]
-    guild_id = raw_request.get("guild_id")
-
-     # Hello Command
-    if command_name == "hello":
-        res = hf_query(make_hello_payload())  # Call to HF API (not used in response)
-        clean_response = res.rstrip('\n')
-        message_content = f"{clean_response} <@{user_id}>!"
-
-    elif command_name == "echo":
-        original_message = data["options"][0]["value"]
-        message_content = f"Echoing: {original_message}"
-    
-    elif command_name == "define":
-        define_word = data["options"][0]["value"]
-        URL = f"{DICTIONARY_API_URL}{define_word}"
-        response = requests.get(url=URL)
-
-        # Check if response is OK and JSON is valid
-        if not response.ok:
-            message_content = f"❌ Could not find definitions for **{define_word}**"
-            return jsonify({
-                "type": 4,
-                "data": {"content": message_content}
-            })
-
-        data = response.json()
-        if not data or not isinstance(data, list) or "meanings" not in data[0]:
-            message_content = f"❌ Could not find definitions for **{define_word}**"
-            return jsonify({
-                "type": 4,
-                "data": {"content": message_content}
-            })
-
-        # Organize definitions
-        definitions_by_pos = {}
-        for meaning in data[0]["meanings"]:
-            pos = meaning.get("partOfSpeech", "Unknown").capitalize()
-            definitions = [entry.get("definition", "") for entry in meaning.get("definitions", [])]
-            definitions_by_pos.setdefault(pos, []).extend(definitions)
-
-        # Optional: limit definitions per part of speech
-        max_defs_per_pos = 3
-        for pos in definitions_by_pos:
-            definitions_by_pos[pos] = definitions_by_pos[pos][:max_defs_per_pos]
-
-        # Convert to embed fields
-        fields = []
-        for part_of_speech, definitions in definitions_by_pos.items():
-            value = "\n".join([f"{idx + 1}. {definition}" for idx, definition in enumerate(definitions)])
-            fields.append({
-                "name": part_of_speech,
-                "value": value if value else "*No definitions available.*",
-                "inline": False
-            })
-
-        embed = {
-            "title": f"Definitions for _{define_word}_",
-            "fields": fields,
-            "color": 0x5865F2  # Discord blurple
+def message(content):
+    return {
+        "type": 4,
+        "data": {"content": content},
+    }
+
+
+# Hello Command
+def hello(interaction):
+    # pre-generated LLM greeting, refilled in the background when running low
+    greeting = greeting_pool.take() or random_greeting()
+    annotate(greeting_pool_depth=greeting_pool.depth())
+    return message(f"{greeting} <@{interaction.user_id}>!")
+
+
+def echo(interaction):
+    original_message = interaction.data["options"][0]["value"]
+    return message(f"Echoing: {original_message}")
+
+
+def define(interaction):
+    define_word = interaction.data["options"][0]["value"]
+    # embed fields are cached, including words that have no definitions
+    fields = lookup_definition(define_word)
+
+    if not fields:
+        return message(f"❌ Could not find definitions for **{define_word}**")
+
+    embed = {
+        "title": f"Definitions for _{define_word}_",
+        "fields": fields,
+        "color": 0x5865F2  # Discord blurple
+    }
+
+    return {
+        "type": 4,
+        "data": {
+            "embeds": [embed],
+            # "flags": 64  # Optional: make ephemeral
         }
+    }
 
-        return jsonify({
+
+def current(interaction):
+    book = interaction.state.current_book
+    # 1️⃣ Nothing in DynamoDB yet
+    if not book:
+        return {
             "type": 4,
             "data": {
-                "embeds": [embed],
-                # "flags": 64  # Optional: make ephemeral
+                "content": "📚 No current book has been set for this server. Use `/search` to pick one!",
+                "flags": 64        # Ephemeral
             }
-        })
-
-    elif command_name == "current":
-        book = get_current_book(guild_id)
-        # 1️⃣ Nothing in DynamoDB yet
-        if not book:
-            return jsonify({
-                "type": 4,
-                "data": {
-                    "content": "📚 No current book has been set for this server. Use `/search` to pick one!",
-                    "flags": 64        # Ephemeral
-                }
-            })
-
-        # 2️⃣ Pull the fields we stored
-        title            = book.get("title", "Unknown Title")
-        authors          = book.get("authors", "Unknown Author")
-        isbn             = book.get("isbn", "N/A")
-        discussion_date  = book.get("discussion_date", "TBD")
-        discussion_time  = book.get("discussion_time", "TBD")
-        pages            = book.get("set_page_or_chapter", "—")
-
-        # Optional: if you stored a cover URL in DynamoDB
-        thumbnail_url    = book.get("thumbnail")      # may be None
-        embed = {
-            "title": title,
-            "description": f"Author: {authors}\n"
-                        f"ISBN: {isbn}\n"
-                        f"Discussion Date: {discussion_date}\n"
-                        f"Discussion Time: {discussion_time}\n"
-                        f"Pages / chapter: {pages}",
-        }
-        if thumbnail_url:
-            embed["thumbnail"] = {"url": thumbnail_url}
-
-        # ─── action‑row with two buttons ────────────────────────
-        button_row = {
-            "type": 1,           # ACTION_ROW
-            "components": [
-                {
-                    "type": 2,             # BUTTON
-                    "label": "Reschedule",
-                    "style": 1,            # Primary
-                    "custom_id": "reschedule_book"
-                },
-                {
-                    "type": 2,
-                    "label": "Finish",
-                    "style": 1,
-                    "custom_id": "finish_book"
-                },
-                {
-                    "type": 2,
-                    "label": "Delete",
-                    "style": 4,
-                    "custom_id": "delete_book"
-                }
-            ]
         }
 
-        return jsonify({
-            "type": 4,  # CHANNEL_MESSAGE_WITH_SOURCE
-            "data": {
-                "embeds": [embed],          # rich message with book info
-                "components": [button_row]  # action row with buttons
-            }
-        })
-
-        
-    elif command_name == "search":
-        # building a dictionary to obtain search values (ex: key=Title: value=Book Title, key=Author: Value: Author)
-        query_options = {opt["name"]: opt["value"] for opt in data.get("options", [])}
-
-        # if no queries are present, then return an error
-        if not any(k in query_options for k in ["title", "author", "publisher", "isbn"]):
-            return jsonify({
-                "type": 4,
-                "data": {
-                    "content": "❗Please provide at least one search option (e.g. Title, Author, Publisher, or ISBN)."
-                }
-            })
-
-        # Construct query params based on whats provided to search
-        query_params = []
-
-        if "title" in query_options:
-            query_params.append(f"intitle:{query_options['title']}")
-        if "author" in query_options:
-            query_params.append(f"inauthor:{query_options['author']}")
-        if "publisher" in query_options:
-            query_params.append(f"inpublisher:{query_options['publisher']}")
-        if "isbn" in query_options:
-            query_params.append(f"isbn:{query_options['isbn']}")
-
-        # Final Query Response to send to URL
-        final_query = "+".join(query_params)
-
-        response = requests.get(GOOGLE_BOOKS_API_URL, params={
-            "q": final_query,
-            "maxResults": 5,
-        })
-
-        books = response.json().get("items", [])
-
-        if not books:
-            fields = [f"{k.capitalize()}: {v}" for k, v in query_options.items()]
-            query_str = ", ".join(fields)
-            message_content = f"No books found for {query_str}."
-        else:
-            # cache the book list to use later
-            # current_books_list[guild_id] = books  # save for button click handler
-            cache_book_list(guild_id=guild_id, book_list=books, ttl=60)
-            
-            embeds = []
-            for idx, book in enumerate(books[:5]):
-                info = book["volumeInfo"]
-                title = info.get("title", "No Title")
-                authors = ", ".join(info.get("authors", ["Unknown Author"]))
-                isbn = next((i["identifier"] for i in info.get("industryIdentifiers", []) if i["type"] == "ISBN_13"), "N/A")
-                preview = info.get("previewLink", None)
-                thumbnail = info.get("imageLinks", {}).get("thumbnail", None)
-                description = info.get("description", "")
-                short_desc = (description[:150] + "...") if len(description) > 150 else description
-
-                embed = {
-                    "title": f"{idx+1}) {title}",
-                    "description": f"By: {authors}\nISBN: {isbn}",
-                    "url": preview,
-                }
-                if thumbnail:
-                    embed["thumbnail"] = {"url": thumbnail}
-                embeds.append(embed)
-
-            buttons = [{
+    # 2️⃣ Pull the fields we stored
+    title            = book.get("title", "Unknown Title")
+    authors          = book.get("authors", "Unknown Author")
+    isbn             = book.get("isbn", "N/A")
+    discussion_date  = book.get("discussion_date", "TBD")
+    discussion_time  = book.get("discussion_time", "TBD")
+    pages            = book.get("set_page_or_chapter", "—")
+
+    # Optional: if you stored a cover URL in DynamoDB
+    thumbnail_url    = book.get("thumbnail")      # may be None
+    embed = {
+        "title": title,
+        "description": f"Author: {authors}\n"
+                    f"ISBN: {isbn}\n"
+                    f"Discussion Date: {discussion_date}\n"
+                    f"Discussion Time: {discussion_time}\n"
+                    f"Pages / chapter: {pages}",
+    }
+    if thumbnail_url:
+        embed["thumbnail"] = {"url": thumbnail_url}
+
+    # ─── action‑row with two buttons ────────────────────────
+    button_row = {
+        "type": 1,           # ACTION_ROW
+        "components": [
+            {
+                "type": 2,             # BUTTON
+                "label": "Reschedule",
+                "style": 1,            # Primary
+                "custom_id": "reschedule_book"
+            },
+            {
                 "type": 2,
-                "label": str(i+1),
+                "label": "Finish",
                 "style": 1,
-                "custom_id": f"select_book_{i}"
-            } for i in range(len(books[:5]))]
-
-            return jsonify({
-                "type": 4,
-                "data": {
-                    "embeds": embeds,
-                    "components": [{
-                        "type": 1,  # Action Row
-                        "components": buttons
-                    }],
-                }
-            })
-
-            
-    else:
-        message_content = "Unknown command."
-    
-    return jsonify({
+                "custom_id": "finish_book"
+            },
+            {
+                "type": 2,
+                "label": "Delete",
+                "style": 4,
+                "custom_id": "delete_book"
+            }
+        ]
+    }
+
+    return {
+        "type": 4,  # CHANNEL_MESSAGE_WITH_SOURCE
+        "data": {
+            "embeds": [embed],          # rich message with book info
+            "components": [button_row]  # action row with buttons
+        }
+    }
+
+
+def history(interaction):
+    return {
         "type": 4,
-        "data": {"content": message_content},
+        "data": history_page(interaction.guild_id)
+    }
+
+
+def search(interaction):
+    # building a dictionary to obtain search values (ex: key=Title: value=Book Title, key=Author: Value: Author)
+    query_options = {opt["name"]: opt["value"] for opt in interaction.data.get("options", [])}
+
+    # if no queries are present, then return an error
+    if not any(k in query_options for k in ["title", "author", "publisher", "isbn"]):
+        return message("❗Please provide at least one search option (e.g. Title, Author, Publisher, or ISBN).")
+
+    # every match in the local catalog of books seen before, otherwise one Google Books
+    # call for the first 40 results (served from the shared search cache when the
+    # same query was run recently); Prev/Next page through them
+    try:
+        books, source = find_books(query_options)
+    except GoogleBooksError as e:
+        print(f"Failed to search Google Books: {e}")
+        return message("❌ Google Books couldn't complete this search. Please try again in a minute.")
+    annotate(search_source=source)
+
+    if not books:
+        fields = [f"{k.capitalize()}: {v}" for k, v in query_options.items()]
+        query_str = ", ".join(fields)
+        return message(f"No books found for {query_str}.")
+
+    # results are kept per message; its buttons carry the token they are stored under
+    token = interaction.id
+    # the titles and authors found also feed the guild's /search autocomplete
+    outcome = run_concurrently({
+        "results": lambda: save_search_results(token, query_options, books, source=source),
+        "autocomplete": lambda: learn_books(interaction.guild_id, books),
     })
+    if not outcome.ok("autocomplete"):
+        print(f"Failed to update autocomplete index: {outcome.status('autocomplete')}")
+    if not outcome.ok("results"):
+        raise outcome.errors["results"]
+    results = outcome.results["results"]
+
+    return {
+        "type": 4,
+        "data": search_page(token, results, page=0)
+    }
 
 
+def search_autocomplete(interaction):
+    """
+    Suggestions for the /search option being typed (title or author), from the
+    guild's own searches and history and a seed list. Discord only waits 3 seconds
+    for them, so Google Books is never asked.
+    """
+    focused = next((opt for opt in interaction.data.get("options", []) if opt.get("focused")), None)
+    choices = suggest(interaction.guild_id, focused["name"], str(focused.get("value", ""))) if focused else []
+    annotate(autocomplete_field=focused and focused["name"], choices=len(choices))
+    return {
+        "type": 8,  # APPLICATION_COMMAND_AUTOCOMPLETE_RESULT
+        "data": {"choices": choices}
+    }
@@ -1,8 +1,12 @@
 import os
 
 # vars
+STAGE = os.environ.get("STAGE", "local")
 DISCORD_PUBLIC_KEY = os.environ.get("DISCORD_PUBLIC_KEY")
 GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
 DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
 
-IN_DEVELOPMENT = "Feature currently under development. 🔧"
\ No newline at end of file
+IN_DEVELOPMENT = "Feature currently under development. 🔧"
+
+# answer modal submits with a deferred ACK and finish the side effects in the background
+DEFERRED_RESPONSES = os.environ.get("DEFERRED_RESPONSES", "true").lower() == "true"
@@ -1,35 +1,94 @@
-from flask import jsonify
-from utils.utils import is_valid_future_date, is_valid_time_string, make_announcement_payload
-from utils.aws.dynamodb import delete_current_book, put_book, get_current_book, get_cached_book_list, update_discussion_date_current_book, finish_current_book
-from utils.discord_actions import create_event_announcement, create_discussion_thread, create_guild_event, update_guild_event, delete_guild_event
+from utils.utils import is_valid_future_date, is_valid_time_string, get_ordinal
+from utils.aws.dynamodb import delete_current_book, put_book, set_current_book_event, update_discussion_date_current_book, finish_current_book, record_interaction_steps, item_version, LifecycleStatus, get_reading_history, get_search_results
+from utils.discord_actions import create_event_announcement, create_discussion_thread, create_guild_event, update_guild_event, delete_guild_event, edit_original_response
+from utils.deferred import dispatch_deferred, deferred_stage
+from utils.concurrency import run_concurrently
+from utils.interaction_state import interaction_state, state_key
+from utils.search_results import selected_search_result, extend_search_results, needs_prefetch, find_books, save_search_results, SEARCH_PAGE_SIZE
+from utils.catalog import remember_volumes, remember_book
+from utils.autocomplete import learn_finished_book
+from utils.google_books import GoogleBooksError
+from config import DEFERRED_RESPONSES
 import pytz
 from datetime import datetime, time as dt_time
 eastern = pytz.timezone('America/New_York')
 
 
-def handle_book_select(raw_request, pending_selections, reschedule: bool):
+# ROUTES (registered in routes.py)
+def select_book(interaction):
+    # read the search message's results in the same BatchGetItem as the current book
+    interaction.state.include_search_results(interaction.params["token"])
+    return handle_book_select(interaction.raw, interaction.state, reschedule=False, selected_idx=interaction.params["index"], search_token=interaction.params["token"])
+
+def reschedule_book(interaction):
+    return handle_book_select(interaction.raw, interaction.state, reschedule=True)
+
+def schedule_select(interaction):
+    reschedule = interaction.params["mode"] == "reschedule"
+    # the select_book interaction that stored the selection
+    origin = interaction.params["origin"]
+    # ACK within Discord's 3 second window and finish the side effects in the background
+    if DEFERRED_RESPONSES:
+        return defer_schedule_select(interaction.raw, interaction.state, reschedule=reschedule, origin=origin)
+    return handle_schedule_select(interaction.raw, interaction.state, reschedule=reschedule, origin=origin)
+
+def finish_book(interaction):
+    return handle_finish_book(interaction.guild_id, interaction.user_id, interaction.role_ids, interaction.state, interaction_id=interaction.id)
+
+def confirm_book_delete(interaction):
+    return handle_confirm_book_delete(interaction.guild_id, interaction.user_id, interaction.role_ids, interaction.state)
+
+def book_delete(interaction):
+    # the confirmation buttons are only valid in the guild that showed them
+    if interaction.params["guild_id"] != interaction.guild_id or interaction.params["answer"] not in ("yes", "no"):
+        return None
+    return handle_book_delete(interaction.guild_id, interaction.user_id, interaction.role_ids, interaction.state, confirmation=interaction.params["answer"] == "yes")
+
+def history_page_button(interaction):
+    return {
+        "type": 7,  # UPDATE_MESSAGE
+        "data": history_page(interaction.guild_id, interaction.params["cursor"] or None)
+    }
+
+def search_page_button(interaction):
+    return handle_search_page(interaction.state, interaction.params["token"], interaction.params["page"])
+
+def search_online_button(interaction):
+    return handle_search_online(interaction.state, interaction.params["token"])
+
+
+
+def handle_book_select(raw_request, state, reschedule: bool, selected_idx: int = None, search_token: str = None):
     guild_id = raw_request.get("guild_id")
-    curr_book = get_current_book(guild_id)
+    # current book and cached search list come from one BatchGetItem
+    curr_book = state.current_book
     # do a check to make sure there isnt a current book already
     if curr_book and not reschedule:
-        return jsonify({
+        return {
             "type": 4,
             "data": {
                 "content": "📚 A current book has been set for this server! Please use /current to see it!",
                 "flags": 64  # Ephemeral
             }
-        })
+        }
     
     curr_book_title = None
     if not reschedule:
         user_id = raw_request["member"]["user"]["id"]
-        custom_id = raw_request["data"]["custom_id"]
-
-        selected_idx = int(custom_id.split("_")[-1])
-        current_books_list = get_cached_book_list(guild_id=guild_id)
-        selected_book = current_books_list[selected_idx]
+        selected_book = selected_search_result(state, search_token, selected_idx)
+        if not selected_book:
+            return {
+                "type": 4,
+                "data": {
+                    "content": "⌛ These search results have expired. Please run /search again.",
+                    "flags": 64  # Ephemeral
+                }
+            }
 
-        pending_selections.setdefault(guild_id, {})[user_id] = selected_book
+        # the modal submit may land on another container, so the selection goes to the
+        # shared store under this interaction's id, which the modal's custom_id carries
+        interaction_state.put(state_key(guild_id, user_id, raw_request["id"]), selected_book)
+        remember_volumes([selected_book])
         curr_book_title = selected_book['volumeInfo']['title']
     else:
         curr_book_title = curr_book.get("title", "Unknown Title")
@@ -41,7 +100,7 @@ def handle_book_select(raw_request, pending_selections, reschedule: bool):
     display_title = curr_book_title[:allowed_book_len] + ("..." if len(curr_book_title) > allowed_book_len else "")
 
     modal = {
-        "custom_id": f"select_schedule_{'reschedule' if reschedule else 'new'}",
+        "custom_id": f"select_schedule_{'reschedule' if reschedule else 'new'}_{raw_request['id']}",
         "title": f"{prefix}{display_title}",
         "components": [
             {
@@ -94,12 +153,36 @@ def handle_book_select(raw_request, pending_selections, reschedule: bool):
         ]
     }
 
-    return jsonify({
+    return {
         "type": 9,
         "data": modal
-    })
+    }
 
-def handle_schedule_select(raw_request, pending_selections, reschedule):
+# Compose description with pages/chapters and EST time
+def make_event_description(title, pages_or_chapters):
+    desc = f"Discussion for {title}."
+    if pages_or_chapters:
+        desc += f" Reading: {pages_or_chapters}."
+    return desc
+
+def discussion_datetimes(discussion_date, discussion_time):
+    """
+    Combine date and time, convert to EST and UTC ISO8601 for the Discord event.
+    Returns (dt_est, start_time_iso).
+    """
+    dt = datetime.strptime(f"{discussion_date} {discussion_time}", "%m-%d-%Y %I:%M %p")
+    dt_est = eastern.localize(dt)
+    dt_utc = dt_est.astimezone(pytz.utc)
+    return dt_est, dt_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def prepare_schedule_select(raw_request, state, reschedule, origin):
+    """
+    Parses and validates the schedule modal and resolves the selected book, which
+    handle_book_select stored under the id of the `origin` interaction.
+
+    Returns (error_response, None) when the submission can't be scheduled, otherwise
+    (None, job) where job is a JSON-serializable dict consumed by run_schedule_select.
+    """
     user_id = raw_request["member"]["user"]["id"]
     guild_id = raw_request.get("guild_id")
     discussion_date = None
@@ -126,165 +209,252 @@ def handle_schedule_select(raw_request, pending_selections, reschedule):
         errors.append("❌ Please enter a valid time in HH:MM AM/PM format (e.g., 07:00 PM).")
 
     if errors:
-        return jsonify({
+        return {
             "type": 4,
             "data": {
                 "content": "\n".join(errors),
                 "flags": 64
             }
-        })
-
-    # Compose description with pages/chapters and EST time
-    def make_event_description(title, pages_or_chapters):
-        desc = f"Discussion for {title}."
-        if pages_or_chapters:
-            desc += f" Reading: {pages_or_chapters}."
-        return desc
-
-    # Convert discussion_date to EST and UTC for Discord event
-    # Combine date and time, convert to EST and UTC ISO8601
-    dt = datetime.strptime(f"{discussion_date} {discussion_time}", "%m-%d-%Y %I:%M %p")
-    dt_est = eastern.localize(dt)
-    dt_utc = dt_est.astimezone(pytz.utc)
-    start_time_iso = dt_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
-
+        }, None
+
+    job = {
+        "guild_id": guild_id,
+        "user_id": user_id,
+        "discussion_date": discussion_date,
+        "discussion_time": discussion_time,
+        "pages_or_chapters": pages_or_chapters,
+        "reschedule": reschedule,
+        "selected_book": None,
+        "current_book": None,
+    }
     if reschedule:
-        curr_book = get_current_book(guild_id)
-        discord_event_id = curr_book.get("discord_event_id")
-        event_updated = False
-        new_event_id = None
+        # resolved here so the (possibly deferred) side effects don't read it again
+        curr_book = state.current_book
+        if not curr_book:
+            return {
+                "type": 4,
+                "data": {
+                    "content": "❗ No current book found to reschedule.",
+                    "flags": 64
+                }
+            }, None
+        job["current_book"] = {
+            "title": curr_book.get("title", "Book"),
+            "discord_event_id": curr_book.get("discord_event_id"),
+            "version": item_version(curr_book),
+        }
+        return None, job
 
-        if discord_event_id:
+    # Retrieve and remove the selected book in one round trip
+    selected_book = interaction_state.take(state_key(guild_id, user_id, origin))
+
+    if not selected_book:
+        return {
+            "type": 4,
+            "data": {
+                "content": "❗ No book selected to save. Please try again.",
+                "flags": 64
+            }
+        }, None
+
+    job["selected_book"] = selected_book
+    return None, job
+
+def run_schedule_select(job, steps):
+    """
+    Performs the side effects of a schedule/reschedule submission (Discord event,
+    DynamoDB, megathread, announcement) and returns the message content to show.
+
+    DynamoDB is written first, conditionally, so a submission whose book was
+    finished, deleted or changed in the meantime posts nothing. The Discord event,
+    megathread and announcement don't depend on each other, so they then run
+    concurrently; a new event id is linked to the book once it is known.
+    Each step's outcome is written into `steps` ("ok" or the error message).
+    """
+    guild_id = job["guild_id"]
+    user_id = job["user_id"]
+    discussion_date = job["discussion_date"]
+    discussion_time = job["discussion_time"]
+    pages_or_chapters = job["pages_or_chapters"]
+    dt_est, start_time_iso = discussion_datetimes(discussion_date, discussion_time)
+
+    if job["reschedule"]:
+        curr_book = job["current_book"]
+        curr_title = curr_book["title"]
+        discord_event_id = curr_book["discord_event_id"]
+        event_desc = make_event_description(curr_title, pages_or_chapters)
+
+        result = update_discussion_date_current_book(
+            guild_id,
+            discussion_date,
+            discussion_time,
+            pages_or_chapters,
+            expected_version=curr_book["version"]
+        )
+        steps["database"] = result.status.value
+        if result.status is LifecycleStatus.NOT_FOUND:
+            return "❗ No current book found to reschedule."
+        if result.status is LifecycleStatus.CONFLICT:
+            return "⚠️ The current book changed while rescheduling it. Please check /current and try again."
+
+        def reschedule_event():
+            if not discord_event_id:
+                return None
             try:
-                curr_title = curr_book.get('title', 'Book')
-                curr_pages = pages_or_chapters
                 update_guild_event(
                     guild_id,
                     discord_event_id,
                     scheduled_start_time=start_time_iso,
-                    description=make_event_description(curr_title, curr_pages)
+                    description=event_desc
                 )
-                event_updated = True
+                return discord_event_id
             except Exception as e:
                 print(f"Failed to update Discord event: {e}")
                 # If the error is a 404 (event not found), create a new event
-                if "404" in str(e):
-                    try:
-                        event_desc = make_event_description(curr_title, curr_pages)
-                        event = create_guild_event(
-                            guild_id,
-                            name=f"Book Club: {curr_title}", 
-                            description=event_desc,
-                            start_time=start_time_iso
-                        )
-                        new_event_id = event.get("id")
-                        print(f"Created new Discord event with ID: {new_event_id}")
-                    except Exception as ce:
-                        print(f"Failed to create new Discord event: {ce}")
-
-        # Update DynamoDB with the new event ID if created, otherwise use the old one if updated
-        final_event_id = new_event_id if new_event_id else (discord_event_id if event_updated else None)
-        response = update_discussion_date_current_book(
-            guild_id,
-            discussion_date,
-            discussion_time,
-            curr_pages,
-            discord_event_id=final_event_id
-        )
-        try:
-            create_discussion_thread(
+                if "404" not in str(e):
+                    raise
+                event = create_guild_event(
+                    guild_id,
+                    name=f"Book Club: {curr_title}",
+                    description=event_desc,
+                    start_time=start_time_iso
+                )
+                print(f"Created new Discord event with ID: {event.get('id')}")
+                return event.get("id")
+
+        outcome = run_concurrently({
+            "discord_event": reschedule_event,
+            "discussion_thread": lambda: create_discussion_thread(
                 guild_id,
-                thread_name=f"Discussion: {make_event_description(curr_title, curr_pages)} ({discussion_date})",
-                book_title=curr_book.get('title', 'Book'),
+                thread_name=f"Discussion: {event_desc} ({discussion_date})",
+                book_title=curr_title,
                 dt=dt_est,
-                section=curr_pages
-            )
-        except Exception as e:
-            print(f"Failed to create discussion thread: {e}")
-
-        try:
-            payload = make_announcement_payload("FOLLOW_UP", curr_title, curr_pages, dt_est, discussion_time)
-            create_event_announcement(guild_id, payload)
-        except Exception as e:
-            print(f"Failed to create announcement: {e}")
-
-        return jsonify({
-            "type": 4,
-            "data": {
-                "content": f"✅ {response.get('title', 'Unknown Title')} has been rescheduled from {response.get('discussion_date', 'TBD')} to {discussion_date} and from {response.get('set_page_or_chapter', 'TBD')} to {curr_pages}!"
-            }
-        })
-    
-    # Retrieve the selected book from pending selections
-    selected_book = pending_selections.get(guild_id, {}).get(user_id)
-
-    if not selected_book:
-        return jsonify({
-            "type": 4,
-            "data": {
-                "content": "❗ No book selected to save. Please try again.",
-                "flags": 64
-            }
+                section=pages_or_chapters
+            ),
+            "announcement": lambda: create_event_announcement(
+                guild_id, "FOLLOW_UP", curr_title, section=pages_or_chapters, dt=dt_est, time_str=discussion_time
+            ),
         })
-
-    # Create Discord event for the new meeting
-    event_id = None
-    try:
-        event_desc = make_event_description(selected_book['volumeInfo']['title'], pages_or_chapters)
-        event = create_guild_event(
+        for name, error in outcome.errors.items():
+            print(f"Failed to run {name}: {error}")
+        steps.update({name: outcome.status(name) for name in ("discord_event", "discussion_thread", "announcement")})
+
+        # the event is recreated when the old one was deleted in Discord
+        event_id = outcome.results.get("discord_event")
+        if event_id and event_id != discord_event_id:
+            link_current_book_event(guild_id, event_id, item_version(result.book) + 1, steps)
+
+        response = result.book
+        return f"✅ {response.get('title', 'Unknown Title')} has been rescheduled from {response.get('discussion_date', 'TBD')} to {discussion_date} and from {response.get('set_page_or_chapter', 'TBD')} to {pages_or_chapters}!"
+
+    selected_book = job["selected_book"]
+    title = selected_book['volumeInfo']['title']
+    event_desc = make_event_description(title, pages_or_chapters)
+
+    # claim the current book slot first, so an overlapping submission that loses
+    # doesn't post a second event, thread and announcement
+    result = put_book(guild_id, user_id, selected_book, discussion_date, discussion_time, pages_or_chapters)
+    steps["database"] = result.status.value
+    if result.status is LifecycleStatus.CONFLICT:
+        return "📚 A current book has been set for this server! Please use /current to see it!"
+
+    outcome = run_concurrently({
+        # Create Discord event for the new meeting
+        "discord_event": lambda: create_guild_event(
             guild_id,
-            name=f"Book Club: {selected_book['volumeInfo']['title']}",
+            name=f"Book Club: {title}",
             description=event_desc,
             start_time=start_time_iso
-        )
-        event_id = event.get("id")
-    except Exception as e:
-        print(f"Failed to create Discord event: {e}")
-
-    # Save to DynamoDB (with event ID if available)
-    put_book(guild_id, user_id, selected_book, discussion_date, discussion_time, pages_or_chapters, discord_event_id=event_id)
-
-    # Clean up pending selection
-    pending_selections[guild_id].pop(user_id, None)
-    if not pending_selections[guild_id]:  # Optional cleanup
-        del pending_selections[guild_id]
-    
-    try:
-        create_discussion_thread(
+        ),
+        "discussion_thread": lambda: create_discussion_thread(
             guild_id,
-            thread_name=f"Discussion: {make_event_description(selected_book['volumeInfo']['title'], pages_or_chapters)} ({discussion_date})",
-            book_title=selected_book['volumeInfo']['title'],
+            thread_name=f"Discussion: {event_desc} ({discussion_date})",
+            book_title=title,
             dt=dt_est,
             section=pages_or_chapters
-        )
-        # Optionally, store thread_id in DynamoDB
-    except Exception as e:
-        print(f"Failed to create discussion thread: {e}")
-    try:
-        payload = make_announcement_payload("FIRST", selected_book['volumeInfo']['title'], pages_or_chapters, discussion_date, discussion_time)
-        create_event_announcement(guild_id, payload)
-    except Exception as e:
-        print(f"Failed to create announcement: {e}")
-    
-    return jsonify({
+        ),
+        "announcement": lambda: create_event_announcement(
+            guild_id, "FIRST", title, section=pages_or_chapters, dt=dt_est, time_str=discussion_time
+        ),
+    })
+    for name, error in outcome.errors.items():
+        print(f"Failed to run {name}: {error}")
+    steps.update({name: outcome.status(name) for name in ("discord_event", "discussion_thread", "announcement")})
+
+    event_id = (outcome.results.get("discord_event") or {}).get("id")
+    if event_id:
+        link_current_book_event(guild_id, event_id, result.book["version"], steps)
+
+    return f"✅ Book '{title}' scheduled for discussion on {discussion_date}!"
+
+
+def link_current_book_event(guild_id, event_id, version, steps):
+    """
+    Records the Discord event of the current book written by this submission
+    (at `version`), unless the book has changed since.
+    """
+    linked = set_current_book_event(guild_id, event_id, expected_version=version)
+    steps["event_link"] = linked.status.value
+    if not linked.ok:
+        print(f"Current book changed before Discord event {event_id} could be recorded")
+
+def handle_schedule_select(raw_request, state, reschedule, origin):
+    error_response, job = prepare_schedule_select(raw_request, state, reschedule, origin)
+    if error_response:
+        return error_response
+
+    content = run_schedule_select(job, steps={})
+    return {
         "type": 4,
         "data": {
-            "content": f"✅ Book '{selected_book['volumeInfo']['title']}' scheduled for discussion on {discussion_date}!"
+            "content": content
         }
+    }
+
+def defer_schedule_select(raw_request, state, reschedule, origin):
+    """
+    Deferred variant of handle_schedule_select: validates the modal inline, then hands
+    the side effects to the background "schedule_select" stage and ACKs with type 5.
+    The stage edits the original response once it is done.
+    """
+    error_response, job = prepare_schedule_select(raw_request, state, reschedule, origin)
+    if error_response:
+        return error_response
+
+    dispatch_deferred("schedule_select", {
+        "job": job,
+        "application_id": raw_request["application_id"],
+        "interaction_id": raw_request["id"],
+        "token": raw_request["token"],
     })
+    return {"type": 5}  # DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE
+
+@deferred_stage("schedule_select")
+def complete_schedule_select(payload):
+    steps = {}
+    try:
+        content = run_schedule_select(payload["job"], steps)
+    except Exception as e:
+        print(f"Failed to schedule book: {e}")
+        content = "❗ Something went wrong while scheduling the book. Please try again."
+    try:
+        record_interaction_steps(payload["interaction_id"], steps)
+    except Exception as e:
+        print(f"Failed to record interaction steps: {e}")
+    edit_original_response(payload["application_id"], payload["token"], content)
 
 
-def handle_confirm_book_delete(guild_id, user_id, role_ids):
-    if not any(role_id == '1393651462558449815' for role_id in role_ids):
-        return jsonify({
+def handle_confirm_book_delete(guild_id, user_id, role_ids, state):
+    if not state.is_admin(role_ids):
+        return {
             "type": 4,
             "data": {
                 "content": f"❌ Sorry <@{user_id}>, You don't have permission to delete the current book.",
                 "flags": 64  # Ephemeral
             }
-        })
+        }
 
-    return jsonify({
+    return {
         "type": 4,
         "data": {
             "content": "⚠️ Are you sure you want to delete the current book?",
@@ -309,69 +479,313 @@ def handle_confirm_book_delete(guild_id, user_id, role_ids):
                 }
             ]
         }
-    })
+    }
 
-def handle_book_delete(guild_id, user_id, role_ids, confirmation):
+def handle_book_delete(guild_id, user_id, role_ids, state, confirmation):
 
-    if not any(role_id == '1393651462558449815' for role_id in role_ids):
-        return jsonify({
+    if not state.is_admin(role_ids):
+        return {
             "type": 4,
             "data": {
                 "content": f"❌ Sorry <@{user_id}>, You don't have permission to delete the current book.",
                 "flags": 64  # Ephemeral
             }
-        })
+        }
     # If confirmation is True, proceed with deletion
     if confirmation:
-        responseDeleteDDB = delete_current_book(guild_id)
-        responseDeleteEvent = delete_guild_event(guild_id, responseDeleteDDB.get("discord_event_id", ""))  # Delete Discord event if it exists
-        if not responseDeleteDDB:
-            return jsonify({
+        # conditional on the version the permission check read, so a concurrent reschedule isn't lost
+        result = delete_current_book(guild_id, expected_version=item_version(state.current_book))
+        if result.status is LifecycleStatus.NOT_FOUND:
+            return {
                 "type": 4,
                 "data": {
                     "content": "❗ No current book found to delete.",
                     "flags": 64  # Ephemeral
                 }
-            })
-        return jsonify({
+            }
+        if result.status is LifecycleStatus.CONFLICT:
+            return {
+                "type": 4,
+                "data": {
+                    "content": "⚠️ The current book changed while deleting it. Please check /current and try again.",
+                    "flags": 64  # Ephemeral
+                }
+            }
+
+        # Delete Discord event if it exists; the book is already gone, so don't fail the reply
+        discord_event_id = result.book.get("discord_event_id")
+        if discord_event_id:
+            try:
+                delete_guild_event(guild_id, discord_event_id)
+            except Exception as e:
+                print(f"Failed to delete Discord event: {e}")
+
+        return {
             "type": 4,
             "data": {
-                "content": f"✅ Book {responseDeleteDDB['title']} by {responseDeleteDDB['authors']} has been removed from current reading!",
+                "content": f"✅ Book {result.book['title']} by {result.book['authors']} has been removed from current reading!",
             }
-        })
+        }
     else:
-        return jsonify({
+        return {
             "type": 4,
             "data": {
                 "content": f"❌ Cancelled deletion of the current book.",
                 "flags": 64  # Ephemeral
             }
-        })
+        }
 
 
-def handle_finish_book(guild_id, user_id, role_ids):
-    if not any(role_id == '1393651462558449815' for role_id in role_ids):
-        return jsonify({
+def handle_finish_book(guild_id, user_id, role_ids, state, interaction_id=None):
+    if not state.is_admin(role_ids):
+        return {
             "type": 4,
             "data": {
                 "content": f"❌ Sorry <@{user_id}>, You don't have permission to finish the current book.",
                 "flags": 64  # Ephemeral
             }
-        })
+        }
 
-    response = finish_current_book(guild_id)
-    if not response:
-        return jsonify({
+    # the permission check already loaded the current book, don't read it again;
+    # the interaction id makes Discord's retries of the same click idempotent
+    result = finish_current_book(guild_id, current_book=state.current_book, request_token=interaction_id)
+    if result.status is LifecycleStatus.NOT_FOUND:
+        return {
             "type": 4,
             "data": {
                 "content": "❗ No current book found to finish.",
                 "flags": 64  # Ephemeral
             }
-        })
-    return jsonify({
+        }
+    if result.status is LifecycleStatus.CONFLICT:
+        return {
+            "type": 4,
+            "data": {
+                "content": "⚠️ The current book changed while finishing it. Please check /current and try again.",
+                "flags": 64  # Ephemeral
+            }
+        }
+    remember_book(result.book)
+    try:
+        learn_finished_book(guild_id, result.book)
+    except Exception as e:
+        print(f"Failed to update autocomplete index: {e}")
+    return {
         "type": 4,
         "data": {
-            "content": f"✅ Book {response['title']} by {response['authors']} has been finished! Congratulations! 🎉",
+            "content": f"✅ Book {result.book['title']} by {result.book['authors']} has been finished! Congratulations! 🎉",
         }
-    })
+    }
+
+
+
+def search_page(token, results, page):
+    """
+    Builds one page of a /search message from its stored results: the books as
+    embeds, a select button per book and Prev/Next buttons. Button numbers and
+    select_book indexes count across pages.
+    """
+    books = results["books"]
+    start = page * SEARCH_PAGE_SIZE
+    shown = books[start:start + SEARCH_PAGE_SIZE]
+
+    embeds = []
+    for idx, book in enumerate(shown, start=start):
+        info = book["volumeInfo"]
+        title = info.get("title", "No Title")
+        authors = ", ".join(info.get("authors", ["Unknown Author"]))
+        isbn = next((i["identifier"] for i in info.get("industryIdentifiers", []) if i["type"] == "ISBN_13"), "N/A")
+        preview = info.get("previewLink", None)
+        thumbnail = info.get("imageLinks", {}).get("thumbnail", None)
+
+        embed = {
+            "title": f"{idx+1}) {title}",
+            "description": f"By: {authors}\nISBN: {isbn}",
+            "url": preview,
+        }
+        if thumbnail:
+            embed["thumbnail"] = {"url": thumbnail}
+        embeds.append(embed)
+
+    buttons = [{
+        "type": 2,
+        "label": str(idx+1),
+        "style": 1,
+        "custom_id": f"select_book_{token}_{idx}"
+    } for idx in range(start, start + len(shown))]
+    components = [{
+        "type": 1,  # Action Row
+        "components": buttons
+    }]
+
+    navigation = []
+    has_next = start + SEARCH_PAGE_SIZE < len(books) or not results["exhausted"]
+    if page > 0 or has_next:
+        navigation += [
+            {
+                "type": 2,
+                "label": "Prev",
+                "style": 2,
+                "custom_id": f"search_page_{token}_{max(page - 1, 0)}",
+                "disabled": page == 0
+            },
+            {
+                "type": 2,
+                "label": "Next",
+                "style": 2,
+                "custom_id": f"search_page_{token}_{page + 1}",
+                "disabled": not has_next
+            }
+        ]
+    # results from the local catalog only hold books seen before
+    if results.get("source") == "catalog":
+        navigation.append({
+            "type": 2,
+            "label": "Search Google Books",
+            "style": 2,
+            "custom_id": f"search_online_{token}"
+        })
+    if navigation:
+        components.append({
+            "type": 1,
+            "components": navigation
+        })
+
+    return {
+        "embeds": embeds,
+        "components": components,
+    }
+
+def handle_search_page(state, token, page):
+    """
+    Prev/Next on a /search message: re-renders from the stored results without
+    calling Google Books, unless the prefetch of the next Google page hasn't landed yet.
+    """
+    state.include_search_results(token)
+    results = state.search_results
+    if not results:
+        return {
+            "type": 4,
+            "data": {
+                "content": "⌛ These search results have expired. Please run /search again.",
+                "flags": 64  # Ephemeral
+            }
+        }
+
+    if page * SEARCH_PAGE_SIZE >= len(results["books"]) and not results["exhausted"]:
+        try:
+            results = extend_search_results(token, results)
+        except GoogleBooksError as e:
+            # stay on the pages already loaded; the next click tries again
+            print(f"Failed to load more search results {token}: {e}")
+    last_page = max(len(results["books"]) - 1, 0) // SEARCH_PAGE_SIZE
+    page = min(max(page, 0), last_page)
+
+    if needs_prefetch(results, page):
+        prefetch_search_page(token, results)
+    return {
+        "type": 7,  # UPDATE_MESSAGE
+        "data": search_page(token, results, page)
+    }
+
+def handle_search_online(state, token):
+    """
+    "Search Google Books" on a /search message answered from the local catalog:
+    runs the same search against Google Books and shows those results instead.
+    """
+    state.include_search_results(token)
+    results = state.search_results
+    if not results:
+        return {
+            "type": 4,
+            "data": {
+                "content": "⌛ These search results have expired. Please run /search again.",
+                "flags": 64  # Ephemeral
+            }
+        }
+
+    try:
+        books, source = find_books(results["query"], online=True)
+    except GoogleBooksError as e:
+        print(f"Failed to search Google Books: {e}")
+        return {
+            "type": 4,
+            "data": {
+                "content": "❌ Google Books couldn't complete this search. Please try again in a minute.",
+                "flags": 64  # Ephemeral
+            }
+        }
+    if not books:
+        return {
+            "type": 4,
+            "data": {
+                "content": "Google Books didn't find anything else for this search.",
+                "flags": 64  # Ephemeral
+            }
+        }
+    results = save_search_results(token, results["query"], books, source=source)
+    return {
+        "type": 7,  # UPDATE_MESSAGE
+        "data": search_page(token, results, page=0)
+    }
+
+def prefetch_search_page(token, results):
+    # the start index tells the stage whether another prefetch already got there
+    try:
+        dispatch_deferred("search_prefetch", {"token": token, "start_index": len(results["books"])})
+    except Exception as e:
+        print(f"Failed to prefetch search results {token}: {e}")
+
+@deferred_stage("search_prefetch")
+def complete_search_prefetch(payload):
+    results = get_search_results(payload["token"])
+    if not results or results["exhausted"] or len(results["books"]) != payload["start_index"]:
+        return
+    extend_search_results(payload["token"], results)
+
 
+HISTORY_PAGE_SIZE = 5
+
+def history_page(guild_id, cursor=None):
+    """
+    Builds the /history message for one page of finished books (newest first).
+    The cursor for the next page travels in the "Older" button's custom_id.
+    """
+    books, next_cursor = get_reading_history(guild_id, limit=HISTORY_PAGE_SIZE, cursor=cursor)
+
+    if not books and not cursor:
+        return {
+            "content": "📚 This server hasn't finished any books yet. Use `/search` to pick one!",
+            "flags": 64  # Ephemeral
+        }
+
+    lines = []
+    for book in books:
+        finished = datetime.fromisoformat(book["finished_at"]).astimezone(eastern)
+        lines.append(f"**{book.get('title', 'Unknown Title')}** by {book.get('authors', 'Unknown Author')} · finished {finished.strftime('%B')} {get_ordinal(finished.day)} {finished.year}")
+
+    buttons = []
+    if cursor:
+        buttons.append({
+            "type": 2,
+            "label": "Newest",
+            "style": 2,
+            "custom_id": "history_page_"
+        })
+    if next_cursor:
+        buttons.append({
+            "type": 2,
+            "label": "Older",
+            "style": 1,
+            "custom_id": f"history_page_{next_cursor}"
+        })
+
+    data = {
+        "embeds": [{
+            "title": "📚 Reading History",
+            "description": "\n".join(lines) if lines else "No older books.",
+            "color": 0x5865F2  # Discord blurple
+        }],
+        "components": [{"type": 1, "components": buttons}] if buttons else [],
+    }
+    return data
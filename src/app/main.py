@@ -1,76 +1,115 @@
-from flask import Flask, jsonify, request
-from mangum import Mangum
-from asgiref.wsgi import WsgiToAsgi
-from discord_interactions import verify_key_decorator
-from helper_functions import handle_book_delete, handle_book_select, handle_schedule_select, handle_confirm_book_delete, handle_finish_book
-from command_handler import command_handler
-from config import DISCORD_PUBLIC_KEY, IN_DEVELOPMENT
-
-# @TODO: Convert this to use redis instead
-# pending selections
-pending_selections = {}
-# storing the current books being looked at
-current_books_list = {}
-
-# flask set up
-app = Flask(__name__)
-asgi_app = WsgiToAsgi(app)
-handler = Mangum(asgi_app, lifespan="off")
-
-# post request method
-@app.route("/", methods=["POST"])
-async def interactions():
-    print(f"👉 Request: {request.json}")
-    raw_request = request.json
-    return interact(raw_request)
+import base64
+import json
+from config import DISCORD_PUBLIC_KEY
+from utils.deferred import is_deferred_event, run_deferred_event
+from utils.aws.guild_state import GuildState
+from utils.telemetry import interaction_span, interaction_name
+from utils.verification import InteractionVerifier
+from utils.deadline import lambda_deadline
+from utils.router import Interaction
+from utils.circuit_breaker import DependencyUnavailable
+from routes import router, unknown_interaction, unavailable_reply
+
+# public key decoded once per container
+verifier = InteractionVerifier(DISCORD_PUBLIC_KEY)
+
+
+def verify_request(raw_body, signature, timestamp):
+    """
+    Checks Discord's Ed25519 signature over timestamp + raw request body, rejecting
+    stale timestamps and replayed signatures first (see utils.verification).
+    """
+    return verifier.verify(raw_body, signature, timestamp).ok
+
+def proxy_response(status_code, body):
+    """
+    Lambda proxy (function url) response with a JSON body
+    """
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(body),
+    }
+
+# lambda entry point
+def handler(event, context):
+    """
+    Takes the function url event directly: verifies the signature, dispatches to
+    interact and returns a Lambda proxy response (no Flask / ASGI adapters).
+    Outbound calls are bounded by the invocation's remaining time.
+    """
+    with lambda_deadline(context):
+        return _handle(event)
+
+def _handle(event):
+    # background stages dispatched by utils.deferred (not reachable through the function url)
+    if is_deferred_event(event):
+        import helper_functions  # registers the deferred stages
+        return run_deferred_event(event)
+
+    raw_body = event.get("body") or ""
+    raw_body = base64.b64decode(raw_body) if event.get("isBase64Encoded") else raw_body.encode("utf-8")
+    # function url headers are lowercased
+    headers = event.get("headers") or {}
+    if not verify_request(raw_body, headers.get("x-signature-ed25519"), headers.get("x-signature-timestamp")):
+        return proxy_response(401, {"error": "Bad request signature"})
+
+    return proxy_response(200, interact(json.loads(raw_body)))
+
+# flask set up (local development only, the lambda uses handler)
+def create_app():
+    from flask import Flask, abort, request
+    from routes import check_command_definitions
+
+    for problem in check_command_definitions():
+        print(f"⚠️ {problem}")
+
+    app = Flask(__name__)
+
+    # post request method
+    @app.route("/", methods=["POST"])
+    def interactions():
+        raw_body = request.get_data()
+        if not verify_request(raw_body, request.headers.get("X-Signature-Ed25519"), request.headers.get("X-Signature-Timestamp")):
+            abort(401, "Bad request signature")
+        return interact(request.json)
+
+    return app
 
 # command handler
-@verify_key_decorator(DISCORD_PUBLIC_KEY)
-def interact(raw_request):    
-    # @NOTE data vars from raw request that are needed
-    data = raw_request["data"]
-    request_type = raw_request["type"]
-    user_id = raw_request["member"]["user"]["id"]
-    role_ids = raw_request["member"]["roles"]
-    guild_id = raw_request.get("guild_id")
-    
+def interact(raw_request):
+    """
+    Dispatches a verified interaction payload and returns the response as a dict,
+    inside a span that times the interaction and every outbound call it makes
+    (emitted as CloudWatch EMF lines, see utils.telemetry).
+    """
+    with interaction_span(
+        interaction_name(raw_request),
+        interaction_id=raw_request.get("id"),
+        interaction_type=raw_request.get("type"),
+        guild_id=raw_request.get("guild_id"),
+    ) as span:
+        response = dispatch(raw_request)
+        span.properties["response_type"] = response.get("type")
+        return response
 
+def dispatch(raw_request):
     # ping request == 1
-    if request_type == 1:  # PING
-        return jsonify({"type": 1})  # PONG
-
-    # button request == 3
-    if request_type == 3:
-        custom_id = raw_request["data"]["custom_id"]
-        # select book method
-        if custom_id.startswith("select_book_"):
-            return handle_book_select(raw_request, pending_selections, reschedule=False)
-        elif custom_id == "finish_book":
-            return handle_finish_book(guild_id, user_id, role_ids)
-        elif custom_id == "reschedule_book":
-            return handle_book_select(raw_request, pending_selections, reschedule=True)
-        elif custom_id == "delete_book":
-            return handle_confirm_book_delete(guild_id, user_id, role_ids)
-        elif custom_id == f"delete_confirm_no_{guild_id}":
-            return handle_book_delete(guild_id, user_id, role_ids, confirmation=False)
-        elif custom_id == f"delete_confirm_yes_{guild_id}":
-            return handle_book_delete(guild_id, user_id, role_ids, confirmation=True)
-        # default
-        return jsonify({"type": 4, "data": {"content": "Unknown interaction"}})
-        
-    # modal request == 5
-    if request_type == 5:
-        custom_id = raw_request["data"]["custom_id"]
-
-        if custom_id.endswith("_reschedule"):
-            return handle_schedule_select(raw_request, pending_selections, reschedule=True)
-        else:
-            return handle_schedule_select(raw_request, pending_selections, reschedule=False)
-
-    
-    # handle the / commands (i.e. /hello, /echo, etc...)
-    return command_handler(raw_request)
+    if raw_request["type"] == 1:  # PING
+        return {"type": 1}  # PONG
+
+    # DynamoDB rows for this guild, batch-loaded on first use and shared by the handlers
+    interaction = Interaction(raw_request, state=GuildState(raw_request.get("guild_id")))
+    # commands, buttons and modals are declared in routes.py
+    try:
+        response = router.dispatch(interaction)
+    except DependencyUnavailable as e:
+        # fail fast instead of waiting on a dependency that is known to be down
+        return unavailable_reply(e)
+    if response is None:
+        return unknown_interaction(interaction)
+    return response
 
 # Main Method
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
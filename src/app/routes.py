@@ -0,0 +1,74 @@
+import os
+from utils.router import Router
+
+# only present in a checkout (local development, command registration, tests)
+COMMAND_DEFINITIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "commands", "discord_commands.yaml")
+
+# Every interaction the bot answers. Handlers are "module:function" strings imported
+# on first use, so a PING doesn't load boto3, requests or pytz.
+router = Router()
+
+# slash commands, checked against commands/discord_commands.yaml
+router.command("hello", "command_handler:hello")
+router.command("echo", "command_handler:echo")
+router.command("define", "command_handler:define")
+router.command("current", "command_handler:current")
+router.command("history", "command_handler:history")
+router.command("search", "command_handler:search")
+
+# autocomplete for command options
+router.autocomplete("search", "command_handler:search_autocomplete")
+
+# buttons
+router.component("select_book_{token}_{index:int}", "helper_functions:select_book")
+router.component("reschedule_book", "helper_functions:reschedule_book")
+router.component("finish_book", "helper_functions:finish_book")
+router.component("delete_book", "helper_functions:confirm_book_delete")
+router.component("delete_confirm_{answer}_{guild_id}", "helper_functions:book_delete")
+router.component("history_page_{cursor}", "helper_functions:history_page_button")
+router.component("search_page_{token}_{page:int}", "helper_functions:search_page_button")
+router.component("search_online_{token}", "helper_functions:search_online_button")
+
+# modals
+router.modal("select_schedule_{mode}_{origin}", "helper_functions:schedule_select")
+
+
+def check_command_definitions(path=COMMAND_DEFINITIONS):
+    """
+    Mismatches between the command routes and the commands registered with Discord.
+    """
+    import yaml # type: ignore
+    with open(path, "r") as file:
+        return router.check_commands(yaml.safe_load(file))
+
+
+# names used in replies when a dependency's circuit breaker is open
+DEPENDENCY_NAMES = {
+    "google_books": "Google Books",
+    "dictionary": "The dictionary",
+    "discord": "Discord",
+    "huggingface": "The text generator",
+}
+
+
+def unavailable_reply(error):
+    """
+    Ephemeral reply for an interaction that needed a dependency whose circuit
+    breaker is open (utils.circuit_breaker.DependencyUnavailable).
+    """
+    name = DEPENDENCY_NAMES.get(error.dependency, error.dependency)
+    return {
+        "type": 4,
+        "data": {
+            "content": f"⚠️ {name} is having trouble right now. Please try again in a minute.",
+            "flags": 64  # Ephemeral
+        }
+    }
+
+
+def unknown_interaction(interaction):
+    if interaction.type == 4:
+        return {"type": 8, "data": {"choices": []}}
+    if interaction.type == 2:
+        return {"type": 4, "data": {"content": "Unknown command."}}
+    return {"type": 4, "data": {"content": "Unknown interaction"}}
@@ -0,0 +1,366 @@
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left
+from utils.cache import TieredCache, MISSING
+
+# the fields of /search that have autocomplete, and the index each one reads
+FIELDS = ("title", "author")
+# Discord shows at most 25 choices, each name and value at most 100 characters
+MAX_CHOICES = 25
+MAX_CHOICE_LENGTH = 100
+# names kept per field of a guild's index; the least used are dropped first
+AUTOCOMPLETE_MAX_NAMES = int(os.environ.get("AUTOCOMPLETE_MAX_NAMES", 2000))
+# entries looked at per lookup before ranking, so a one-letter prefix stays cheap
+MAX_SCANNED = 400
+# a name also matches from its later words ("rings" finds The Lord of the Rings),
+# up to this many words in
+MAX_WORD_STARTS = 8
+# finished books start out ranked above books that only showed up in a search
+HISTORY_WEIGHT = 5
+# finished books read when a guild's index is first built
+HISTORY_BOOKS = 100
+AUTOCOMPLETE_TTL = int(os.environ.get("AUTOCOMPLETE_TTL", 30*24*60*60))
+
+SEED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "popular_books.json")
+
+# bump when the layout changes; decode rejects other versions
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">BI")   # version, field count
+SECTION = struct.Struct(">II")  # names byte length, entry count
+COMPRESS_WBITS = 12
+COMPRESS_MEM_LEVEL = 5
+# the weight and entry arrays are stored little-endian, whatever the host's order
+SWAP_BYTES = sys.byteorder != "little"
+
+NON_WORD = re.compile(r"[^\w\s]")
+SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase, accent-free, punctuation-free form of a title, author or typed prefix,
+    so "Brontë", "bronte" and "BRONTE," all land on the same entries.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = NON_WORD.sub("", text.lower())
+    return SPACES.sub(" ", text).strip()
+
+
+def word_starts(normalized: str) -> list[int]:
+    starts = [0] + [i + 1 for i, char in enumerate(normalized) if char == " "]
+    return starts[:MAX_WORD_STARTS]
+
+
+def _to_little_endian(values: array) -> bytes:
+    if SWAP_BYTES:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if SWAP_BYTES:
+        values.byteswap()
+    return values
+
+
+class PrefixIndex:
+    """
+    Names (titles or authors) found by a prefix of any of their first words.
+
+    Entries are kept as a sorted array of (normalized suffix, name) pairs: a lookup
+    is one bisect to the first key that starts with the prefix and a scan of the
+    keys after it, ranked by how often each name was seen.
+    """
+    def __init__(self):
+        self.names: list[str] = []
+        self.normalized: list[str] = []
+        self.weights = array("I")
+        # sorted keys, with the name and the word of the name each one starts at
+        self.keys: list[str] = []
+        self.refs = array("I")
+        self.words = array("B")
+        self._ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, weight: int = 1) -> bool:
+        """
+        Adds a name, or adds `weight` to it if it is already indexed.
+        Returns whether the name is new.
+        """
+        # names are stored newline separated
+        name = " ".join(name.split())[:MAX_CHOICE_LENGTH]
+        normalized = normalize(name)
+        if not normalized:
+            return False
+        ref = self._ids.get(normalized)
+        if ref is not None:
+            self.weights[ref] = min(self.weights[ref] + weight, 0xFFFFFFFF)
+            return False
+
+        ref = len(self.names)
+        self._ids[normalized] = ref
+        self.names.append(name)
+        self.normalized.append(normalized)
+        self.weights.append(weight)
+        for word, start in enumerate(word_starts(normalized)):
+            key = normalized[start:]
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.refs.insert(position, ref)
+            self.words.insert(position, word)
+        return True
+
+    def lookup(self, prefix: str, limit: int = MAX_CHOICES) -> list[str]:
+        """
+        The most used names with a word starting with `prefix`, best first. An empty
+        prefix returns the most used names overall.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            ranked = sorted(range(len(self.names)), key=lambda ref: -self.weights[ref])
+            return [self.names[ref] for ref in ranked[:limit]]
+
+        found = {}
+        position = bisect_left(self.keys, prefix)
+        end = min(position + MAX_SCANNED, len(self.keys))
+        while position < end and self.keys[position].startswith(prefix):
+            ref = self.refs[position]
+            # names that start with the prefix rank above later word matches
+            found.setdefault(ref, (self.keys[position] == self.normalized[ref], self.weights[ref]))
+            position += 1
+        ranked = sorted(found, key=lambda ref: (not found[ref][0], -found[ref][1], self.normalized[ref]))
+        return [self.names[ref] for ref in ranked[:limit]]
+
+    def trim(self, max_names: int) -> "PrefixIndex":
+        """
+        A copy without the least used names once there are more than `max_names`.
+        """
+        if len(self.names) <= max_names:
+            return self
+        kept = sorted(range(len(self.names)), key=lambda ref: -self.weights[ref])[:max_names]
+        trimmed = PrefixIndex()
+        for ref in sorted(kept):
+            trimmed.add(self.names[ref], self.weights[ref])
+        return trimmed
+
+    def _pack(self) -> list[bytes]:
+        names = "\n".join(self.names).encode("utf-8")
+        return [SECTION.pack(len(names), len(self.keys)), names, _to_little_endian(self.weights), _to_little_endian(self.refs), self.words.tobytes()]
+
+    @classmethod
+    def _unpack(cls, data: bytes, offset: int) -> tuple["PrefixIndex", int]:
+        names_length, entry_count = SECTION.unpack_from(data, offset)
+        offset += SECTION.size
+        index = cls()
+        index.names = data[offset:offset + names_length].decode("utf-8").split("\n") if names_length else []
+        offset += names_length
+        index.weights = _from_little_endian("I", data[offset:offset + 4 * len(index.names)])
+        offset += 4 * len(index.names)
+        index.refs = _from_little_endian("I", data[offset:offset + 4 * entry_count])
+        offset += 4 * entry_count
+        index.words = array("B", data[offset:offset + entry_count])
+        offset += entry_count
+
+        # the stored order is already sorted, so keys are rebuilt with slices, not a sort
+        index.normalized = [normalize(name) for name in index.names]
+        index._ids = {normalized: ref for ref, normalized in enumerate(index.normalized)}
+        starts = [word_starts(normalized) for normalized in index.normalized]
+        index.keys = [index.normalized[ref][starts[ref][word]:] for ref, word in zip(index.refs, index.words)]
+        return index, offset
+
+
+class BookIndex:
+    """
+    One PrefixIndex per autocompleted /search field.
+    """
+    def __init__(self, fields: dict[str, PrefixIndex] = None):
+        self.fields = fields or {field: PrefixIndex() for field in FIELDS}
+
+    def add_book(self, title: str, authors: list[str], weight: int = 1) -> bool:
+        added = self.fields["title"].add(title, weight) if title else False
+        for author in authors:
+            added = self.fields["author"].add(author, weight) or added
+        return added
+
+    def add_volumes(self, volumes: list[dict], weight: int = 1) -> bool:
+        """
+        Adds Google Books volumes (search results). Returns whether any name is new.
+        """
+        added = False
+        for volume in volumes:
+            info = volume.get("volumeInfo", {})
+            added = self.add_book(info.get("title", ""), info.get("authors", []), weight) or added
+        return added
+
+    def lookup(self, field: str, prefix: str, limit: int = MAX_CHOICES) -> list[str]:
+        index = self.fields.get(field)
+        return index.lookup(prefix, limit) if index else []
+
+    def trim(self, max_names: int = AUTOCOMPLETE_MAX_NAMES) -> "BookIndex":
+        return BookIndex({field: index.trim(max_names) for field, index in self.fields.items()})
+
+
+def pack_index(index: BookIndex) -> bytes:
+    """
+    Serializes an index as its names, weights and sorted entry order (as name and
+    word numbers), zlib-compressed. Loading it doesn't sort or re-insert anything.
+    """
+    parts = [HEADER.pack(FORMAT_VERSION, len(FIELDS))]
+    for field in FIELDS:
+        parts.extend(index.fields[field]._pack())
+    # a small window and state: the index is rewritten on every search and finish, and
+    # the default 256 KiB of compressor state dwarfs it (zlib.decompress reads any window)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, COMPRESS_WBITS, COMPRESS_MEM_LEVEL)
+    return compressor.compress(b"".join(parts)) + compressor.flush()
+
+
+def unpack_index(blob: bytes) -> BookIndex:
+    """
+    Inverse of pack_index.
+
+    Raises:
+        ValueError when the blob isn't a supported packed index
+    """
+    try:
+        data = zlib.decompress(blob)
+    except zlib.error as e:
+        raise ValueError(f"Invalid packed autocomplete index. {e}")
+    version, field_count = HEADER.unpack_from(data, 0)
+    if version != FORMAT_VERSION or field_count != len(FIELDS):
+        raise ValueError(f"Unsupported autocomplete index format {version}.")
+
+    offset = HEADER.size
+    fields = {}
+    for field in FIELDS:
+        fields[field], offset = PrefixIndex._unpack(data, offset)
+    return BookIndex(fields)
+
+
+# per-guild indexes: the memory tier keeps them decoded, the table keeps them packed
+# under "autocomplete#<guild_id>"
+guild_indexes = TieredCache(
+    "autocomplete",
+    ttl=AUTOCOMPLETE_TTL,
+    max_size=128,
+    memory_ttl=5*60,
+    encode=pack_index,
+    decode=unpack_index,
+)
+
+_seed_index = None
+_seed_lock = threading.Lock()
+
+
+def seed_index() -> BookIndex:
+    """
+    Popular titles shipped with the bot (data/popular_books.json), so a guild
+    that hasn't searched anything yet still gets suggestions.
+    """
+    global _seed_index
+    if _seed_index is None:
+        with _seed_lock:
+            if _seed_index is None:
+                index = BookIndex()
+                try:
+                    with open(SEED_PATH, encoding="utf-8") as f:
+                        for book in json.load(f):
+                            index.add_book(book["title"], book.get("authors", []))
+                except (OSError, ValueError) as e:
+                    print(f"Failed to load autocomplete seed list: {e}")
+                _seed_index = index
+    return _seed_index
+
+
+def build_guild_index(guild_id: str) -> BookIndex:
+    """
+    First index of a guild: the books it has finished.
+    """
+    from utils.aws.dynamodb import get_reading_history
+    index = BookIndex()
+    try:
+        books, _ = get_reading_history(guild_id, limit=HISTORY_BOOKS)
+    except Exception as e:
+        print(f"Failed to read history for autocomplete: {e}")
+        return index
+    for book in books:
+        _add_finished_book(index, book)
+    return index
+
+
+def _add_finished_book(index: BookIndex, book: dict) -> None:
+    # history rows keep the authors as one "A, B" string
+    authors = [author.strip() for author in (book.get("authors") or "").split(",")]
+    index.add_book(book.get("title", ""), [author for author in authors if author and author != "Unknown Author"], HISTORY_WEIGHT)
+
+
+def _load_guild_index(guild_id: str) -> tuple[BookIndex, bool]:
+    """
+    (index, built): the stored index, or a new one built from the guild's history.
+    """
+    index = guild_indexes.get(guild_id)
+    if index is MISSING or index is None:
+        return build_guild_index(guild_id), True
+    return index, False
+
+
+def guild_index(guild_id: str) -> BookIndex:
+    index, built = _load_guild_index(guild_id)
+    if built:
+        guild_indexes.set(guild_id, index)
+    return index
+
+
+def learn_books(guild_id: str, volumes: list[dict]) -> None:
+    """
+    Adds the titles and authors of search results to the guild's index, or bumps
+    the weight of the ones already in it, and rewrites the table row so the ranking
+    carries over to other containers. Concurrent searches in a guild can overwrite
+    each other's additions, which only costs a suggestion.
+    """
+    if not guild_id or not volumes:
+        return
+    index, _ = _load_guild_index(guild_id)
+    index.add_volumes(volumes)
+    guild_indexes.set(guild_id, index.trim())
+
+
+def learn_finished_book(guild_id: str, book: dict) -> None:
+    """
+    Adds a book the guild just finished (a history row) with HISTORY_WEIGHT, so it
+    ranks like the books the index was first built from.
+    """
+    if not guild_id or not book:
+        return
+    index, built = _load_guild_index(guild_id)
+    # a new index was just built from the history, which already has the book
+    if not built:
+        _add_finished_book(index, book)
+    guild_indexes.set(guild_id, index.trim())
+
+
+def suggest(guild_id: str, field: str, prefix: str, limit: int = MAX_CHOICES) -> list[dict[str, str]]:
+    """
+    Autocomplete choices for a /search option: the guild's own books first, then
+    the seed list. Served from memory or one cache table read, never Google Books.
+    """
+    names = guild_index(guild_id).lookup(field, prefix, limit) if guild_id else []
+    seen = {normalize(name) for name in names}
+    for name in seed_index().lookup(field, prefix, limit):
+        if len(names) >= limit:
+            break
+        if normalize(name) not in seen:
+            seen.add(normalize(name))
+            names.append(name)
+    return [{"name": name, "value": name} for name in names]
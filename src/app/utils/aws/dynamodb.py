@@ -1,20 +1,27 @@
-import boto3 # type: ignore
 import os
 from datetime import datetime, timezone, date
 import time
-from typing import Any
+from typing import Any, NamedTuple
+from enum import Enum
 import json
+from utils.aws.lazy import LazyResource
+from utils.telemetry import instrument_boto3
+from utils.book_record import pack_volumes, unpack_volumes
 
-dynamodb = boto3.resource("dynamodb")
 
-current_book_table_name = os.environ["CURRENT_BOOK_TABLE"]
-history_table_name = os.environ["HISTORY_BOOK_TABLE"]
-cache_table_name = os.environ["CACHE_TABLE"]
+def _dynamodb_resource():
+    import boto3 # type: ignore
+    resource = boto3.resource("dynamodb")
+    instrument_boto3(resource.meta.client, "dynamodb")
+    return resource
+
+# built on first use to keep boto3 off the cold start path
+dynamodb = LazyResource(_dynamodb_resource)
 
 # tables
-current_book_table = dynamodb.Table(current_book_table_name)
-history_book_table = dynamodb.Table(history_table_name)
-cache_table = dynamodb.Table(cache_table_name)
+current_book_table = LazyResource(lambda: dynamodb.Table(os.environ["CURRENT_BOOK_TABLE"]))
+history_book_table = LazyResource(lambda: dynamodb.Table(os.environ["HISTORY_BOOK_TABLE"]))
+cache_table = LazyResource(lambda: dynamodb.Table(os.environ["CACHE_TABLE"]))
 
 
 # @TODO: Make this function type safe
@@ -26,7 +33,14 @@ def put_book(
         discussion_time: str,
         pages_or_chapters,
         discord_event_id: str = None
-    ) -> None:
+    ) -> "LifecycleResult":
+    """
+    Sets the guild's current book, only if it has none: two overlapping schedule
+    submissions can't both win, and the loser learns it before any side effect.
+
+    Output:
+        LifecycleResult: OK with the new item, or CONFLICT when a current book is already set
+    """
 
     if not all([guild_id, user_id, selected_book, discussion_date, discussion_time, pages_or_chapters]):
         msg = f"Book information missing. Please enter valid book info."
@@ -55,11 +69,15 @@ def put_book(
             "set_by_user": user_id,
             "set_page_or_chapter": pages_or_chapters,
             "timestamp": datetime.now(timezone.utc).isoformat(),
+            "version": 1,  # bumped by every lifecycle write, checked by their conditions
         }
         if discord_event_id:
             item["discord_event_id"] = discord_event_id
-        current_book_table.put_item(Item=item)
+        current_book_table.put_item(Item=item, ConditionExpression="attribute_not_exists(guild_id)")
+        return LifecycleResult(LifecycleStatus.OK, item)
     except Exception as e:
+        if _error_code(e) == "ConditionalCheckFailedException":
+            return LifecycleResult(LifecycleStatus.CONFLICT, {})
         msg = f"failed to put book {selected_book} into table. {e}"
         raise Exception(msg)
 
@@ -71,40 +89,138 @@ def get_current_book(guild_id: str) -> dict[str, Any]:
     response = current_book_table.get_item(Key={"guild_id": guild_id})
     return response.get("Item", {})
 
+# LIFECYCLE LOGIC
+class LifecycleStatus(Enum):
+    OK = "ok"
+    NOT_FOUND = "not_found"   # no current book for the guild
+    CONFLICT = "conflict"     # the current book changed since it was read (version mismatch)
+
+
+class LifecycleResult(NamedTuple):
+    status: LifecycleStatus
+    book: dict[str, Any]      # the item as it was before the operation ({} unless OK)
+
+    @property
+    def ok(self) -> bool:
+        return self.status is LifecycleStatus.OK
+
+
+def item_version(current_book: dict[str, Any]) -> int | None:
+    """
+    Version of a current book item as read (0 for items written before versioning),
+    or None when there is no item to compare against.
+    """
+    if not current_book:
+        return None
+    return int(current_book.get("version", 0))
+
+
+def _error_code(e: Exception) -> str:
+    return getattr(e, "response", {}).get("Error", {}).get("Code", "")
+
+
+def _failed_condition(e: Exception) -> bool:
+    """
+    Whether a TransactionCanceledException was caused by a condition, rather than
+    by a conflicting transaction, throttling or a validation error.
+    """
+    reasons = getattr(e, "response", {}).get("CancellationReasons") or []
+    return any(reason.get("Code") == "ConditionalCheckFailed" for reason in reasons)
+
+
+# Discord ids (snowflakes) carry their creation time, in ms since 2015-01-01
+DISCORD_EPOCH_MS = 1420070400000
+
+def _finished_at(request_token: str | None) -> str:
+    """
+    When a book is finished: the time of the interaction when the token is its id, so a
+    retry with the same ClientRequestToken sends the same item (DynamoDB rejects a
+    reused token with different parameters).
+    """
+    if request_token and request_token.isdigit():
+        ms = (int(request_token) >> 22) + DISCORD_EPOCH_MS
+        return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat()
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _version_condition(expected_version: int | None) -> tuple[str, dict[str, str], dict[str, Any]]:
+    """
+    Condition for writes to the current book: it must exist and, when the caller read
+    it first, still be at the version that was read. Items written before versioning
+    count as version 0.
+    """
+    if expected_version is None:
+        return "attribute_exists(guild_id)", {}, {}
+    if expected_version == 0:
+        return "attribute_exists(guild_id) AND attribute_not_exists(#v)", {"#v": "version"}, {}
+    return "attribute_exists(guild_id) AND #v = :expected_version", {"#v": "version"}, {":expected_version": expected_version}
+
+
+def _conditional_failure(guild_id: str) -> LifecycleResult:
+    """
+    Tells NOT_FOUND and CONFLICT apart after a failed condition (the extra read only
+    happens on this error path).
+    """
+    current_book = get_current_book(guild_id)
+    if not current_book:
+        return LifecycleResult(LifecycleStatus.NOT_FOUND, {})
+    return LifecycleResult(LifecycleStatus.CONFLICT, {})
+
+
 # delete the current book in case the server does not want to read it
-def delete_current_book(guild_id: str) -> dict:
+def delete_current_book(guild_id: str, expected_version: int | None = None) -> LifecycleResult:
     if not guild_id:
         raise Exception("guild_id missing.")
 
+    condition, names, values = _version_condition(expected_version)
+    kwargs = {"ExpressionAttributeNames": names} if names else {}
+    if values:
+        kwargs["ExpressionAttributeValues"] = values
     try:
         response = current_book_table.delete_item(
             Key={"guild_id": guild_id},
-            ReturnValues="ALL_OLD"  # returns the deleted item attributes if it existed
+            ConditionExpression=condition,
+            ReturnValues="ALL_OLD",  # returns the deleted item attributes
+            **kwargs
         )
-        # Return the old item if it was deleted, or None if no item found
-        return response.get("Attributes")
+        return LifecycleResult(LifecycleStatus.OK, response.get("Attributes", {}))
     except Exception as e:
+        if _error_code(e) == "ConditionalCheckFailedException":
+            return _conditional_failure(guild_id)
         raise Exception(f"Failed to delete current book. {e}")
 
 
 # update the schedule of the book
-def update_discussion_date_current_book(guild_id: str, discussion_date: str, discussion_time: str, pages_or_chapters: str, discord_event_id: str = None) -> dict:
+def update_discussion_date_current_book(
+        guild_id: str,
+        discussion_date: str,
+        discussion_time: str,
+        pages_or_chapters: str,
+        discord_event_id: str = None,
+        expected_version: int | None = None
+    ) -> LifecycleResult:
     if not guild_id or not discussion_date or not discussion_time or not pages_or_chapters:
         raise Exception("Guild_ID, a new discussion date, discussion time, and pages or chapters are required.")
 
+    condition, names, values = _version_condition(expected_version)
     try:
-        update_expr = "SET #d = :new_date, #t = :updated_at, #p = :pages, #dt = :discussion_time"
+        update_expr = "SET #d = :new_date, #t = :updated_at, #p = :pages, #dt = :discussion_time, #v = if_not_exists(#v, :zero) + :one"
         expr_attr_names = {
             "#d": "discussion_date",
             "#t": "timestamp",
             "#p": "set_page_or_chapter",
-            "#dt": "discussion_time"
+            "#dt": "discussion_time",
+            **names,
+            "#v": "version"
         }
         expr_attr_values = {
             ":new_date": discussion_date,
             ":updated_at": datetime.now(timezone.utc).isoformat(),
             ":pages": pages_or_chapters,
-            ":discussion_time": discussion_time
+            ":discussion_time": discussion_time,
+            ":zero": 0,
+            ":one": 1,
+            **values
         }
         if discord_event_id:
             update_expr += ", #e = :event_id"
@@ -113,61 +229,283 @@ def update_discussion_date_current_book(guild_id: str, discussion_date: str, dis
         response = current_book_table.update_item(
             Key={"guild_id": guild_id},
             UpdateExpression=update_expr,
+            ConditionExpression=condition,
             ExpressionAttributeNames=expr_attr_names,
             ExpressionAttributeValues=expr_attr_values,
             ReturnValues="ALL_OLD"  # returns the old item attributes
         )
-        return response.get("Attributes", {})
+        return LifecycleResult(LifecycleStatus.OK, response.get("Attributes", {}))
     except Exception as e:
+        if _error_code(e) == "ConditionalCheckFailedException":
+            return _conditional_failure(guild_id)
         raise Exception(f"Failed to update discussion date for guild {guild_id}. {e}")
 
-def finish_current_book(guild_id: str) -> None:    
+def set_current_book_event(guild_id: str, discord_event_id: str, expected_version: int | None = None) -> LifecycleResult:
+    """
+    Records the Discord event created for the current book, as long as the book is
+    still the one (and at the version) the event was created for.
+    """
+    if not guild_id or not discord_event_id:
+        raise Exception("guild_id and discord_event_id are required.")
+
+    condition, names, values = _version_condition(expected_version)
+    try:
+        response = current_book_table.update_item(
+            Key={"guild_id": guild_id},
+            UpdateExpression="SET #e = :event_id, #v = if_not_exists(#v, :zero) + :one",
+            ConditionExpression=condition,
+            ExpressionAttributeNames={"#e": "discord_event_id", **names, "#v": "version"},
+            ExpressionAttributeValues={":event_id": discord_event_id, ":zero": 0, ":one": 1, **values},
+            ReturnValues="ALL_OLD"
+        )
+        return LifecycleResult(LifecycleStatus.OK, response.get("Attributes", {}))
+    except Exception as e:
+        if _error_code(e) == "ConditionalCheckFailedException":
+            return _conditional_failure(guild_id)
+        raise Exception(f"Failed to set the Discord event for guild {guild_id}. {e}")
+
+def finish_current_book(
+        guild_id: str,
+        current_book: dict[str, Any] = None,
+        request_token: str = None
+    ) -> LifecycleResult:
+    """
+    Moves the current book into the history table in one TransactWriteItems call:
+    the history put and the current book delete either both happen or neither does.
+
+    Input:
+        guild_id: server id
+        current_book: the current book as already read by the caller (read here if None)
+        request_token: idempotency token (the interaction id); retries with the same
+            token within 10 minutes don't finish the book twice
+
+    Output:
+        LifecycleResult: NOT_FOUND if there's no current book, CONFLICT if it changed
+        since it was read, otherwise OK with the finished book
+    """
     if not guild_id:
         raise Exception("guild_id is required to finish the current book.")
 
-    # Get the current book
-    current_book = get_current_book(guild_id)
+    # Get the current book (unless the caller already loaded it)
+    if current_book is None:
+        current_book = get_current_book(guild_id)
     
     if not current_book:
-        raise Exception(f"No current book found for guild {guild_id}.")
+        return LifecycleResult(LifecycleStatus.NOT_FOUND, {})
 
-    # Move to history table
-    history_book_table.put_item(Item=current_book)
+    from boto3.dynamodb.types import TypeSerializer # type: ignore
+    serializer = TypeSerializer()
 
-    # Delete from current book table
-    return delete_current_book(guild_id)
+    condition, names, values = _version_condition(item_version(current_book))
+    delete = {
+        "TableName": current_book_table.name,
+        "Key": {"guild_id": serializer.serialize(guild_id)},
+        "ConditionExpression": condition,
+        "ExpressionAttributeNames": names,
+    }
+    if values:
+        delete["ExpressionAttributeValues"] = {k: serializer.serialize(v) for k, v in values.items()}
+
+    finished_book = {**current_book, "finished_at": _finished_at(request_token)}
+    transaction = {
+        "TransactItems": [
+            {"Put": {
+                "TableName": history_book_table.name,
+                "Item": {k: serializer.serialize(v) for k, v in finished_book.items()},
+            }},
+            {"Delete": delete},
+        ]
+    }
+    if request_token:
+        transaction["ClientRequestToken"] = request_token
+
+    try:
+        dynamodb.meta.client.transact_write_items(**transaction)
+    except Exception as e:
+        if _error_code(e) == "TransactionCanceledException" and _failed_condition(e):
+            return _conditional_failure(guild_id)
+        raise Exception(f"Failed to finish current book for guild {guild_id}. {e}")
+
+    return LifecycleResult(LifecycleStatus.OK, finished_book)
+
+# HISTORY LOGIC
+def get_reading_history(
+        guild_id: str,
+        limit: int = 5,
+        cursor: str = None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Gets one page of a guild's finished books, newest first, with a Query on the
+    (guild_id, finished_at) key. Only the attributes /history shows are read.
+
+    Input:
+        guild_id: server id
+        limit: page size
+        cursor: finished_at of the last book on the previous page (None for the first page)
+
+    Output:
+        (books, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        Exception when guild_id is None
+        Exception when the query fails
+    """
+    if not guild_id:
+        msg = f"Invalid guild_id entered."
+        raise Exception(msg)
+
+    kwargs = {
+        "KeyConditionExpression": "guild_id = :guild_id",
+        "ExpressionAttributeValues": {":guild_id": guild_id},
+        "ProjectionExpression": "#title, authors, finished_at",
+        "ExpressionAttributeNames": {"#title": "title"},
+        "ScanIndexForward": False,  # newest first
+        "Limit": limit,
+    }
+    if cursor:
+        kwargs["ExclusiveStartKey"] = {"guild_id": guild_id, "finished_at": cursor}
+
+    try:
+        response = history_book_table.query(**kwargs)
+    except Exception as e:
+        msg = f"Failed to query history for guild {guild_id}. {e}"
+        raise Exception(msg)
+
+    last_key = response.get("LastEvaluatedKey")
+    return response.get("Items", []), last_key["finished_at"] if last_key else None
 
 # CACHING LOGIC
-def cache_book_list(
-        guild_id: str, 
-        book_list: list[str], 
-        ttl: int = 15*60
+def decode_book_list(value: Any) -> list[dict]:
+    """
+    Decodes a cached book_list attribute: packed BookRecords (Binary), or the JSON
+    string older cache rows still hold until their TTL runs out.
+    """
+    if isinstance(value, str):
+        return json.loads(value)
+    return unpack_volumes(bytes(value))
+
+def search_results_key(token: str) -> str:
+    return f"results#{token}"
+
+def cache_search_results(
+        token: str,
+        query_options: dict[str, str],
+        book_list: list[dict],
+        ttl: int,
+        refresh_after: int,
+        max_results: int = 5,
+        exhausted: bool = False,
+        source: str = "google"
     ) -> None:
     """
-    Puts the book_list into DynamoDB with a TTL of 15 mins
-    
+    Puts the results of one /search message into the cache table under
+    "results#<token>", as compressed compact BookRecords (see utils.book_record)
+    together with the query, so they can be refreshed once `refresh_after` passes
+
     Input
-        guild_id: server id
+        token: carried in the message's select_book buttons
+        query_options: the /search options the results came from
         book_list: list of books returned by Google books API
-
-    Ouptut:
-        None
+        ttl: seconds until DynamoDB expires the row and the buttons stop working
+        refresh_after: seconds until the books are re-read from the search
+        max_results: page size the books were fetched with
+        exhausted: the search has no results beyond book_list
+        source: "google" or "catalog" (the local catalog, see utils.catalog)
 
     Raises:
-        Exception when either guild_id or book_list is None
+        Exception when either token or book_list is None
         Exception when put_item action fails
     """
 
-    if not guild_id or not book_list:
-        msg = f"Invalid guild_id or book_list entered."
+    if not token or not book_list:
+        msg = f"Invalid token or book_list entered."
         raise Exception(msg)
-    
-    expire_timestamp = int(time.time()) + ttl
-    
+
+    now = int(time.time())
+    payload = {
+        "guild_id": search_results_key(token),
+        "book_list": pack_volumes(book_list),
+        "query": json.dumps(query_options, separators=(",", ":")),
+        "max_results": max_results,
+        "refresh_at": now + refresh_after,
+        "exhausted": exhausted,
+        "source": source,
+        "ttl": now + ttl
+    }
+
+    try:
+        cache_table.put_item(
+            Item=payload,
+        )
+    except Exception as e:
+        msg = f"Failed to put search results {token} into table. {e}"
+        raise Exception(msg)
+
+def decode_search_results(item: dict[str, Any] | None) -> dict[str, Any] | None:
+    """
+    The stored search results of a cache row written by cache_search_results, or
+    None when the row is missing or expired
+    """
+    # DynamoDB TTL deletion is lazy, so expired items can still be returned
+    if not item or int(item.get("ttl", 0)) <= time.time():
+        return None
+    return {
+        "books": decode_book_list(item["book_list"]),
+        "query": json.loads(item["query"]),
+        "max_results": int(item.get("max_results", 5)),
+        "refresh_at": int(item.get("refresh_at", 0)),
+        "exhausted": bool(item.get("exhausted", True)),
+        "source": item.get("source", "google"),
+        "ttl": int(item["ttl"]),
+    }
+
+def get_search_results(token: str) -> dict[str, Any] | None:
+    """
+    Gets the results stored with cache_search_results (see decode_search_results)
+
+    Raises:
+        Exception when invalid token is entered
+        Exception when the retrieval fails
+    """
+
+    if not token:
+        msg = f"Invalid token entered."
+        raise Exception(msg)
+
+    try:
+        response = cache_table.get_item(Key={"guild_id": search_results_key(token)})
+    except Exception as e:
+        msg = f"Failed to retrieve search results {token}. {e}"
+        raise Exception(msg)
+
+    return decode_search_results(response.get("Item"))
+
+
+def record_interaction_steps(
+        interaction_id: str,
+        steps: dict[str, str],
+        ttl: int = 24*60*60
+    ) -> None:
+    """
+    Records which side effects of a deferred interaction succeeded, in the cache table
+    under the key "interaction#<interaction_id>" with a TTL of 24 hours
+
+    Input:
+        interaction_id: id of the Discord interaction
+        steps: step name -> "ok" or the error message
+
+    Raises:
+        Exception when interaction_id is None
+        Exception when put_item action fails
+    """
+    if not interaction_id:
+        msg = f"Invalid interaction_id entered."
+        raise Exception(msg)
+
     payload = {
-        "guild_id": guild_id,
-        "book_list": json.dumps(book_list),
-        "ttl": expire_timestamp
+        "guild_id": f"interaction#{interaction_id}",
+        "steps": steps,
+        "ttl": int(time.time()) + ttl
     }
 
     try:
@@ -175,42 +513,188 @@ def cache_book_list(
             Item=payload,
         )
     except Exception as e:
-        msg = f"Failed to put item into table. {e}"
+        msg = f"Failed to record steps for interaction {interaction_id}. {e}"
         raise Exception(msg)
 
-def get_cached_book_list(guild_id: str) -> Any:
+
+def cache_channel_directory(
+        guild_id: str,
+        directory: dict[str, str],
+        ttl: int = 10*60
+    ) -> None:
     """
-    Gets book list from the dynamodb cache
+    Puts a guild's channel directory into the cache table under "channels#<guild_id>"
+    so cold containers don't have to list the guild's channels again
 
     Input:
         guild_id: server id
+        directory: "<channel type>:<lowercased channel name>" -> channel id
+
+    Raises:
+        Exception when guild_id is None
+        Exception when put_item action fails
+    """
+    if not guild_id:
+        msg = f"Invalid guild_id entered."
+        raise Exception(msg)
+
+    payload = {
+        "guild_id": f"channels#{guild_id}",
+        "channels": json.dumps(directory),
+        "ttl": int(time.time()) + ttl
+    }
+
+    try:
+        cache_table.put_item(
+            Item=payload,
+        )
+    except Exception as e:
+        msg = f"Failed to cache channels for guild {guild_id}. {e}"
+        raise Exception(msg)
+
+
+def get_cached_channel_directory(guild_id: str) -> dict[str, str] | None:
+    """
+    Gets a guild's channel directory from the cache table
 
     Output:
-        book_list: the cached book list
-    
+        the directory, or None if nothing (unexpired) is cached
+
     Raises:
-        Exception when invalid guild_id is entered
+        Exception when guild_id is None
         Exception when the retrieval fails
     """
-    
     if not guild_id:
         msg = f"Invalid guild_id entered."
         raise Exception(msg)
 
     try:
-        response = cache_table.get_item(
-            Key={
-                "guild_id": guild_id
-            }
+        response = cache_table.get_item(Key={"guild_id": f"channels#{guild_id}"})
+    except Exception as e:
+        msg = f"Failed to retrieve channels for guild {guild_id}. {e}"
+        raise Exception(msg)
+
+    item = response.get("Item")
+    # DynamoDB TTL deletion is lazy, so expired items can still be returned
+    if not item or int(item.get("ttl", 0)) <= time.time():
+        return None
+    return json.loads(item["channels"])
+
+
+def delete_cached_channel_directory(guild_id: str) -> None:
+    if not guild_id:
+        msg = f"Invalid guild_id entered."
+        raise Exception(msg)
+
+    try:
+        cache_table.delete_item(Key={"guild_id": f"channels#{guild_id}"})
+    except Exception as e:
+        msg = f"Failed to delete cached channels for guild {guild_id}. {e}"
+        raise Exception(msg)
+
+
+def put_cache_entry(key: str, value: Any, ttl: int = 15*60) -> None:
+    """
+    Puts a value into the cache table under `key` with a TTL. bytes are stored as a
+    Binary "blob" attribute, anything else as JSON in "value".
+
+    Input:
+        key: namespaced cache key (e.g. "search#<hash>"), never a bare guild id
+        value: bytes or a JSON-serializable value
+        ttl: seconds until DynamoDB expires the item
+
+    Raises:
+        Exception when key is None
+        Exception when put_item action fails
+    """
+    if not key:
+        msg = f"Invalid cache key entered."
+        raise Exception(msg)
+
+    payload = {
+        "guild_id": key,
+        "ttl": int(time.time()) + ttl
+    }
+    if isinstance(value, bytes):
+        payload["blob"] = value
+    else:
+        payload["value"] = json.dumps(value, separators=(",", ":"))
+
+    try:
+        cache_table.put_item(
+            Item=payload,
         )
-        
-        print("[DEBUG]", response)
-
-        if "Item" in response:
-            return json.loads(response["Item"]["book_list"])
-        
-        # if no item found
-        raise
     except Exception as e:
-        msg = f"Failed to retrieve item from cache table for key {guild_id}. {e}"
-        raise Exception(msg)
\ No newline at end of file
+        msg = f"Failed to put cache entry {key}. {e}"
+        raise Exception(msg)
+
+
+def get_cache_entry(key: str) -> tuple[bool, Any]:
+    """
+    Gets a value stored with put_cache_entry
+
+    Output:
+        (found, value); found is False when the item is missing or expired
+
+    Raises:
+        Exception when key is None
+        Exception when the retrieval fails
+    """
+    found, value, _ = read_cache_entry(key)
+    return found, value
+
+
+def read_cache_entry(key: str) -> tuple[bool, Any, int]:
+    """
+    get_cache_entry with the entry's expiry (epoch seconds, 0 when not found), for
+    callers that keep their own copy and mustn't keep it longer than the table does.
+    """
+    if not key:
+        msg = f"Invalid cache key entered."
+        raise Exception(msg)
+
+    try:
+        response = cache_table.get_item(Key={"guild_id": key})
+    except Exception as e:
+        msg = f"Failed to retrieve cache entry {key}. {e}"
+        raise Exception(msg)
+
+    item = response.get("Item")
+    # DynamoDB TTL deletion is lazy, so expired items can still be returned
+    expires_at = int(item.get("ttl", 0)) if item else 0
+    if expires_at <= time.time():
+        return False, None, 0
+    if "blob" in item:
+        return True, bytes(item["blob"]), expires_at
+    return True, json.loads(item["value"]), expires_at
+
+
+def take_cache_entry(key: str) -> tuple[bool, Any]:
+    """
+    Gets and deletes a value stored with put_cache_entry in one round trip
+    (DeleteItem returning the old item), so only one caller can take it.
+
+    Output:
+        (found, value); found is False when the item is missing or expired
+
+    Raises:
+        Exception when key is None
+        Exception when the delete fails
+    """
+    if not key:
+        msg = f"Invalid cache key entered."
+        raise Exception(msg)
+
+    try:
+        response = cache_table.delete_item(Key={"guild_id": key}, ReturnValues="ALL_OLD")
+    except Exception as e:
+        msg = f"Failed to take cache entry {key}. {e}"
+        raise Exception(msg)
+
+    item = response.get("Attributes")
+    # DynamoDB TTL deletion is lazy, so expired items can still be returned
+    if not item or int(item.get("ttl", 0)) <= time.time():
+        return False, None
+    if "blob" in item:
+        return True, bytes(item["blob"])
+    return True, json.loads(item["value"])
@@ -0,0 +1,106 @@
+import os
+from typing import Any
+from utils.aws.dynamodb import dynamodb, decode_search_results, get_search_results, search_results_key
+
+# role that can finish/delete books when a guild hasn't configured its own
+DEFAULT_ADMIN_ROLE_ID = '1393651462558449815'
+MAX_BATCH_ATTEMPTS = 3
+
+
+class GuildState:
+    """
+    Request-scoped view of one guild's DynamoDB rows.
+
+    The current book, the guild settings and (when a button asks for them with
+    include_search_results) the results of one /search message are fetched together
+    with a single BatchGetItem the first time any of them is read, then memoized for
+    the rest of the interaction. `round_trips` counts DynamoDB calls.
+    """
+    def __init__(self, guild_id: str):
+        self.guild_id = guild_id
+        self.round_trips = 0
+        self._loaded = False
+        self._current_book: dict[str, Any] = {}
+        self._search_token: str | None = None
+        self._search_results: dict[str, Any] | None = None
+        self._settings: dict[str, Any] = {}
+
+    def _keys(self) -> dict[str, tuple[str, str]]:
+        """
+        table name -> (which field of the state it fills, partition key)
+        """
+        tables = {
+            os.environ["CURRENT_BOOK_TABLE"]: ("current_book", self.guild_id),
+        }
+        if self._search_token:
+            tables[os.environ["CACHE_TABLE"]] = ("search_results", search_results_key(self._search_token))
+        # settings are optional so older stacks keep working
+        if os.environ.get("GUILD_SETTINGS_TABLE"):
+            tables[os.environ["GUILD_SETTINGS_TABLE"]] = ("settings", self.guild_id)
+        return tables
+
+    def include_search_results(self, token: str) -> None:
+        """
+        Loads the results of the /search message behind `token` with the rest of the
+        state; fetched on their own if the state was already loaded.
+        """
+        if token == self._search_token:
+            return
+        self._search_token = token
+        if self._loaded:
+            self.round_trips += 1
+            self._search_results = get_search_results(token)
+
+    def load(self) -> None:
+        if self._loaded or not self.guild_id:
+            return
+        self._loaded = True
+
+        tables = self._keys()
+        request_items = {table: {"Keys": [{"guild_id": key}]} for table, (_, key) in tables.items()}
+        for _ in range(MAX_BATCH_ATTEMPTS):
+            self.round_trips += 1
+            try:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+            except Exception as e:
+                raise Exception(f"Failed to load state for guild {self.guild_id}. {e}")
+            for table, items in response.get("Responses", {}).items():
+                for item in items:
+                    self._fill(tables[table][0], item)
+            request_items = response.get("UnprocessedKeys") or {}
+            if not request_items:
+                return
+        raise Exception(f"Failed to load state for guild {self.guild_id}. Keys left unprocessed.")
+
+    def _fill(self, field: str, item: dict[str, Any]) -> None:
+        if field == "current_book":
+            self._current_book = item
+        elif field == "search_results":
+            self._search_results = decode_search_results(item)
+        elif field == "settings":
+            self._settings = item
+
+    @property
+    def current_book(self) -> dict[str, Any]:
+        self.load()
+        return self._current_book
+
+    @property
+    def search_results(self) -> dict[str, Any] | None:
+        """
+        See decode_search_results; None when no results were asked for or they expired.
+        """
+        self.load()
+        return self._search_results
+
+    @property
+    def settings(self) -> dict[str, Any]:
+        self.load()
+        return self._settings
+
+    @property
+    def admin_role_id(self) -> str:
+        return self.settings.get("admin_role_id", DEFAULT_ADMIN_ROLE_ID)
+
+    def is_admin(self, role_ids: list[str]) -> bool:
+        return self.admin_role_id in role_ids
@@ -0,0 +1,35 @@
+import json
+import os
+from utils.aws.lazy import LazyResource
+from utils.telemetry import instrument_boto3
+
+
+def _lambda_client():
+    import boto3 # type: ignore
+    client = boto3.client("lambda")
+    instrument_boto3(client, "lambda")
+    return client
+
+# built on first use to keep boto3 off the cold start path
+lambda_client = LazyResource(_lambda_client)
+
+
+def invoke_self_async(event: dict) -> None:
+    """
+    Invokes the currently running Lambda function asynchronously (InvocationType=Event)
+
+    Input:
+        event: JSON-serializable event for the new invocation
+
+    Raises:
+        Exception when the invoke call fails
+    """
+    try:
+        lambda_client.invoke(
+            FunctionName=os.environ["AWS_LAMBDA_FUNCTION_NAME"],
+            InvocationType="Event",
+            Payload=json.dumps(event).encode("utf-8"),
+        )
+    except Exception as e:
+        msg = f"Failed to invoke deferred stage. {e}"
+        raise Exception(msg)
@@ -0,0 +1,24 @@
+import threading
+
+
+class LazyResource:
+    """
+    Stands in for a boto3 resource/client/Table and builds it on first attribute access.
+
+    Keeps `import boto3` and client construction (the bulk of our cold start) off the
+    import path, so interactions that never touch AWS (PING, /echo) don't pay for it.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
@@ -0,0 +1,139 @@
+import struct
+import zlib
+from typing import NamedTuple
+
+# bump when the field list changes; unpack rejects other versions
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">BH")        # version, record count
+FIELD_LENGTH = struct.Struct(">H")   # byte length of one utf-8 field
+AUTHOR_SEPARATOR = "\x1f"
+
+
+class BookRecord(NamedTuple):
+    """
+    The fields of a Google Books volume the bot actually reads
+    (search embeds, handle_book_select and put_book), in a fixed order.
+    """
+    volume_id: str
+    title: str
+    authors: tuple[str, ...]
+    isbn_13: str
+    isbn_10: str
+    thumbnail: str
+    preview_link: str
+
+    @classmethod
+    def from_volume(cls, volume: dict) -> "BookRecord":
+        info = volume.get("volumeInfo", {})
+        identifiers = {i.get("type"): i.get("identifier", "") for i in info.get("industryIdentifiers", [])}
+        return cls(
+            volume_id=volume.get("id", ""),
+            title=info.get("title", "No Title"),
+            authors=tuple(info.get("authors", [])),
+            isbn_13=identifiers.get("ISBN_13", ""),
+            isbn_10=identifiers.get("ISBN_10", ""),
+            thumbnail=info.get("imageLinks", {}).get("thumbnail", ""),
+            preview_link=info.get("previewLink", ""),
+        )
+
+    def to_volume(self) -> dict:
+        """
+        Minimal Google Books shaped dict, so code written against the API response
+        (volumeInfo.title/authors/industryIdentifiers/...) keeps working.
+        """
+        info = {"title": self.title}
+        if self.authors:
+            info["authors"] = list(self.authors)
+        identifiers = []
+        if self.isbn_13:
+            identifiers.append({"type": "ISBN_13", "identifier": self.isbn_13})
+        if self.isbn_10:
+            identifiers.append({"type": "ISBN_10", "identifier": self.isbn_10})
+        if identifiers:
+            info["industryIdentifiers"] = identifiers
+        if self.thumbnail:
+            info["imageLinks"] = {"thumbnail": self.thumbnail}
+        if self.preview_link:
+            info["previewLink"] = self.preview_link
+        return {"id": self.volume_id, "volumeInfo": info}
+
+
+def _fields(record: BookRecord) -> list[str]:
+    return [
+        record.volume_id,
+        record.title,
+        AUTHOR_SEPARATOR.join(record.authors),
+        record.isbn_13,
+        record.isbn_10,
+        record.thumbnail,
+        record.preview_link,
+    ]
+
+FIELD_COUNT = len(BookRecord._fields)
+
+
+def encode_record(record: BookRecord) -> bytes:
+    """
+    One record as length-prefixed utf-8 fields, uncompressed.
+    """
+    parts = []
+    for field in _fields(record):
+        encoded = field.encode("utf-8")[:0xFFFF]
+        parts.append(FIELD_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def decode_record(data: bytes, offset: int = 0) -> tuple[BookRecord, int]:
+    """
+    Inverse of encode_record, reading at `offset` (data may be a memoryview or
+    mmap). Returns the record and the offset just past it.
+    """
+    fields = []
+    for _ in range(FIELD_COUNT):
+        (length,) = FIELD_LENGTH.unpack_from(data, offset)
+        offset += FIELD_LENGTH.size
+        fields.append(bytes(data[offset:offset + length]).decode("utf-8", "ignore"))
+        offset += length
+    fields[2] = tuple(fields[2].split(AUTHOR_SEPARATOR)) if fields[2] else ()
+    return BookRecord(*fields), offset
+
+
+def pack_records(records: list[BookRecord]) -> bytes:
+    """
+    Serializes records as length-prefixed utf-8 fields and zlib-compresses the result.
+    """
+    parts = [HEADER.pack(FORMAT_VERSION, len(records))]
+    parts.extend(encode_record(record) for record in records)
+    return zlib.compress(b"".join(parts), 6)
+
+
+def unpack_records(blob: bytes) -> list[BookRecord]:
+    """
+    Inverse of pack_records.
+
+    Raises:
+        ValueError when the blob isn't a supported packed record list
+    """
+    try:
+        data = zlib.decompress(blob)
+    except zlib.error as e:
+        raise ValueError(f"Invalid packed book records. {e}")
+    version, count = HEADER.unpack_from(data, 0)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported book record format {version}.")
+
+    offset = HEADER.size
+    records = []
+    for _ in range(count):
+        record, offset = decode_record(data, offset)
+        records.append(record)
+    return records
+
+
+def pack_volumes(volumes: list[dict]) -> bytes:
+    return pack_records([BookRecord.from_volume(volume) for volume in volumes])
+
+
+def unpack_volumes(blob: bytes) -> list[dict]:
+    return [record.to_volume() for record in unpack_records(blob)]
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# sentinel so None can be cached
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a TTL.
+    Lives for as long as the Lambda container does.
+
+    Tracks hits, misses and evictions for reporting.
+    """
+    def __init__(self, max_size: int = 256, ttl: float = 15*60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes and returns the entry, or `default` when it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """
+    In-process TTLCache in front of the DynamoDB cache table.
+
+    Entries are stored in the table as "<namespace>#<key>", so every container (and
+    every guild) shares them. Values must be JSON-serializable unless `encode`/`decode`
+    are given, in which case the table stores encode(value) (e.g. compressed bytes)
+    and the memory tier keeps the decoded value.
+    """
+    def __init__(
+            self,
+            namespace: str,
+            ttl: int,
+            max_size: int = 256,
+            memory_ttl: float = None,
+            persist: bool = True,
+            encode: Callable[[Any], Any] = None,
+            decode: Callable[[Any], Any] = None
+        ):
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+        self.persist = persist
+        self.memory = TTLCache(max_size=max_size, ttl=ttl if memory_ttl is None else memory_ttl)
+        self.table_hits = 0
+        self.table_misses = 0
+
+    def table_key(self, key: str) -> str:
+        return f"{self.namespace}#{key}"
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        """
+        Returns the cached value, or `default` (MISSING) when neither tier has it.
+        Table errors are treated as misses.
+        """
+        value = self.memory.get(key, MISSING)
+        if value is not MISSING or not self.persist:
+            return default if value is MISSING else value
+
+        from utils.aws.dynamodb import read_cache_entry
+        try:
+            found, value, expires_at = read_cache_entry(self.table_key(key))
+        except Exception as e:
+            print(f"Failed to read {self.namespace} cache: {e}")
+            found = False
+        if not found:
+            self.table_misses += 1
+            return default
+
+        self.table_hits += 1
+        if self.decode and value is not None:
+            value = self.decode(value)
+        # never outlive the table entry, e.g. a short negative TTL read near its end
+        self.memory.set(key, value, ttl=min(self.memory.ttl, expires_at - time.time()))
+        return value
+
+    def set(self, key: str, value: Any, ttl: int = None) -> None:
+        """
+        Stores the value in both tiers. Table errors are logged, not raised.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=min(ttl, self.memory.ttl))
+        if not self.persist:
+            return
+
+        from utils.aws.dynamodb import put_cache_entry
+        try:
+            stored = self.encode(value) if self.encode and value is not None else value
+            put_cache_entry(self.table_key(key), stored, ttl=ttl)
+        except Exception as e:
+            print(f"Failed to write {self.namespace} cache: {e}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **{f"memory_{name}": count for name, count in self.memory.stats().items()},
+            "table_hits": self.table_hits,
+            "table_misses": self.table_misses,
+        }
@@ -0,0 +1,399 @@
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Any
+from utils.aws.lazy import LazyResource
+from utils.autocomplete import normalize
+from utils.book_record import BookRecord, encode_record, decode_record
+
+try:
+    import fcntl
+except ImportError:  # Windows, local development only
+    fcntl = None
+
+# Every volume the bot has seen, kept on local disk and searched without any network
+# call. /tmp is the only writable path on Lambda, so by default each container has
+# its own catalog; point CATALOG_DIR at a shared mount (EFS) to share one.
+CATALOG_DIR = os.environ.get("CATALOG_DIR", "/tmp/bookclub-catalog")
+# records appended after the index was built are searched from memory; past this
+# many the index is rebuilt
+CATALOG_REINDEX_AFTER = int(os.environ.get("CATALOG_REINDEX_AFTER", 256))
+
+STORE_FILE = "volumes.dat"
+INDEX_FILE = "volumes.idx"
+
+# store: append-only frames of one encoded BookRecord each
+FRAME = struct.Struct(">I")                 # byte length of the record
+# index: header, table headers, record offsets, then one sorted table per key kind
+INDEX_MAGIC = b"BCAT"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct(">4sBIQ")      # magic, version, record count, store bytes indexed
+TABLE_HEADER = struct.Struct(">IQQQ")       # key count, directory, keys and postings offsets
+DIRECTORY_ENTRY = struct.Struct(">IHII")    # key offset, key length, first posting, posting count
+RECORD_OFFSET = struct.Struct(">Q")         # where a record's frame starts in the store
+POSTING = struct.Struct(">I")               # record number
+
+# tokens: "t:<word>" of titles and "a:<word>" of authors; isbns: ISBN-13 and ISBN-10;
+# ids: Google Books volume ids
+TABLES = ("tokens", "isbns", "ids")
+ISBN_CHARACTERS = re.compile(r"[^0-9X]")
+
+
+def normalize_isbn(isbn: str) -> str:
+    return ISBN_CHARACTERS.sub("", (isbn or "").upper())
+
+
+def record_keys(record: BookRecord) -> dict[str, set[str]]:
+    tokens = {f"t:{word}" for word in normalize(record.title).split()}
+    for author in record.authors:
+        tokens.update(f"a:{word}" for word in normalize(author).split())
+    isbns = {normalize_isbn(isbn) for isbn in (record.isbn_13, record.isbn_10)} - {""}
+    return {"tokens": tokens, "isbns": isbns, "ids": {record.volume_id}}
+
+
+@contextmanager
+def _exclusive(file):
+    """
+    Holds an exclusive lock on the open store file, so containers sharing a
+    catalog directory don't interleave appends or rebuilds.
+    """
+    if fcntl:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class SortedTable:
+    """
+    One table of the memory-mapped index: keys in sorted order, each with the
+    sorted record numbers it appears in. Lookups binary search the directory in
+    place; nothing is parsed up front.
+    """
+    def __init__(self, data, count: int, directory: int, keys: int, postings: int):
+        self.data = data
+        self.count = count
+        self.directory = directory
+        self.keys = keys
+        self.postings = postings
+
+    def _entry(self, i: int) -> tuple[int, int, int, int]:
+        return DIRECTORY_ENTRY.unpack_from(self.data, self.directory + i * DIRECTORY_ENTRY.size)
+
+    def _key(self, entry: tuple[int, int, int, int]) -> bytes:
+        return self.data[self.keys + entry[0]:self.keys + entry[0] + entry[1]]
+
+    def find(self, key: str) -> tuple[int, ...]:
+        target = key.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(self._entry(middle)) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count:
+            return ()
+        entry = self._entry(low)
+        if self._key(entry) != target:
+            return ()
+        return struct.unpack_from(f">{entry[3]}I", self.data, self.postings + entry[2] * POSTING.size)
+
+
+def build_index(records: list[tuple[int, BookRecord]], store_length: int) -> bytes:
+    """
+    The index file for the store's records, given as (frame offset, record) pairs
+    in store order.
+    """
+    tables = {table: {} for table in TABLES}
+    for number, (_, record) in enumerate(records):
+        for table, keys in record_keys(record).items():
+            for key in keys:
+                tables[table].setdefault(key, []).append(number)
+
+    offset = INDEX_HEADER.size + TABLE_HEADER.size * len(TABLES)
+    parts = [RECORD_OFFSET.pack(frame) for frame, _ in records]
+    offset += RECORD_OFFSET.size * len(records)
+
+    headers = []
+    for table in TABLES:
+        entries = sorted((key.encode("utf-8"), numbers) for key, numbers in tables[table].items())
+        directory, keys, postings = [], [], []
+        key_offset = posting_count = 0
+        for key, numbers in entries:
+            directory.append(DIRECTORY_ENTRY.pack(key_offset, len(key), posting_count, len(numbers)))
+            keys.append(key)
+            postings.append(struct.pack(f">{len(numbers)}I", *numbers))
+            key_offset += len(key)
+            posting_count += len(numbers)
+        directory, keys, postings = b"".join(directory), b"".join(keys), b"".join(postings)
+        headers.append(TABLE_HEADER.pack(len(entries), offset, offset + len(directory), offset + len(directory) + len(keys)))
+        parts.extend([directory, keys, postings])
+        offset += len(directory) + len(keys) + len(postings)
+
+    return b"".join([INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(records), store_length), *headers, *parts])
+
+
+class Catalog:
+    """
+    Local book catalog: an append-only store of BookRecords (volumes.dat) and an
+    index over it (volumes.idx) with an inverted index of title and author words,
+    an exact ISBN-10/13 index and the volume ids.
+
+    Both files are memory-mapped, so opening the catalog reads the headers only and
+    a lookup touches just the pages it needs. Records appended since the index was
+    built are read into memory on open and searched alongside it; once there are
+    `reindex_after` of them the index is rebuilt and swapped in with a rename.
+    """
+    def __init__(self, directory: str = CATALOG_DIR, reindex_after: int = CATALOG_REINDEX_AFTER):
+        self.directory = directory
+        self.reindex_after = reindex_after
+        self.store_path = os.path.join(directory, STORE_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._maps: list[mmap.mmap] = []
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _map(self, path: str, length: int = 0) -> mmap.mmap | None:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def _open(self) -> None:
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+        self.index = None
+        self.indexed = 0
+        self.indexed_length = 0
+        self.tables: dict[str, SortedTable] = {}
+        self.index_id = None
+
+        index = self._map(self.index_path)
+        if index is not None:
+            magic, version, count, store_length = INDEX_HEADER.unpack_from(index, 0)
+            if magic == INDEX_MAGIC and version == INDEX_VERSION:
+                self.index = index
+                self.indexed, self.indexed_length = count, store_length
+                for i, table in enumerate(TABLES):
+                    header = TABLE_HEADER.unpack_from(index, INDEX_HEADER.size + i * TABLE_HEADER.size)
+                    self.tables[table] = SortedTable(index, *header)
+                self.index_id = os.stat(self.index_path).st_ino
+            else:
+                print(f"Ignoring catalog index with unsupported format {version}")
+        self.store = self._map(self.store_path, self.indexed_length) if self.indexed_length else None
+
+        # records appended after the index was built
+        self.pending: list[BookRecord] = []
+        self.pending_keys: dict[str, dict[str, list[int]]] = {table: {} for table in TABLES}
+        self.store_length = self.indexed_length
+        self._read_appended()
+
+    def _read_appended(self) -> None:
+        """
+        Reads the frames appended to the store (by this or another process) since
+        it was last read.
+        """
+        if not os.path.exists(self.store_path) or os.path.getsize(self.store_path) <= self.store_length:
+            return
+        with open(self.store_path, "rb") as f:
+            f.seek(self.store_length)
+            data = f.read()
+        offset = 0
+        while offset + FRAME.size <= len(data):
+            (length,) = FRAME.unpack_from(data, offset)
+            if offset + FRAME.size + length > len(data):
+                break  # a frame still being written
+            record, _ = decode_record(data, offset + FRAME.size)
+            self._remember(record)
+            offset += FRAME.size + length
+        self.store_length += offset
+
+    def _remember(self, record: BookRecord) -> None:
+        number = self.indexed + len(self.pending)
+        self.pending.append(record)
+        for table, keys in record_keys(record).items():
+            for key in keys:
+                self.pending_keys[table].setdefault(key, []).append(number)
+
+    def refresh(self) -> None:
+        """
+        Picks up a rebuilt index and records appended by other processes.
+        """
+        with self._lock:
+            try:
+                index_id = os.stat(self.index_path).st_ino
+            except FileNotFoundError:
+                index_id = None
+            if index_id != self.index_id:
+                self._open()
+            else:
+                self._read_appended()
+
+    def _postings(self, table: str, key: str) -> list[int]:
+        indexed = self.tables[table].find(key) if table in self.tables else ()
+        return [*indexed, *self.pending_keys[table].get(key, ())]
+
+    def __len__(self) -> int:
+        return self.indexed + len(self.pending)
+
+    def record(self, number: int) -> BookRecord:
+        if number >= self.indexed:
+            return self.pending[number - self.indexed]
+        (frame,) = RECORD_OFFSET.unpack_from(self.index, INDEX_HEADER.size + TABLE_HEADER.size * len(TABLES) + number * RECORD_OFFSET.size)
+        return decode_record(self.store, frame + FRAME.size)[0]
+
+    def contains(self, record: BookRecord) -> bool:
+        """
+        Whether the volume, or another volume with one of its ISBNs, is already stored.
+        """
+        keys = record_keys(record)
+        return any(self._postings(table, key) for table in ("ids", "isbns") for key in keys[table])
+
+    def add(self, records: list[BookRecord]) -> int:
+        """
+        Appends the records that aren't stored yet. Returns how many were added.
+        """
+        records = [record for record in records if record.volume_id and normalize(record.title)]
+        if not records:
+            return 0
+        with self._lock, open(self.store_path, "ab") as f, _exclusive(f):
+            self._read_appended()
+            frames = []
+            for record in records:
+                if self.contains(record):
+                    continue
+                encoded = encode_record(record)
+                frames.append(FRAME.pack(len(encoded)) + encoded)
+                self._remember(record)
+            if frames:
+                data = b"".join(frames)
+                f.write(data)
+                f.flush()
+                self.store_length += len(data)
+            if len(self.pending) >= self.reindex_after:
+                self._reindex()
+        return len(frames)
+
+    def reindex(self) -> None:
+        with self._lock, open(self.store_path, "ab") as f, _exclusive(f):
+            self._reindex()
+
+    def _reindex(self) -> None:
+        # caller holds the store lock
+        with open(self.store_path, "rb") as f:
+            data = f.read()
+        records, offset = [], 0
+        while offset + FRAME.size <= len(data):
+            (length,) = FRAME.unpack_from(data, offset)
+            if offset + FRAME.size + length > len(data):
+                break
+            records.append((offset, decode_record(data, offset + FRAME.size)[0]))
+            offset += FRAME.size + length
+
+        temporary = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(build_index(records, offset))
+        os.replace(temporary, self.index_path)
+        self._open()
+
+    def search(self, query_options: dict[str, str], limit: int) -> list[BookRecord] | None:
+        """
+        The stored volumes matching every /search option: all the words of the
+        title and author options, or the exact ISBN. Exact title matches come
+        first, then the volumes in the order they were first seen.
+
+        Returns:
+            None when the options can't be answered locally (a publisher, which
+            isn't stored, or nothing to search for)
+        """
+        if query_options.get("publisher"):
+            return None
+        keys = [("isbns", normalize_isbn(query_options["isbn"]))] if query_options.get("isbn") else []
+        for option, prefix in (("title", "t"), ("author", "a")):
+            keys += [("tokens", f"{prefix}:{word}") for word in normalize(query_options.get(option) or "").split()]
+        if not keys or any(not key for _, key in keys):
+            return None
+
+        with self._lock:
+            self.refresh()
+            matches = None
+            for table, key in keys:
+                found = set(self._postings(table, key))
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+            title = normalize(query_options.get("title") or "")
+            records = [self.record(number) for number in sorted(matches)]
+        records.sort(key=lambda record: bool(title) and normalize(record.title) != title)
+        return records[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in (self.index_path, self.store_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._open()
+
+
+# opened on first use: a PING or /hello never touches the disk
+catalog = LazyResource(lambda: Catalog(CATALOG_DIR))
+
+
+def remember_volumes(volumes: list[dict]) -> None:
+    """
+    Adds Google Books volumes (search results, selected books) to the catalog.
+    Failures are logged; the catalog is only ever a shortcut.
+    """
+    if not volumes:
+        return
+    try:
+        catalog.add([BookRecord.from_volume(volume) for volume in volumes])
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Failed to add volumes to the catalog: {e}")
+
+
+def remember_book(book: dict[str, Any]) -> None:
+    """
+    Adds a current/history book row, which has no volume id: it is stored under
+    its ISBN, unless a volume with that ISBN is already stored.
+    """
+    isbn = normalize_isbn(book.get("isbn", ""))
+    if not isbn:
+        return
+    authors = [author.strip() for author in (book.get("authors") or "").split(",") if author.strip() and author.strip() != "Unknown Author"]
+    record = BookRecord(
+        volume_id=f"isbn:{isbn}",
+        title=book.get("title", ""),
+        authors=tuple(authors),
+        isbn_13=isbn if len(isbn) == 13 else "",
+        isbn_10=isbn if len(isbn) == 10 else "",
+        thumbnail="",
+        preview_link="",
+    )
+    try:
+        catalog.add([record])
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Failed to add book to the catalog: {e}")
+
+
+def search_catalog(query_options: dict[str, str], limit: int) -> list[dict] | None:
+    """
+    Catalog.search as Google Books shaped volumes; None when the catalog can't
+    answer the query (or can't be read).
+    """
+    try:
+        records = catalog.search(query_options, limit)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Failed to search the catalog: {e}")
+        return None
+    return None if records is None else [record.to_volume() for record in records]
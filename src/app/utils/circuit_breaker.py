@@ -0,0 +1,222 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any
+from utils.telemetry import annotate, dependency
+
+# a breaker looks at the calls of the last BREAKER_WINDOW seconds and opens when at
+# least BREAKER_MIN_CALLS of them were made and BREAKER_ERROR_RATE of them failed
+BREAKER_WINDOW = float(os.environ.get("BREAKER_WINDOW", 60))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", 5))
+BREAKER_ERROR_RATE = float(os.environ.get("BREAKER_ERROR_RATE", 0.5))
+# how long an open breaker fails calls before letting one probe through
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", 30))
+# share open breakers with other containers through the cache table ("breaker#<name>")
+BREAKER_SHARED = os.environ.get("BREAKER_SHARED", "false").lower() == "true"
+# how often a container looks at the shared state
+BREAKER_SHARED_REFRESH = 10.0
+# calls kept per breaker for its error rate and latency
+BREAKER_MAX_SAMPLES = 256
+
+# calls slower than this count as failures: a dependency that answers after the
+# interaction has given up is as bad as one that doesn't answer
+SLOW_CALL_MS = {
+    "google_books": 4000,
+    "dictionary": 4000,
+    "discord": 5000,
+    "huggingface": 10000,
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DependencyUnavailable(Exception):
+    """
+    Raised instead of calling a dependency whose breaker is open.
+    """
+    def __init__(self, dependency: str, retry_in: float):
+        self.dependency = dependency
+        self.retry_in = retry_in
+        super().__init__(f"{dependency} is unavailable, retry in {retry_in:.0f}s.")
+
+
+class CircuitBreaker:
+    """
+    Per-container breaker and rolling health of one dependency.
+
+    closed: calls go through and their outcome is recorded. open: calls fail at once
+    with DependencyUnavailable until `open_seconds` have passed. half_open: a single
+    probe call goes through; it closes the breaker if it succeeds, reopens it if not.
+    """
+    def __init__(
+            self,
+            name: str,
+            window: float = BREAKER_WINDOW,
+            min_calls: int = BREAKER_MIN_CALLS,
+            error_rate: float = BREAKER_ERROR_RATE,
+            open_seconds: float = BREAKER_OPEN_SECONDS,
+            slow_call_ms: float = None,
+            shared: bool = BREAKER_SHARED
+        ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.slow_call_ms = slow_call_ms or SLOW_CALL_MS.get(name, 5000)
+        self.shared = shared
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.opened = 0
+        self.rejected = 0
+        # (time, failed, latency_ms)
+        self.samples: deque[tuple[float, bool, float]] = deque(maxlen=BREAKER_MAX_SAMPLES)
+        self._probing = False
+        self._next_shared_check = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            DependencyUnavailable when the breaker is open (or already probing)
+        """
+        now = time.time()
+        if self.shared and self.state == CLOSED and now >= self._next_shared_check:
+            self._read_shared(now)
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and now >= self.open_until:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_in = max(self.open_until - now, 0)
+        raise DependencyUnavailable(self.name, retry_in)
+
+    def record(self, failed: bool, latency_ms: float) -> None:
+        now = time.time()
+        failed = failed or latency_ms > self.slow_call_ms
+        opened = False
+        with self._lock:
+            self.samples.append((now, failed, latency_ms))
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    opened = self._open(now)
+                else:
+                    self._close()
+            elif self.state == CLOSED and failed:
+                calls, errors = self._counts(now)
+                if calls >= self.min_calls and errors / calls >= self.error_rate:
+                    opened = self._open(now)
+        if opened and self.shared:
+            self._write_shared()
+
+    def _open(self, now: float) -> bool:
+        self.state = OPEN
+        self.open_until = now + self.open_seconds
+        self.opened += 1
+        print(f"Circuit breaker {self.name} opened for {self.open_seconds:.0f}s")
+        return True
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.samples.clear()
+        print(f"Circuit breaker {self.name} closed")
+
+    def _counts(self, now: float) -> tuple[int, int]:
+        recent = [failed for at, failed, _ in self.samples if now - at <= self.window]
+        return len(recent), sum(recent)
+
+    def _read_shared(self, now: float) -> None:
+        from utils.aws.dynamodb import get_cache_entry
+        self._next_shared_check = now + BREAKER_SHARED_REFRESH
+        try:
+            found, value = get_cache_entry(f"breaker#{self.name}")
+        except Exception as e:
+            print(f"Failed to read shared circuit breaker {self.name}: {e}")
+            return
+        if found and value["open_until"] > now:
+            with self._lock:
+                if self.state == CLOSED:
+                    self.state = OPEN
+                    self.open_until = value["open_until"]
+
+    def _write_shared(self) -> None:
+        from utils.aws.dynamodb import put_cache_entry
+        try:
+            put_cache_entry(f"breaker#{self.name}", {"open_until": self.open_until}, ttl=math.ceil(self.open_seconds))
+        except Exception as e:
+            print(f"Failed to share circuit breaker {self.name}: {e}")
+
+    def health(self) -> dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            recent = [(failed, latency) for at, failed, latency in self.samples if now - at <= self.window]
+            health = {"state": self.state, "opened": self.opened, "rejected": self.rejected, "calls": len(recent)}
+        if recent:
+            latencies = sorted(latency for _, latency in recent)
+            health.update({
+                "error_rate": round(sum(failed for failed, _ in recent) / len(recent), 3),
+                "p50_ms": round(latencies[len(latencies) // 2], 1),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+            })
+        return health
+
+
+breakers: dict[str, CircuitBreaker] = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = breakers.get(name)
+    if breaker is None:
+        with breakers_lock:
+            breaker = breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+@contextmanager
+def guarded(name: str, operation: str):
+    """
+    utils.telemetry.dependency behind the dependency's circuit breaker: fails fast
+    with DependencyUnavailable while the breaker is open, otherwise times the call
+    and records whether it failed (exception, 5xx or slower than SLOW_CALL_MS).
+    429s are left to the callers' rate limit handling. Deadline-bounded timeouts are
+    computed before entering, so an invocation running out of time (DeadlineExceeded)
+    isn't counted against the dependency.
+
+        timeout = bounded_timeout(GOOGLE_BOOKS_TIMEOUT)
+        with guarded("google_books", "volumes.list") as call:
+            response = requests.get(..., timeout=timeout)
+            call.status_code = response.status_code
+    """
+    breaker = get_breaker(name)
+    try:
+        breaker.before_call()
+    except DependencyUnavailable:
+        annotate(unavailable=name)
+        raise
+
+    started = time.perf_counter()
+    failed = True
+    try:
+        with dependency(name, operation) as call:
+            yield call
+        failed = isinstance(call.status_code, int) and call.status_code >= 500
+    finally:
+        breaker.record(failed, (time.perf_counter() - started) * 1000)
+
+
+def dependency_health() -> dict[str, dict[str, Any]]:
+    """
+    Breaker state, error rate and latency per dependency (this container only).
+    """
+    return {name: breaker.health() for name, breaker in sorted(breakers.items())}
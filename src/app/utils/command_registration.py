@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+# guild registrations in flight at once; each guild is its own rate limit bucket
+DEFAULT_CONCURRENCY = 8
+
+# fields compared between discord_commands.yaml and what Discord has registered;
+# everything else Discord returns (id, version, application_id, ...) is ignored
+COMMAND_FIELDS = ("name", "description", "type", "options", "default_member_permissions", "nsfw")
+OPTION_FIELDS = (
+    "type", "name", "description", "required", "choices", "options", "autocomplete",
+    "channel_types", "min_value", "max_value", "min_length", "max_length",
+)
+COMMAND_DEFAULTS = {"type": 1}
+
+
+class CommandDiff(NamedTuple):
+    created: list[str]
+    updated: list[str]
+    deleted: list[str]
+    unchanged: list[str]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.deleted)
+
+    def describe(self) -> str:
+        if not self.changed:
+            return f"up to date ({len(self.unchanged)} commands)"
+        changes = [f"+{name}" for name in self.created] + [f"~{name}" for name in self.updated] + [f"-{name}" for name in self.deleted]
+        return " ".join(changes)
+
+
+class SyncResult(NamedTuple):
+    scope: str                  # "global" or the guild id
+    diff: CommandDiff | None    # None when the registered commands couldn't be read
+    applied: bool
+    error: str | None = None
+
+
+def _canonical(item: dict[str, Any], fields: tuple[str, ...], defaults: dict[str, Any] = None) -> dict[str, Any]:
+    """
+    The compared fields of a command or option, with unset and default values
+    (None, False, []) dropped so the YAML and Discord's response line up.
+    """
+    defaults = defaults or {}
+    canonical = {}
+    for field in fields:
+        value = item.get(field, defaults.get(field))
+        if field == "options":
+            value = [_canonical(option, OPTION_FIELDS) for option in value or []]
+        elif field == "choices":
+            value = [{"name": choice["name"], "value": choice["value"]} for choice in value or []]
+        # not `in (None, False, [])`: 0 == False would drop a min_value of 0
+        if not (value is None or value is False or value == []):
+            canonical[field] = value
+    return canonical
+
+
+def canonical_command(command: dict[str, Any]) -> dict[str, Any]:
+    return _canonical(command, COMMAND_FIELDS, COMMAND_DEFAULTS)
+
+
+def diff_commands(local: list[dict[str, Any]], registered: list[dict[str, Any]]) -> CommandDiff:
+    """
+    Compares the commands in discord_commands.yaml with the registered ones by name.
+    """
+    local_by_name = {command["name"]: canonical_command(command) for command in local}
+    registered_by_name = {command["name"]: canonical_command(command) for command in registered}
+    created = [name for name in local_by_name if name not in registered_by_name]
+    deleted = [name for name in registered_by_name if name not in local_by_name]
+    updated = [name for name, command in local_by_name.items() if name in registered_by_name and registered_by_name[name] != command]
+    unchanged = [name for name, command in local_by_name.items() if registered_by_name.get(name) == command]
+    return CommandDiff(created, updated, deleted, unchanged)
+
+
+def commands_path(application_id: str, guild_id: str = None) -> str:
+    if guild_id:
+        return f"/applications/{application_id}/guilds/{guild_id}/commands"
+    return f"/applications/{application_id}/commands"
+
+
+def sync_commands(discord, application_id: str, commands: list[dict[str, Any]], guild_id: str = None, dry_run: bool = False) -> SyncResult:
+    """
+    Reads the registered commands (one GET) and, only if they differ from `commands`,
+    replaces all of them with one bulk overwrite PUT. Commands missing from
+    `commands` are deleted by the overwrite.
+
+    Input:
+        discord: a utils.discord_client.DiscordClient
+        guild_id: register guild scoped commands (instant, for testing) instead of global ones
+        dry_run: only compute the diff
+    """
+    scope = guild_id or "global"
+    path = commands_path(application_id, guild_id)
+    diff = None
+    try:
+        response = discord.get(path)
+        response.raise_for_status()
+        diff = diff_commands(commands, response.json())
+        if not diff.changed or dry_run:
+            return SyncResult(scope, diff, applied=False)
+
+        response = discord.put(path, json=commands)
+        response.raise_for_status()
+        return SyncResult(scope, diff, applied=True)
+    except Exception as e:
+        return SyncResult(scope, diff, applied=False, error=str(e))
+
+
+def sync_guilds(
+        discord,
+        application_id: str,
+        commands: list[dict[str, Any]],
+        guild_ids: list[str],
+        dry_run: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY
+    ) -> list[SyncResult]:
+    """
+    sync_commands for many guilds at once, at most `concurrency` at a time. The
+    client's rate limit handling keeps each guild within its own bucket and backs
+    off on global 429s. Results are in the order of guild_ids.
+    """
+    if not guild_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(guild_ids))) as executor:
+        return list(executor.map(
+            lambda guild_id: sync_commands(discord, application_id, commands, guild_id=guild_id, dry_run=dry_run),
+            guild_ids,
+        ))
@@ -0,0 +1,78 @@
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+from utils.deadline import remaining as deadline_remaining
+
+# a single interaction never fans out to more than a handful of calls
+MAX_WORKERS = 4
+DEFAULT_TASK_TIMEOUT = 8.0
+
+
+class TaskResults:
+    """
+    Outcome of run_concurrently: return values of the tasks that succeeded and
+    the exception (or TimeoutError) of every task that didn't.
+    """
+    def __init__(self):
+        self.results: dict[str, Any] = {}
+        self.errors: dict[str, Exception] = {}
+
+    def ok(self, name: str) -> bool:
+        return name in self.results
+
+    def status(self, name: str) -> str:
+        """
+        "ok" when the task succeeded, otherwise the error message
+        """
+        return "ok" if self.ok(name) else str(self.errors.get(name, "not run"))
+
+
+def run_concurrently(
+        tasks: dict[str, Callable[[], Any]],
+        timeouts: dict[str, float] = None,
+        default_timeout: float = DEFAULT_TASK_TIMEOUT,
+        max_workers: int = MAX_WORKERS
+    ) -> TaskResults:
+    """
+    Runs independent side effects on a bounded thread pool so the total wall-clock
+    time is roughly the slowest call instead of the sum of all of them.
+
+    Input:
+        tasks: task name -> zero-argument callable
+        timeouts: optional task name -> seconds, measured from when the batch starts
+        default_timeout: timeout for tasks not listed in timeouts
+        (every timeout is cut to the invocation's deadline, see utils.deadline)
+        max_workers: upper bound on threads
+
+    Output:
+        TaskResults with each task's return value or exception. Tasks that time out
+        are recorded with a TimeoutError and left to finish in the background.
+    """
+    timeouts = timeouts or {}
+    outcome = TaskResults()
+    if not tasks:
+        return outcome
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(tasks)))
+    started = time.monotonic()
+    left = deadline_remaining()
+    try:
+        # each task runs in a copy of the caller's context so it stays in the interaction's trace
+        futures = {name: executor.submit(copy_context().run, func) for name, func in tasks.items()}
+        for name, future in futures.items():
+            timeout = timeouts.get(name, default_timeout)
+            if left is not None:
+                timeout = min(timeout, left)
+            remaining = timeout - (time.monotonic() - started)
+            try:
+                outcome.results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                outcome.errors[name] = TimeoutError(f"{name} timed out after {timeout:.2f}s")
+            except Exception as e:
+                outcome.errors[name] = e
+    finally:
+        # don't block the interaction on tasks that timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return outcome
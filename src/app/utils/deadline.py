@@ -0,0 +1,72 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# kept back from the Lambda timeout to log, emit metrics and return a response
+DEADLINE_MARGIN = float(os.environ.get("DEADLINE_MARGIN", 0.5))
+
+# monotonic time by which the current invocation has to be done, None when unbounded
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised instead of starting an outbound call once the invocation's time is up.
+    """
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Bounds outbound calls made inside the block (and in tasks started with
+    run_concurrently, which copy the context) to `seconds` from now. A scope never
+    extends an enclosing deadline.
+    """
+    deadline = time.monotonic() + seconds
+    enclosing = _deadline.get()
+    token = _deadline.set(deadline if enclosing is None else min(deadline, enclosing))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def lambda_deadline(context, margin: float = DEADLINE_MARGIN):
+    """
+    deadline_scope for the rest of a Lambda invocation, from the context's remaining
+    time. Without a Lambda context (Flask, tests, benchmarks) calls are only bounded
+    by their own timeouts.
+    """
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining is None:
+        yield
+        return
+    with deadline_scope(get_remaining() / 1000 - margin):
+        yield
+
+
+def remaining() -> float | None:
+    """
+    Seconds left before the current deadline, None when there is none.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded_timeout(timeout: float | tuple[float, float]) -> float | tuple[float, float]:
+    """
+    A requests timeout (seconds or (connect, read)) no longer than the time left.
+
+    Raises:
+        DeadlineExceeded when the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline passed {-left:.2f}s ago.")
+    if isinstance(timeout, tuple):
+        return tuple(min(part, left) for part in timeout)
+    return min(timeout, left)
@@ -0,0 +1,66 @@
+import os
+import threading
+from utils.aws.lambda_invoke import invoke_self_async
+from utils.telemetry import interaction_span
+
+# name -> function(payload) for work that runs after the interaction has been ACKed
+DEFERRED_STAGES = {}
+
+
+def deferred_stage(name):
+    """
+    Registers a function as a deferred stage that can be dispatched by name.
+    """
+    def decorator(func):
+        DEFERRED_STAGES[name] = func
+        return func
+    return decorator
+
+
+def dispatch_deferred(stage, payload):
+    """
+    Runs a registered stage in the background so the interaction can be answered right away.
+
+    On Lambda the container is frozen as soon as the response is returned, so the stage is
+    handed to an asynchronous invocation of this same function. Locally (flask app.run) it
+    runs on a daemon thread instead.
+
+    Input:
+        stage: name the stage was registered with
+        payload: JSON-serializable dict passed to the stage
+
+    Raises:
+        Exception when the stage isn't registered
+    """
+    if stage not in DEFERRED_STAGES:
+        raise Exception(f"Unknown deferred stage {stage}.")
+
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        invoke_self_async({"deferred": {"stage": stage, "payload": payload}})
+        return
+
+    thread = threading.Thread(target=run_stage, args=(stage, payload), daemon=True)
+    thread.start()
+
+
+def run_stage(stage, payload):
+    """
+    Runs a registered stage inside its own span ("deferred:<stage>").
+    """
+    with interaction_span(f"deferred:{stage}"):
+        DEFERRED_STAGES[stage](payload)
+
+
+def is_deferred_event(event):
+    return isinstance(event, dict) and "deferred" in event
+
+
+def run_deferred_event(event):
+    """
+    Entry point for the asynchronous invocation created by dispatch_deferred.
+    """
+    stage = event["deferred"]["stage"]
+    payload = event["deferred"]["payload"]
+    if stage not in DEFERRED_STAGES:
+        raise Exception(f"Unknown deferred stage {stage}.")
+    run_stage(stage, payload)
@@ -0,0 +1,78 @@
+import os
+import requests
+from config import DICTIONARY_API_URL
+from utils.cache import TieredCache, MISSING
+from utils.circuit_breaker import guarded
+from utils.deadline import bounded_timeout
+
+# definitions are cached as the embed fields /define replies with
+DEFINITION_CACHE_TTL = int(os.environ.get("DEFINITION_CACHE_TTL", 7*24*60*60))
+# misspellings and unknown words are cached too, for a shorter time
+DEFINITION_NEGATIVE_TTL = int(os.environ.get("DEFINITION_NEGATIVE_TTL", 60*60))
+DEFINITION_CACHE_SIZE = int(os.environ.get("DEFINITION_CACHE_SIZE", 512))
+DICTIONARY_TIMEOUT = (3.05, 5)
+MAX_DEFS_PER_POS = 3
+
+definition_cache = TieredCache(
+    "define",
+    ttl=DEFINITION_CACHE_TTL,
+    max_size=DEFINITION_CACHE_SIZE,
+    persist=os.environ.get("PERSIST_DEFINITION_CACHE", "true").lower() == "true",
+)
+
+
+def definition_fields(entries):
+    """
+    Turns a Dictionary API response into embed fields, at most MAX_DEFS_PER_POS
+    definitions per part of speech. Returns None if the response has no meanings.
+    """
+    if not entries or not isinstance(entries, list) or "meanings" not in entries[0]:
+        return None
+
+    # Organize definitions
+    definitions_by_pos = {}
+    for meaning in entries[0]["meanings"]:
+        pos = meaning.get("partOfSpeech", "Unknown").capitalize()
+        definitions = [entry.get("definition", "") for entry in meaning.get("definitions", [])]
+        definitions_by_pos.setdefault(pos, []).extend(definitions)
+
+    # Convert to embed fields
+    fields = []
+    for part_of_speech, definitions in definitions_by_pos.items():
+        definitions = definitions[:MAX_DEFS_PER_POS]
+        value = "\n".join([f"{idx + 1}. {definition}" for idx, definition in enumerate(definitions)])
+        fields.append({
+            "name": part_of_speech,
+            "value": value if value else "*No definitions available.*",
+            "inline": False
+        })
+    return fields
+
+
+def lookup_definition(word):
+    """
+    Looks up a word, served from the definition cache when possible.
+
+    Returns:
+        list | None: embed fields for the word, or None if it has no definitions
+    """
+    key = word.strip().lower()
+    fields = definition_cache.get(key)
+    if fields is not MISSING:
+        return fields
+
+    timeout = bounded_timeout(DICTIONARY_TIMEOUT)
+    with guarded("dictionary", "entries") as call:
+        response = requests.get(url=f"{DICTIONARY_API_URL}{key}", timeout=timeout)
+        call.status_code = response.status_code
+
+    if response.status_code == 404:
+        fields = None
+    elif not response.ok:
+        # don't cache upstream errors
+        return None
+    else:
+        fields = definition_fields(response.json())
+
+    definition_cache.set(key, fields, ttl=DEFINITION_CACHE_TTL if fields else DEFINITION_NEGATIVE_TTL)
+    return fields
@@ -1,17 +1,34 @@
 import os
-import requests
+import threading
 from datetime import datetime
-from utils.utils import make_announcement_payload, get_ordinal
-from utils.huggingface.textgeneration import query as hf_query
-
-DISCORD_API_BASE = "https://discord.com/api/v10"
+from utils.utils import make_announcement_payload, render_announcement, get_ordinal
+from utils.huggingface.textgeneration import query as hf_query, HF_TIMEOUT
+from utils.deadline import remaining
+from utils.telemetry import annotate
+from utils.cache import TTLCache
+from utils.discord_client import DiscordClient
+from utils.aws.dynamodb import cache_channel_directory, get_cached_channel_directory, delete_cached_channel_directory
 
 BOT_TOKEN = os.environ.get("DISCORD_TOKEN") 
 
-HEADERS = {
-    "Authorization": f"Bot {BOT_TOKEN}",
-    "Content-Type": "application/json"
-}
+# one pooled, rate-limit-aware client per container
+discord = DiscordClient(BOT_TOKEN)
+
+# channel types
+GUILD_TEXT = 0
+GUILD_VOICE = 2
+GUILD_ANNOUNCEMENT = 5
+
+# guild_id -> {"<type>:<lowercased name>": channel_id}
+CHANNEL_DIRECTORY_TTL = int(os.environ.get("CHANNEL_DIRECTORY_TTL", 10*60))
+PERSIST_CHANNEL_DIRECTORY = os.environ.get("PERSIST_CHANNEL_DIRECTORY", "true").lower() == "true"
+channel_directories = TTLCache(max_size=512, ttl=CHANNEL_DIRECTORY_TTL)
+channel_directory_lock = threading.Lock()
+
+# announcements only wait for the LLM when at least this many seconds are left
+# after keeping ANNOUNCEMENT_POST_SECONDS back to post the message
+ANNOUNCEMENT_LLM_MIN_SECONDS = float(os.environ.get("ANNOUNCEMENT_LLM_MIN_SECONDS", 2.0))
+ANNOUNCEMENT_POST_SECONDS = 1.0
 
 def create_guild_event(guild_id, name, description, start_time, end_time=None, channel_id=None, location=None):
     """
@@ -21,7 +38,7 @@ def create_guild_event(guild_id, name, description, start_time, end_time=None, c
     """
     if channel_id is None:
         channel_id = get_general_voice_channel_id(guild_id)
-    url = f"{DISCORD_API_BASE}/guilds/{guild_id}/scheduled-events"
+    path = f"/guilds/{guild_id}/scheduled-events"
     payload = {
         "name": name,
         "description": description,
@@ -35,7 +52,10 @@ def create_guild_event(guild_id, name, description, start_time, end_time=None, c
         payload["channel_id"] = channel_id
     if location:
         payload["entity_metadata"] = {"location": location}
-    response = requests.post(url, headers=HEADERS, json=payload)
+    response = discord.post(path, json=payload)
+    if response.status_code in (400, 404) and channel_id:
+        # the cached voice channel may be gone
+        invalidate_channel_directory(guild_id)
     response.raise_for_status()
     return response.json()
 
@@ -43,8 +63,8 @@ def update_guild_event(guild_id, event_id, **kwargs):
     """
     Update a Discord scheduled event. kwargs can include any updatable event fields.
     """
-    url = f"{DISCORD_API_BASE}/guilds/{guild_id}/scheduled-events/{event_id}"
-    response = requests.patch(url, headers=HEADERS, json=kwargs)
+    path = f"/guilds/{guild_id}/scheduled-events/{event_id}"
+    response = discord.patch(path, json=kwargs)
     response.raise_for_status()
     return response.json()
 
@@ -53,22 +73,15 @@ def get_general_voice_channel_id(guild_id):
     Fetches the ID of the 'General' voice channel for the given guild.
     Returns None if not found.
     """
-    url = f"{DISCORD_API_BASE}/guilds/{guild_id}/channels"
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    channels = response.json()
-    for channel in channels:
-        if channel["type"] == 2 and channel["name"].lower() == "general":
-            return channel["id"]
-    return None
+    return find_channel_id(guild_id, [GUILD_VOICE], "general")
 
 def delete_guild_event(guild_id, event_id):
     """
     Delete a Discord scheduled event if it exists.
     Returns True if deleted, False if not found, raises for other errors.
     """
-    url = f"{DISCORD_API_BASE}/guilds/{guild_id}/scheduled-events/{event_id}"
-    response = requests.delete(url, headers=HEADERS)
+    path = f"/guilds/{guild_id}/scheduled-events/{event_id}"
+    response = discord.delete(path)
     if response.status_code == 404:
         # Event does not exist, nothing to delete
         return False
@@ -89,19 +102,15 @@ def create_discussion_thread(guild_id, thread_name, book_title, dt, section):
     year = dt.year
     formatted_date = f"{weekday}, {month} {day} {year}"
 
-    url = f"{DISCORD_API_BASE}/channels/{channel_id}/threads"
+    path = f"/channels/{channel_id}/threads"
     thread_name = f"{formatted_date} - {book_title}"
     payload = {
         "name": thread_name,
         "type": 11  # Public thread
         # No auto_archive_duration field
     }
-    headers = {
-        "Authorization": f"Bot {BOT_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()
+    response = discord.post(path, json=payload)
+    raise_for_channel_status(guild_id, response)
     thread = response.json()
 
 
@@ -112,39 +121,128 @@ def create_discussion_thread(guild_id, thread_name, book_title, dt, section):
         "Happy Reading 📖"
     )
     thread_id = thread["id"]
-    message_url = f"{DISCORD_API_BASE}/channels/{thread_id}/messages"
+    message_path = f"/channels/{thread_id}/messages"
     message_payload = {"content": message_content}
-    message_response = requests.post(message_url, headers=headers, json=message_payload)
+    message_response = discord.post(message_path, json=message_payload)
     message_response.raise_for_status()
 
-def create_event_announcement(guild_id, payload):
+def announcement_text(context, book, section, dt, time_str):
+    """
+    LLM-written announcement (see make_announcement_payload), or the local template
+    when the invocation's deadline leaves too little time for Hugging Face or the
+    call fails, so a slow LLM can't hold up the announcement.
+    """
+    left = remaining()
+    llm_budget = None if left is None else left - ANNOUNCEMENT_POST_SECONDS
+    if llm_budget is None or llm_budget >= ANNOUNCEMENT_LLM_MIN_SECONDS:
+        timeout = HF_TIMEOUT if llm_budget is None else (min(HF_TIMEOUT[0], llm_budget), min(HF_TIMEOUT[1], llm_budget))
+        try:
+            return hf_query(make_announcement_payload(context, book, section, dt, time_str), timeout=timeout)
+        except Exception as e:
+            print(f"Failed to generate {context} announcement, using the template: {e}")
+    annotate(announcement="template")
+    return render_announcement(context, book, section, dt, time_str)
+
+def create_event_announcement(guild_id, context, book, section=None, dt=None, time_str=None):
     """
     Post an announcement in the 'announcements' channel about the upcoming book discussion.
+    `context` is FIRST, FOLLOW_UP or FINISH (see make_announcement_payload).
     """
     # announcements channel
     channel_id = get_channel_id_by_name(guild_id, "announcements")
     if channel_id is None:
         raise ValueError("Announcements channel not found in guild")
 
-    url = f"{DISCORD_API_BASE}/channels/{channel_id}/messages"
-    message_content = f"@everyone\n\n{hf_query(payload)}"
-    # message_content = f"{hf_query(payload)}"
+    path = f"/channels/{channel_id}/messages"
+    message_content = f"@everyone\n\n{announcement_text(context, book, section, dt, time_str)}"
     hf_response = {"content": message_content}
 
-    response = requests.post(url, headers=HEADERS, json=hf_response)
-    response.raise_for_status()
+    response = discord.post(path, json=hf_response)
+    raise_for_channel_status(guild_id, response)
 
 def get_channel_id_by_name(guild_id, channel_name):
     """
     Fetches the ID of a text channel by name for the given guild.
     Returns None if not found.
     """
-    url = f"{DISCORD_API_BASE}/guilds/{guild_id}/channels"
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    channels = response.json()
-    for channel in channels:
-        if channel["type"] in [0, 5] and channel["name"].lower() == channel_name.lower():
-            return channel["id"]
+    return find_channel_id(guild_id, [GUILD_TEXT, GUILD_ANNOUNCEMENT], channel_name)
+
+def channel_directory_key(channel_type, channel_name):
+    return f"{channel_type}:{channel_name.lower()}"
+
+def get_channel_directory(guild_id):
+    """
+    Returns the guild's channel directory ("<type>:<lowercased name>" -> channel id).
+    Served from memory, then the cache table, and only listed from Discord on a miss.
+    """
+    directory = channel_directories.get(guild_id)
+    if directory is not None:
+        return directory
+
+    # concurrent side effects ask for channels at the same time; list the guild once
+    with channel_directory_lock:
+        directory = channel_directories.get(guild_id)
+        if directory is not None:
+            return directory
+
+        if PERSIST_CHANNEL_DIRECTORY:
+            try:
+                directory = get_cached_channel_directory(guild_id)
+            except Exception as e:
+                print(f"Failed to read cached channels: {e}")
+
+        if directory is None:
+            path = f"/guilds/{guild_id}/channels"
+            response = discord.get(path)
+            response.raise_for_status()
+            directory = {}
+            for channel in response.json():
+                # keep the first channel when names collide, like the old linear scan did
+                directory.setdefault(channel_directory_key(channel["type"], channel["name"]), channel["id"])
+            if PERSIST_CHANNEL_DIRECTORY:
+                try:
+                    cache_channel_directory(guild_id, directory, ttl=CHANNEL_DIRECTORY_TTL)
+                except Exception as e:
+                    print(f"Failed to cache channels: {e}")
+
+        channel_directories.set(guild_id, directory)
+        return directory
+
+def find_channel_id(guild_id, channel_types, channel_name):
+    directory = get_channel_directory(guild_id)
+    for channel_type in channel_types:
+        channel_id = directory.get(channel_directory_key(channel_type, channel_name))
+        if channel_id:
+            return channel_id
     return None
 
+def invalidate_channel_directory(guild_id):
+    """
+    Drops a guild's cached channels, e.g. after a cached channel returned 404.
+    """
+    channel_directories.delete(guild_id)
+    if PERSIST_CHANNEL_DIRECTORY:
+        try:
+            delete_cached_channel_directory(guild_id)
+        except Exception as e:
+            print(f"Failed to delete cached channels: {e}")
+
+def raise_for_channel_status(guild_id, response):
+    """
+    raise_for_status for requests against a cached channel; a 404 means the channel
+    was deleted or renamed, so the guild's directory is invalidated first.
+    """
+    if response.status_code == 404:
+        invalidate_channel_directory(guild_id)
+    response.raise_for_status()
+
+def edit_original_response(application_id, interaction_token, content):
+    """
+    Edits the original response of an interaction through the follow-up webhook.
+    Used to replace the "thinking..." state left by a deferred (type 5) response.
+    """
+    path = f"/webhooks/{application_id}/{interaction_token}/messages/@original"
+    # interaction webhooks are authorized by the token in the path, not the bot token
+    response = discord.patch(path, auth=False, json={"content": content})
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,231 @@
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.telemetry import dependency
+from utils.circuit_breaker import guarded
+from utils.deadline import bounded_timeout, remaining
+
+DISCORD_API_BASE = "https://discord.com/api/v10"
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+MAX_RETRIES = 3
+# never sleep longer than this for a rate limit, fail instead
+MAX_RATE_LIMIT_WAIT = 10.0
+
+# ids that are "major parameters" in Discord's rate limiting; other ids are collapsed
+# (guild scoped application commands are limited per guild too, and webhooks,
+# interaction responses included, per webhook id and token)
+MAJOR_PARAMETERS = re.compile(r"^(/applications/\d+)?/(channels/\d+|guilds/\d+|webhooks/\d+(/[\w-]{20,})?)")
+MAJOR_IN_ROUTE = re.compile(r"/(channels/\d+|guilds/\d+|webhooks/\d+(/[\w-]{20,})?)")
+SNOWFLAKE = re.compile(r"/\d{15,21}")
+# buckets kept before the ones whose window is over are dropped (every interaction
+# token has its own)
+MAX_BUCKETS = 256
+
+
+class RateLimitedError(Exception):
+    """
+    Raised when a request is still rate limited after MAX_RETRIES, or when the
+    required wait is longer than MAX_RATE_LIMIT_WAIT.
+    """
+    def __init__(self, route: str, retry_after: float):
+        self.route = route
+        self.retry_after = retry_after
+        super().__init__(f"Rate limited on {route}, retry after {retry_after:.2f}s.")
+
+
+class RateLimitBucket:
+    def __init__(self):
+        self.remaining = None
+        self.reset_at = 0.0
+        # guards remaining/reset_at; only held while a request takes its slot
+        self.lock = threading.Lock()
+        # held for the whole request while the limits are unknown or nearly used up
+        self.exclusive = threading.Lock()
+
+    def delay(self) -> float:
+        if self.remaining == 0 and self.reset_at > time.time():
+            return self.reset_at - time.time()
+        return 0.0
+
+    def take(self) -> bool:
+        """
+        Counts a request against the bucket when it has more than one left. False when
+        the limits are unknown or nearly used up: the request then has to go alone, so
+        the next one sees its headers.
+        """
+        if self.remaining is None or self.remaining <= 1:
+            return False
+        self.remaining -= 1
+        return True
+
+    def expired(self, now: float) -> bool:
+        return self.reset_at <= now and not self.exclusive.locked()
+
+
+class DiscordClient:
+    """
+    Discord REST client shared by the Lambda and the command registration script.
+
+    Keeps one keep-alive session, tracks X-RateLimit-* headers per route bucket,
+    honours the global rate limit, retries 429s after retry_after and sets explicit
+    connect/read timeouts on every call, cut to the invocation's deadline if one is set.
+    """
+    def __init__(
+            self,
+            token: str = None,
+            api_base: str = DISCORD_API_BASE,
+            timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+            max_retries: int = MAX_RETRIES,
+            pool_size: int = 10
+        ):
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.auth_headers = {"Authorization": f"Bot {token}"} if token else {}
+        # route -> bucket hash from X-RateLimit-Bucket, bucket hash -> state
+        self._route_buckets: dict[str, str] = {}
+        self._buckets: dict[str, RateLimitBucket] = {}
+        self._global_reset_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route_for(method: str, path: str) -> str:
+        """
+        Rate limit route key: method + path with every id but the major parameter collapsed.
+        """
+        major = MAJOR_PARAMETERS.match(path)
+        if major:
+            prefix = major.group(0)
+            return f"{method} {prefix}{SNOWFLAKE.sub('/:id', path[len(prefix):])}"
+        return f"{method} {SNOWFLAKE.sub('/:id', path)}"
+
+    def _bucket(self, route: str) -> RateLimitBucket:
+        with self._lock:
+            key = self._route_buckets.get(route, route)
+            if key not in self._buckets and len(self._buckets) >= MAX_BUCKETS:
+                self._prune()
+            return self._buckets.setdefault(key, RateLimitBucket())
+
+    def _prune(self) -> None:
+        """
+        Drops the buckets whose rate limit window is over (their state no longer
+        matters) and the routes pointing at them. Called with self._lock held.
+        """
+        now = time.time()
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.expired(now)}
+        self._route_buckets = {route: key for route, key in self._route_buckets.items() if key in self._buckets}
+
+    def _wait(self, route: str, delay: float) -> None:
+        if delay <= 0:
+            return
+        left = remaining()
+        # no point waiting for a window that opens after the invocation is over
+        if delay > MAX_RATE_LIMIT_WAIT or (left is not None and delay >= left):
+            raise RateLimitedError(route, delay)
+        # time lost to rate limits shows up next to the calls themselves
+        with dependency("discord", f"{route} (rate limit wait)"):
+            time.sleep(delay)
+
+    def _update_bucket(self, route: str, response: requests.Response) -> None:
+        headers = response.headers
+        bucket_hash = headers.get("X-RateLimit-Bucket")
+        if bucket_hash:
+            # a bucket is shared by routes with the same hash but counted per major parameter
+            major = MAJOR_IN_ROUTE.search(route)
+            if major:
+                bucket_hash = f"{bucket_hash}{major.group(0)}"
+            with self._lock:
+                if self._route_buckets.get(route) != bucket_hash:
+                    self._route_buckets[route] = bucket_hash
+                    self._buckets.setdefault(bucket_hash, self._buckets.pop(route, RateLimitBucket()))
+        bucket = self._bucket(route)
+        with bucket.lock:
+            if "X-RateLimit-Remaining" in headers:
+                bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset-After" in headers:
+                bucket.reset_at = time.time() + float(headers["X-RateLimit-Reset-After"])
+
+    def request(self, method: str, path: str, auth: bool = True, **kwargs) -> requests.Response:
+        """
+        Sends a request to `api_base + path` and returns the response.
+        Callers are expected to call raise_for_status like with plain requests.
+
+        Raises:
+            RateLimitedError when the request can't get through the rate limit
+            requests.RequestException on connection errors and timeouts
+            DeadlineExceeded when the invocation's deadline has passed
+            DependencyUnavailable while Discord's circuit breaker is open
+        """
+        method = method.upper()
+        route = self.route_for(method, path)
+        url = f"{self.api_base}{path}"
+        headers = {**(self.auth_headers if auth else {}), **kwargs.pop("headers", {})}
+        timeout = kwargs.pop("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            self._wait(route, self._global_reset_at - time.time())
+            bucket = self._bucket(route)
+            with bucket.lock:
+                self._wait(route, bucket.delay())
+                reserved = bucket.take()
+            # one request per bucket at a time only while it is close to its limit
+            if not reserved:
+                bucket.exclusive.acquire()
+            try:
+                attempt_timeout = bounded_timeout(timeout)
+                with guarded("discord", route) as call:
+                    response = self.session.request(method, url, headers=headers, timeout=attempt_timeout, **kwargs)
+                    call.status_code = response.status_code
+                self._update_bucket(route, response)
+            finally:
+                if not reserved:
+                    bucket.exclusive.release()
+
+            if response.status_code != 429:
+                return response
+
+            retry_after = self._retry_after(response)
+            if response.headers.get("X-RateLimit-Global") or self._is_global(response):
+                self._global_reset_at = time.time() + retry_after
+            if attempt == self.max_retries:
+                raise RateLimitedError(route, retry_after)
+            self._wait(route, retry_after)
+
+        return response
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        try:
+            return float(response.json().get("retry_after", 1))
+        except ValueError:
+            return float(response.headers.get("Retry-After", 1))
+
+    @staticmethod
+    def _is_global(response: requests.Response) -> bool:
+        try:
+            return bool(response.json().get("global"))
+        except ValueError:
+            return False
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import re
+import requests
+from config import GOOGLE_BOOKS_API_URL
+from utils.cache import TieredCache, MISSING
+from utils.book_record import BookRecord, pack_volumes, unpack_volumes
+from utils.circuit_breaker import guarded
+from utils.deadline import bounded_timeout
+from utils.catalog import remember_volumes
+
+# search results are shared by every guild, keyed by a hash of the normalized query
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 6*60*60))
+SEARCH_CACHE_EMPTY_TTL = int(os.environ.get("SEARCH_CACHE_EMPTY_TTL", 5*60))
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+# (connect, read) seconds
+GOOGLE_BOOKS_TIMEOUT = (3.05, 5)
+search_cache = TieredCache(
+    "search",
+    ttl=SEARCH_CACHE_TTL,
+    max_size=SEARCH_CACHE_SIZE,
+    persist=os.environ.get("PERSIST_SEARCH_CACHE", "true").lower() == "true",
+    # the table keeps compressed BookRecords instead of the raw API items
+    encode=pack_volumes,
+    decode=unpack_volumes,
+)
+
+
+class GoogleBooksError(Exception):
+    """
+    Raised by search_books when Google Books answers with an error status.
+    """
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        super().__init__(f"Google Books search failed with status {status_code}.")
+
+
+# order matters: it is the order the terms are sent to Google in
+SEARCH_FIELDS = {
+    "title": "intitle",
+    "author": "inauthor",
+    "publisher": "inpublisher",
+    "isbn": "isbn",
+}
+
+
+def build_search_query(query_options):
+    """
+    Builds the Google Books `q` parameter (e.g. intitle:dune+inauthor:herbert)
+    from the /search options.
+    """
+    query_params = []
+    for option, prefix in SEARCH_FIELDS.items():
+        if option in query_options:
+            query_params.append(f"{prefix}:{query_options[option]}")
+    return "+".join(query_params)
+
+
+def normalize_search_query(query_options):
+    """
+    Canonical form of the search options so that "Dune ", "dune" and "DUNE" share
+    a cache entry. ISBNs lose their dashes and spaces.
+    """
+    parts = []
+    for option, prefix in SEARCH_FIELDS.items():
+        value = query_options.get(option)
+        if value is None:
+            continue
+        value = re.sub(r"\s+", " ", str(value)).strip().lower()
+        if option == "isbn":
+            value = re.sub(r"[\s-]", "", value)
+        parts.append(f"{prefix}:{value}")
+    return "+".join(parts)
+
+
+def search_cache_key(query_options, max_results, start_index=0):
+    normalized = normalize_search_query(query_options)
+    page = f"|{start_index}" if start_index else ""
+    return hashlib.sha256(f"{normalized}|{max_results}{page}".encode("utf-8")).hexdigest()[:32]
+
+
+def search_books(query_options, max_results=5, start_index=0):
+    """
+    Searches Google Books, served from the search cache when the same (normalized)
+    query was run recently by any guild. The books returned are added to the local
+    catalog (utils.catalog). `max_results` is at most 40 (Google's page
+    size); later pages start at `start_index`.
+
+    Returns:
+        list: the `items` of the Google Books response reduced to the fields the bot
+        reads (see BookRecord.to_volume), empty if nothing was found
+
+    Raises:
+        GoogleBooksError when the response isn't OK (errors are never cached)
+    """
+    key = search_cache_key(query_options, max_results, start_index)
+    books = search_cache.get(key)
+    if books is not MISSING:
+        remember_volumes(books)
+        return books
+
+    timeout = bounded_timeout(GOOGLE_BOOKS_TIMEOUT)
+    with guarded("google_books", "volumes.list") as call:
+        response = requests.get(GOOGLE_BOOKS_API_URL, params={
+            "q": build_search_query(query_options),
+            "maxResults": max_results,
+            "startIndex": start_index,
+        }, timeout=timeout)
+        call.status_code = response.status_code
+    if not response.ok:
+        raise GoogleBooksError(response.status_code)
+
+    books = [BookRecord.from_volume(item).to_volume() for item in response.json().get("items", [])]
+    search_cache.set(key, books, ttl=SEARCH_CACHE_TTL if books else SEARCH_CACHE_EMPTY_TTL)
+    # every volume seen is kept in the local catalog for later searches
+    remember_volumes(books)
+    return books
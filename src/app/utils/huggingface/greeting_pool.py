@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import deque
+from utils.utils import make_greeting_batch_payload, parse_greeting_batch
+from utils.huggingface.textgeneration import query as hf_query
+from utils.aws.dynamodb import put_cache_entry, get_cache_entry
+from utils.telemetry import interaction_span
+
+GREETING_BATCH_SIZE = int(os.environ.get("GREETING_BATCH_SIZE", 20))
+GREETING_LOW_WATER = int(os.environ.get("GREETING_LOW_WATER", 5))
+# how long a persisted batch can seed cold containers
+GREETING_POOL_TTL = 7*24*60*60
+
+
+class GreetingPool:
+    """
+    LLM greetings generated ahead of time so /hello never waits on Hugging Face.
+
+    take() is O(1) and never blocks on the network (besides one cache table read on a
+    cold container). When the pool runs low a background thread asks the LLM for a new
+    batch and persists it under "greetings#<stage>" so cold containers start full.
+    On Lambda the refill thread is frozen between invocations and picks up where it
+    left off on the next one.
+    """
+    def __init__(self, stage, batch_size=GREETING_BATCH_SIZE, low_water=GREETING_LOW_WATER):
+        self.key = f"greetings#{stage}"
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.greetings = deque()
+        self.loaded = False
+        self.refilling = False
+        self.refills = 0
+        self.last_refill_seconds = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self.loaded = True
+        try:
+            found, greetings = get_cache_entry(self.key)
+            if found:
+                self.greetings.extend(greetings)
+        except Exception as e:
+            print(f"Failed to load greeting pool: {e}")
+
+    def take(self):
+        """
+        Returns a pre-generated greeting, or None if the pool is empty.
+        """
+        if not self.loaded:
+            self._load()
+        try:
+            greeting = self.greetings.popleft()
+        except IndexError:
+            greeting = None
+        if len(self.greetings) < self.low_water:
+            self.refill_in_background()
+        return greeting
+
+    def refill_in_background(self):
+        with self._lock:
+            if self.refilling:
+                return
+            self.refilling = True
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def refill(self):
+        # runs outside any interaction, so it gets a span of its own
+        with interaction_span("greeting_pool.refill"):
+            self._refill()
+
+    def _refill(self):
+        started = time.monotonic()
+        try:
+            batch = parse_greeting_batch(hf_query(make_greeting_batch_payload(self.batch_size)))
+            self.greetings.extend(batch)
+            self.refills += 1
+            self.last_refill_seconds = time.monotonic() - started
+            print(f"Greeting pool refilled with {len(batch)} greetings in {self.last_refill_seconds:.2f}s (depth {self.depth()})")
+            put_cache_entry(self.key, list(self.greetings), ttl=GREETING_POOL_TTL)
+        except Exception as e:
+            print(f"Failed to refill greeting pool: {e}")
+        finally:
+            with self._lock:
+                self.refilling = False
+
+    def depth(self):
+        return len(self.greetings)
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "refills": self.refills,
+            "last_refill_seconds": self.last_refill_seconds,
+        }
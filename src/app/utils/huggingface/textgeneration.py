@@ -1,15 +1,25 @@
 import os
 import requests
+from utils.circuit_breaker import guarded
+from utils.deadline import bounded_timeout
 
 API_URL = "https://router.huggingface.co/v1/chat/completions"
 HF_TOKEN = os.environ.get("HF_TOKEN")
+# (connect, read) seconds; the router can take several seconds to generate
+HF_TIMEOUT = (3.05, float(os.environ.get("HF_TIMEOUT", 8)))
 headers = {
     "Authorization": f"Bearer {HF_TOKEN}",
 }
 
-def query(payload):
-    response = requests.post(API_URL, headers=headers, json=payload)
+def query(payload, timeout=HF_TIMEOUT):
+    """
+    Returns the chat completion's text. The timeout is cut to the invocation's
+    deadline (utils.deadline) if one is set.
+    """
+    timeout = bounded_timeout(timeout)
+    with guarded("huggingface", payload.get("model", "chat.completions")) as call:
+        response = requests.post(API_URL, headers=headers, json=payload, timeout=timeout)
+        call.status_code = response.status_code
     data = response.json()
-    print("LLM response:", data)
     return data["choices"][0]["message"]["content"]
 
@@ -0,0 +1,95 @@
+import json
+import os
+from typing import Any
+from utils.aws.lazy import LazyResource
+from utils.cache import TTLCache
+
+# "dynamodb" (cache table), "redis" (REDIS_URL) or "memory" (single container, tests)
+INTERACTION_STATE_BACKEND = os.environ.get("INTERACTION_STATE_BACKEND", "dynamodb").lower()
+REDIS_URL = os.environ.get("REDIS_URL")
+# how long a user has to submit a modal after pressing the button that opened it
+INTERACTION_STATE_TTL = int(os.environ.get("INTERACTION_STATE_TTL", 15*60))
+
+
+def state_key(guild_id: str, user_id: str, interaction_id: str) -> str:
+    """
+    State belongs to one user in one guild, and to the interaction that created it,
+    so two searches by the same user don't overwrite each other's selection.
+    """
+    return f"{guild_id}#{user_id}#{interaction_id}"
+
+
+class MemoryStateStore:
+    """
+    Keeps state in this container only. Fine for tests and local development; on
+    Lambda the interaction that reads the state is often served by another container.
+    """
+    def __init__(self, max_size: int = 1024):
+        self.entries = TTLCache(max_size=max_size, ttl=INTERACTION_STATE_TTL)
+
+    def put(self, key: str, value: Any, ttl: int = INTERACTION_STATE_TTL) -> None:
+        self.entries.set(key, value, ttl=ttl)
+
+    def take(self, key: str) -> Any:
+        return self.entries.pop(key)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class DynamoDBStateStore:
+    """
+    Keeps state in the cache table under "state#<key>". take() is one DeleteItem
+    returning the old item, so a double submit can't use the same state twice.
+    """
+    namespace = "state#"
+
+    def put(self, key: str, value: Any, ttl: int = INTERACTION_STATE_TTL) -> None:
+        from utils.aws.dynamodb import put_cache_entry
+        put_cache_entry(self.namespace + key, value, ttl=ttl)
+
+    def take(self, key: str) -> Any:
+        from utils.aws.dynamodb import take_cache_entry
+        _, value = take_cache_entry(self.namespace + key)
+        return value
+
+
+class RedisStateStore:
+    """
+    Keeps state in Redis as JSON with an expiry; take() is a single GETDEL
+    (Redis 6.2+). The redis package is only needed when this backend is selected.
+    """
+    namespace = "state:"
+
+    def __init__(self, client=None, url: str = REDIS_URL):
+        if client is None:
+            if not url:
+                raise ValueError("REDIS_URL must be set to use the redis interaction state backend.")
+            import redis # type: ignore
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def put(self, key: str, value: Any, ttl: int = INTERACTION_STATE_TTL) -> None:
+        self.client.set(self.namespace + key, json.dumps(value, separators=(",", ":")), ex=ttl)
+
+    def take(self, key: str) -> Any:
+        value = self.client.getdel(self.namespace + key)
+        return json.loads(value) if value is not None else None
+
+
+BACKENDS = {
+    "memory": MemoryStateStore,
+    "dynamodb": DynamoDBStateStore,
+    "redis": RedisStateStore,
+}
+
+
+def make_state_store(backend: str = INTERACTION_STATE_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown interaction state backend {backend!r}, expected one of {', '.join(BACKENDS)}.")
+    return BACKENDS[backend]()
+
+
+# Short-lived state handed from one interaction to the next (e.g. the book picked
+# with a select_book button, read back when the schedule modal is submitted).
+interaction_state = LazyResource(make_state_store)
@@ -0,0 +1,215 @@
+import importlib
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+from utils.telemetry import annotate
+
+COMMAND = 2
+COMPONENT = 3
+AUTOCOMPLETE = 4
+MODAL = 5
+
+# "{name}" or "{name:int}" in a custom_id pattern
+PARAMETER = re.compile(r"\{(\w+)(?::(\w+))?\}")
+CONVERTERS = {"str": str, "int": int}
+# latencies kept per route for percentiles
+LATENCY_WINDOW = 256
+
+
+class Interaction:
+    """
+    A verified interaction as the handlers see it: the raw payload, the fields
+    every handler needs, the guild's state and the parameters parsed from the
+    custom_id by the route that matched.
+    """
+    def __init__(self, raw_request: dict[str, Any], state=None):
+        self.raw = raw_request
+        self.type = raw_request["type"]
+        self.data = raw_request.get("data") or {}
+        self.guild_id = raw_request.get("guild_id")
+        member = raw_request.get("member") or {}
+        self.user_id = (member.get("user") or raw_request.get("user") or {}).get("id")
+        self.role_ids = member.get("roles", [])
+        self.state = state
+        self.params: dict[str, Any] = {}
+
+    @property
+    def id(self) -> str:
+        return self.raw.get("id")
+
+    @property
+    def application_id(self) -> str:
+        return self.raw.get("application_id")
+
+    @property
+    def token(self) -> str:
+        return self.raw.get("token")
+
+    @property
+    def custom_id(self) -> str:
+        return self.data.get("custom_id", "")
+
+
+class Route:
+    """
+    One registered handler. `target` is a callable or a "module:function" string
+    imported on the first call, so registering routes doesn't import handlers.
+    """
+    def __init__(self, kind: int, pattern: str, target: Callable | str):
+        self.kind = kind
+        self.pattern = pattern
+        self._target = target
+        self._handler = target if callable(target) else None
+        self.parameters = [(name, CONVERTERS[converter or "str"]) for name, converter in PARAMETER.findall(pattern)]
+        # custom_id patterns always put their parameters last, after a "_"
+        self.prefix = pattern[:pattern.index("{")] if self.parameters else pattern
+        if self.parameters and not self.prefix.endswith("_"):
+            raise ValueError(f"Route {pattern} must have its parameters after a '_'.")
+
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    @property
+    def handler(self) -> Callable:
+        if self._handler is None:
+            module, _, function = self._target.partition(":")
+            self._handler = getattr(importlib.import_module(module), function)
+        return self._handler
+
+    def parse(self, rest: str) -> dict[str, Any] | None:
+        """
+        Parameters from the part of the custom_id after the prefix, or None if it
+        doesn't fit the pattern. The last parameter takes the remainder.
+        """
+        values = rest.split("_", len(self.parameters) - 1)
+        if len(values) != len(self.parameters):
+            return None
+        try:
+            return {name: convert(value) for (name, convert), value in zip(self.parameters, values)}
+        except ValueError:
+            return None
+
+    def record(self, elapsed_ms: float, failed: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.latencies_ms.append(elapsed_ms)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+        stats = {"calls": self.calls, "errors": self.errors}
+        if latencies:
+            stats.update({
+                "mean_ms": round(self.total_ms / self.calls, 3),
+                "p50_ms": round(latencies[len(latencies) // 2], 3),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                "max_ms": round(self.max_ms, 3),
+            })
+        return stats
+
+
+class Router:
+    """
+    Registry of command, button and modal handlers.
+
+    Commands and parameterless custom_ids are found with one dict lookup. Patterns
+    with parameters ("select_book_{index:int}") live in a prefix table keyed by
+    their static prefix; a custom_id is looked up at each of its "_" boundaries,
+    longest first, so dispatch cost depends on the custom_id, not on how many
+    routes are registered.
+    """
+    def __init__(self):
+        self.exact: dict[tuple[int, str], Route] = {}
+        self.prefixes: dict[tuple[int, str], Route] = {}
+
+    def add(self, kind: int, pattern: str, target: Callable | str) -> Route:
+        route = Route(kind, pattern, target)
+        table = self.prefixes if route.parameters else self.exact
+        if (kind, route.prefix) in table:
+            raise ValueError(f"Route {pattern} is already registered.")
+        table[(kind, route.prefix)] = route
+        return route
+
+    def command(self, name: str, target: Callable | str) -> Route:
+        return self.add(COMMAND, name, target)
+
+    def component(self, pattern: str, target: Callable | str) -> Route:
+        return self.add(COMPONENT, pattern, target)
+
+    def modal(self, pattern: str, target: Callable | str) -> Route:
+        return self.add(MODAL, pattern, target)
+
+    def autocomplete(self, command: str, target: Callable | str) -> Route:
+        """
+        Suggestions for the options of `command` marked `autocomplete: true`; the
+        handler finds the option being typed in (focused) itself.
+        """
+        return self.add(AUTOCOMPLETE, command, target)
+
+    def resolve(self, kind: int, key: str) -> tuple[Route | None, dict[str, Any]]:
+        route = self.exact.get((kind, key))
+        if route:
+            return route, {}
+        end = len(key)
+        while (end := key.rfind("_", 0, end)) >= 0:
+            route = self.prefixes.get((kind, key[:end + 1]))
+            if route:
+                params = route.parse(key[end + 1:])
+                if params is not None:
+                    return route, params
+        return None, {}
+
+    def dispatch(self, interaction: Interaction) -> dict[str, Any] | None:
+        """
+        Runs the matching handler and returns its response, or None when no route
+        matches (or the handler declines the interaction by returning None).
+        """
+        key = interaction.data.get("name", "") if interaction.type in (COMMAND, AUTOCOMPLETE) else interaction.custom_id
+        route, params = self.resolve(interaction.type, key)
+        if route is None:
+            return None
+
+        interaction.params = params
+        annotate(route=route.pattern)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = route.handler(interaction)
+            failed = False
+            return response
+        finally:
+            route.record((time.perf_counter() - started) * 1000, failed)
+
+    def routes(self) -> list[Route]:
+        return [*self.exact.values(), *self.prefixes.values()]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Invocation counts and latency per route (this container only).
+        """
+        return {route.pattern: route.stats() for route in self.routes() if route.calls}
+
+    def check_commands(self, commands: list[dict[str, Any]]) -> list[str]:
+        """
+        Compares the command routes with the registered command definitions
+        (commands/discord_commands.yaml). Returns the mismatches, empty if none.
+        """
+        registered = {command["name"] for command in commands}
+        routed = {route.pattern for route in self.routes() if route.kind == COMMAND}
+        problems = [f"/{name} is registered with Discord but has no route" for name in sorted(registered - routed)]
+        problems += [f"/{name} has a route but isn't registered with Discord" for name in sorted(routed - registered)]
+
+        autocompleted = {command["name"] for command in commands if any(option.get("autocomplete") for option in command.get("options") or [])}
+        suggested = {route.pattern for route in self.routes() if route.kind == AUTOCOMPLETE}
+        problems += [f"/{name} has autocomplete options but no autocomplete route" for name in sorted(autocompleted - suggested)]
+        problems += [f"/{name} has an autocomplete route but no autocomplete options" for name in sorted(suggested - autocompleted)]
+        return problems
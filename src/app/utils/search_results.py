@@ -0,0 +1,115 @@
+import os
+import time
+from typing import Any
+from utils.aws.dynamodb import cache_search_results
+from utils.google_books import search_books, SEARCH_CACHE_TTL
+from utils.catalog import search_catalog
+
+# how long the select buttons of a /search message keep working
+SEARCH_RESULTS_TTL = int(os.environ.get("SEARCH_RESULTS_TTL", 24*60*60))
+# after this the stored books are re-read through search_books (shared search cache,
+# then Google Books) the next time a button is pressed
+SEARCH_RESULTS_REFRESH = int(os.environ.get("SEARCH_RESULTS_REFRESH", SEARCH_CACHE_TTL))
+
+# books shown per page of a /search message, and fetched per Google Books call (its maximum)
+SEARCH_PAGE_SIZE = 5
+SEARCH_FETCH_SIZE = 40
+# books kept per /search message, however far the user pages
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", 200))
+# the next Google page is fetched in the background once the user is this close to the end
+SEARCH_PREFETCH_PAGES = 2
+
+
+def find_books(query_options: dict[str, str], online: bool = False) -> tuple[list[dict], str]:
+    """
+    The books for a /search: from the local catalog when it has any match, else
+    (or when `online`) from Google Books.
+
+    Returns:
+        (books, source); source is "catalog" or "google"
+    """
+    if not online:
+        books = search_catalog(query_options, limit=SEARCH_MAX_RESULTS)
+        if books:
+            return books, "catalog"
+    return search_books(query_options, max_results=SEARCH_FETCH_SIZE), "google"
+
+
+def save_search_results(token: str, query_options: dict[str, str], books: list[dict], max_results: int = SEARCH_FETCH_SIZE, source: str = "google") -> dict[str, Any]:
+    """
+    Stores the books of one /search message under `token` (the interaction id),
+    so concurrent searches in a guild each keep their own results. Returns them in
+    the shape GuildState.search_results has.
+
+    Catalog results are every local match at once and are never refreshed from Google.
+    """
+    local = source == "catalog"
+    exhausted = local or len(books) < max_results
+    refresh_after = SEARCH_RESULTS_TTL if local else SEARCH_RESULTS_REFRESH
+    cache_search_results(token, query_options, books, ttl=SEARCH_RESULTS_TTL, refresh_after=refresh_after, max_results=max_results, exhausted=exhausted, source=source)
+    now = int(time.time())
+    return {
+        "books": books,
+        "query": query_options,
+        "max_results": max_results,
+        "refresh_at": now + refresh_after,
+        "exhausted": exhausted,
+        "source": source,
+        "ttl": now + SEARCH_RESULTS_TTL,
+    }
+
+
+def extend_search_results(token: str, results: dict[str, Any]) -> dict[str, Any]:
+    """
+    Appends the next Google Books page (one upstream call for up to 40 books) to the
+    stored results and returns them.
+    """
+    query, max_results = results["query"], results["max_results"]
+    page = search_books(query, max_results=max_results, start_index=len(results["books"]))
+    known = {book.get("id") for book in results["books"]}
+    books = results["books"] + [book for book in page if book.get("id") not in known]
+    exhausted = len(page) < max_results or len(books) >= SEARCH_MAX_RESULTS
+    now = int(time.time())
+    if results["ttl"] > now:
+        cache_search_results(token, query, books, ttl=results["ttl"] - now, refresh_after=max(results["refresh_at"] - now, 0), max_results=max_results, exhausted=exhausted, source=results.get("source", "google"))
+    return {**results, "books": books, "exhausted": exhausted}
+
+
+def needs_prefetch(results: dict[str, Any], page: int) -> bool:
+    """
+    Whether page `page` is close enough to the end of the stored books to fetch more.
+    """
+    loaded_pages = -(-len(results["books"]) // SEARCH_PAGE_SIZE)
+    return not results["exhausted"] and page + SEARCH_PREFETCH_PAGES >= loaded_pages
+
+
+def refresh_search_results(token: str, results: dict[str, Any]) -> list[dict]:
+    """
+    Re-reads the first page of stale results and stores them for the rest of the
+    message's lifetime. Books keep the position the message showed them in (matched
+    by volume id); any the search no longer returns keep their stored record.
+    """
+    fresh = {book.get("id"): book for book in search_books(results["query"], max_results=results["max_results"])}
+    books = [fresh.get(book.get("id"), book) for book in results["books"]]
+    remaining = results["ttl"] - int(time.time())
+    if remaining > 0:
+        cache_search_results(token, results["query"], books, ttl=remaining, refresh_after=SEARCH_RESULTS_REFRESH, max_results=results["max_results"], exhausted=results["exhausted"], source=results.get("source", "google"))
+    return books
+
+
+def selected_search_result(state, token: str, index: int) -> dict | None:
+    """
+    The book behind button `index` of the /search message `token`, or None when the
+    results expired or the index is out of range.
+    """
+    state.include_search_results(token)
+    results = state.search_results
+    if not results or not 0 <= index < len(results["books"]):
+        return None
+    if results["refresh_at"] <= time.time():
+        try:
+            return refresh_search_results(token, results)[index]
+        except Exception as e:
+            # the stored record is still good enough to schedule
+            print(f"Failed to refresh search results {token}: {e}")
+    return results["books"][index]
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from config import STAGE
+
+# metrics are printed as CloudWatch Embedded Metric Format (EMF) lines; Lambda ships
+# stdout to CloudWatch Logs, which extracts the metrics without any agent or API call
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "BookClubBot")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# conditional writes that lose a race are an expected outcome, not a failing dependency
+EXPECTED_ERROR_CODES = {"ConditionalCheckFailedException", "TransactionCanceledException"}
+# trailing "_<id>" / "_<cursor>" parts of custom_ids, kept out of the Command dimension
+CUSTOM_ID_SUFFIX = re.compile(r"(_[^_]*\d[^_]*)+$")
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("interaction_trace", default=None)
+
+
+class DependencyCall:
+    """
+    One outbound call made while handling an interaction. `error` is the exception
+    name, or "HTTP <status>" for 429s and 5xx responses.
+    """
+    def __init__(self, dependency: str, operation: str, offset_ms: float = 0.0):
+        self.dependency = dependency
+        self.operation = operation
+        self.offset_ms = offset_ms
+        self.duration_ms = 0.0
+        self.status_code: int | None = None
+        self.error: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        span = {
+            "dependency": self.dependency,
+            "operation": self.operation,
+            "offset_ms": round(self.offset_ms, 1),
+            "duration_ms": round(self.duration_ms, 1),
+        }
+        if self.status_code is not None:
+            span["status"] = self.status_code
+        if self.error:
+            span["error"] = self.error
+        return span
+
+
+class Trace:
+    """
+    The span of one interaction (or deferred stage) and the dependency calls made
+    inside it, from any thread that inherited its context.
+    """
+    def __init__(self, name: str, properties: dict[str, Any]):
+        self.trace_id = os.urandom(8).hex()
+        self.name = name
+        self.properties = properties
+        self.calls: list[DependencyCall] = []
+        self.error: str | None = None
+        self.duration_ms = 0.0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add(self, call: DependencyCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+
+def interaction_name(raw_request: dict[str, Any]) -> str:
+    """
+    Low-cardinality name of an interaction for the Command dimension:
+    "/search" for commands ("/search autocomplete" for their autocomplete), the
+    custom_id without ids or cursors for components and modals
+    (select_book_3 -> select_book).
+    """
+    request_type = raw_request.get("type")
+    if request_type == 1:
+        return "ping"
+    data = raw_request.get("data") or {}
+    if request_type == 2:
+        return f"/{data.get('name', 'unknown')}"
+    if request_type == 4:
+        return f"/{data.get('name', 'unknown')} autocomplete"
+    custom_id = data.get("custom_id", "unknown")
+    return CUSTOM_ID_SUFFIX.sub("", custom_id).rstrip("_") or custom_id
+
+
+@contextmanager
+def interaction_span(name: str, **properties):
+    """
+    Opens the span of an interaction; dependency calls made inside it (including on
+    threads started by utils.concurrency) are attached to it. Emits the EMF lines
+    when it closes.
+    """
+    trace = Trace(name, properties)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.error = type(e).__name__
+        raise
+    finally:
+        trace.duration_ms = trace.elapsed_ms()
+        _current_trace.reset(token)
+        emit(trace)
+
+
+def annotate(**properties) -> None:
+    """
+    Adds searchable properties (not metrics) to the current interaction's log line.
+    """
+    trace = _current_trace.get()
+    if trace:
+        trace.properties.update(properties)
+
+
+@contextmanager
+def dependency(name: str, operation: str):
+    """
+    Times an outbound call. Set `status_code` on the yielded call to have 429s and
+    5xx responses counted as errors; exceptions are counted and re-raised.
+
+        with dependency("google_books", "volumes.list") as call:
+            response = requests.get(...)
+            call.status_code = response.status_code
+    """
+    trace = _current_trace.get()
+    call = DependencyCall(name, operation, trace.elapsed_ms() if trace else 0.0)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.duration_ms = (time.perf_counter() - started) * 1000
+        # telemetry must never fail the call it measures
+        if not call.error and isinstance(call.status_code, int) and (call.status_code == 429 or call.status_code >= 500):
+            call.error = f"HTTP {call.status_code}"
+        if trace:
+            trace.add(call)
+
+
+def instrument_boto3(client, name: str) -> None:
+    """
+    Times every API call of a boto3 client (retries included) with botocore's
+    before-parameter-build / after-call events, so call sites don't need wrapping.
+    """
+    service = client.meta.service_model.service_name
+
+    def before_call(context, **kwargs):
+        trace = _current_trace.get()
+        context["telemetry_started"] = time.perf_counter()
+        context["telemetry_offset_ms"] = trace.elapsed_ms() if trace else 0.0
+
+    def finish(context, model, status_code=None, error=None):
+        trace = _current_trace.get()
+        started = context.get("telemetry_started")
+        if not trace or started is None:
+            return
+        call = DependencyCall(name, model.name, context["telemetry_offset_ms"])
+        call.duration_ms = (time.perf_counter() - started) * 1000
+        call.status_code = status_code
+        call.error = error
+        trace.add(call)
+
+    def after_call(http_response, parsed, model, context, **kwargs):
+        code = parsed.get("Error", {}).get("Code")
+        error = code if code and code not in EXPECTED_ERROR_CODES else None
+        finish(context, model, http_response.status_code, error)
+
+    def after_call_error(exception, model, context, **kwargs):
+        finish(context, model, error=type(exception).__name__)
+
+    events = client.meta.events
+    events.register(f"before-parameter-build.{service}", before_call)
+    events.register(f"after-call.{service}", after_call)
+    events.register(f"after-call-error.{service}", after_call_error)
+
+
+def emf_lines(trace: Trace) -> list[dict[str, Any]]:
+    """
+    One EMF document for the interaction (latency, errors, time spent in
+    dependencies, plus every span as a property) and one per dependency it called
+    (latency of each call, call and error counts).
+    """
+    timestamp = int(time.time() * 1000)
+    calls_by_dependency: dict[str, list[DependencyCall]] = {}
+    for call in trace.calls:
+        calls_by_dependency.setdefault(call.dependency, []).append(call)
+
+    def metadata(dimensions, metrics):
+        return {
+            "Timestamp": timestamp,
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": dimensions,
+                "Metrics": [{"Name": metric, "Unit": unit} for metric, unit in metrics],
+            }],
+        }
+
+    lines = [{
+        "_aws": metadata([["Stage", "Command"]], [
+            ("InteractionLatency", "Milliseconds"),
+            ("InteractionErrors", "Count"),
+            ("DependencyTime", "Milliseconds"),
+        ]),
+        "Stage": STAGE,
+        "Command": trace.name,
+        "InteractionLatency": round(trace.duration_ms, 1),
+        "InteractionErrors": 1 if trace.error else 0,
+        "DependencyTime": round(sum(call.duration_ms for call in trace.calls), 1),
+        "TraceId": trace.trace_id,
+        "Spans": [call.as_dict() for call in trace.calls],
+        **({"Error": trace.error} if trace.error else {}),
+        **trace.properties,
+    }]
+    for name, calls in calls_by_dependency.items():
+        lines.append({
+            "_aws": metadata([["Stage", "Dependency"], ["Stage", "Command", "Dependency"]], [
+                ("DependencyLatency", "Milliseconds"),
+                ("DependencyCalls", "Count"),
+                ("DependencyErrors", "Count"),
+            ]),
+            "Stage": STAGE,
+            "Command": trace.name,
+            "Dependency": name,
+            # EMF takes up to 100 values per metric; CloudWatch builds the percentiles
+            "DependencyLatency": [round(call.duration_ms, 1) for call in calls][:100],
+            "DependencyCalls": len(calls),
+            "DependencyErrors": sum(1 for call in calls if call.error),
+            "TraceId": trace.trace_id,
+        })
+    return lines
+
+
+def emit(trace: Trace) -> None:
+    if not METRICS_ENABLED:
+        return
+    for line in emf_lines(trace):
+        print(json.dumps(line, separators=(",", ":"), default=str))
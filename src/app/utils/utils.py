@@ -14,36 +14,44 @@ GREETINGS = [
 ]
 EMOJIS = ["👋", "😊", "🙌", "🌟", "🤗", "😄", "✨", "😎", "😁"]
 
-def make_hello_payload():
-    example_greetings = [
-        f"{random.choice(GREETINGS)} {random.choice(EMOJIS)}",
-        f"{random.choice(GREETINGS)} {random.choice(EMOJIS)}",
-        f"{random.choice(GREETINGS)} {random.choice(EMOJIS)}",
-    ]
-    examples = "\n".join(example_greetings)
+def make_greeting_batch_payload(count):
+    examples = "\n".join(f"{random.choice(GREETINGS)} {random.choice(EMOJIS)}" for _ in range(3))
     return {
         "messages": [
             {
                 "role": "user",
                 "content": (
-                    "You are a Discord bot. Reply with a short, friendly hello message "
-                    "that you would send to a user in a Discord server. "
-                    "Each time, use a different greeting and a fun emoji that represents hello. "
+                    f"You are a Discord bot. Write {count} short, friendly hello messages "
+                    "that you would send to a user in a Discord server, one per line. "
+                    "Use a different greeting and a fun emoji that represents hello on every line. "
                     "Here are some examples:\n"
                     f"{examples}\n"
-                    "Don't put a '\\n' at the end."
+                    "Only reply with the messages, no numbering."
                 ),
             }
         ],
         "model": "google/gemma-2-2b-it",
     }
 
+def parse_greeting_batch(text, max_length=100):
+    """
+    Splits a batch of LLM greetings into clean lines (drops numbering, bullets and blanks).
+    """
+    greetings = []
+    for line in text.splitlines():
+        line = re.sub(r"^\s*(\d+[.)]|[-*•])\s*", "", line).strip().strip('"')
+        if line and len(line) <= max_length:
+            greetings.append(line)
+    return greetings
+
+def format_discussion_date(dt):
+    """
+    e.g. "Thursday, September 25th 2025"
+    """
+    return f"{dt.strftime('%A')}, {dt.strftime('%B')} {get_ordinal(dt.day)} {dt.year}"
+
 def make_announcement_payload(context, book, section, dt, time_str):
-    weekday = dt.strftime('%A')
-    month = dt.strftime('%B')
-    day = get_ordinal(dt.day)
-    year = dt.year
-    formatted_date = f"{weekday}, {month} {day} {year}"
+    formatted_date = format_discussion_date(dt) if dt else None
     if context == "FIRST":
         content = (
             f"You are a Discord bot. Write a simple, friendly announcement for our book club. "
@@ -81,6 +89,37 @@ def make_announcement_payload(context, book, section, dt, time_str):
         "model": "google/gemma-2-2b-it",
     }
 
+# Announcements posted without the LLM, when there's no time to wait for it
+ANNOUNCEMENT_TEMPLATES = {
+    "FIRST": (
+        "📚 We have chosen our next book: **{book}**!\n"
+        "We'll read {section} and meet on {date} at {time} 🗓️\n"
+        "If you can't make it, leave your thoughts in the #megathreads channel 📖"
+    ),
+    "FOLLOW_UP": (
+        "📖 Reminder: we're reading {section} from **{book}** and meeting on {date} at {time}!\n"
+        "If you can't make it, leave your thoughts in the #megathreads channel and try your best to join in next time. Happy reading ✨"
+    ),
+    "FINISH": (
+        "🎉 We just finished reading **{book}**! Congratulations everyone 📚\n"
+        "Help us pick the next book with /search 📖"
+    ),
+}
+
+def render_announcement(context, book, section, dt, time_str):
+    """
+    Same announcements as make_announcement_payload asks the LLM for, from a fixed
+    template (microseconds instead of seconds).
+    """
+    if context not in ANNOUNCEMENT_TEMPLATES:
+        raise ValueError("Unknown context for announcement.")
+    return ANNOUNCEMENT_TEMPLATES[context].format(
+        book=book,
+        section=section,
+        date=format_discussion_date(dt) if dt else "TBD",
+        time=time_str or "TBD",
+    )
+
 # Random Greeting generator for when a user uses /hello
 def random_greeting():
     message = random.choice(GREETINGS)
@@ -91,7 +130,6 @@ def random_greeting():
 def is_valid_future_date(discussion_date_str):
     try:
         parsed_date = datetime.strptime(discussion_date_str, "%m-%d-%Y").date()
-        print(parsed_date, date.today())
         return parsed_date > date.today()
     except ValueError:
         return False
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+# how far X-Signature-Timestamp may be from our clock, in seconds
+SIGNATURE_MAX_AGE = int(os.environ.get("SIGNATURE_MAX_AGE", 5*60))
+# signatures remembered per container to reject replays
+SEEN_SIGNATURES_SIZE = int(os.environ.get("SEEN_SIGNATURES_SIZE", 4096))
+SIGNATURE_HEX_LENGTH = 128  # 64 byte Ed25519 signature
+
+
+class Verification(Enum):
+    OK = "ok"
+    MISSING_HEADERS = "missing_headers"
+    MALFORMED = "malformed"
+    STALE = "stale"
+    REPLAYED = "replayed"
+    BAD_SIGNATURE = "bad_signature"
+
+    @property
+    def ok(self) -> bool:
+        return self is Verification.OK
+
+
+class InteractionVerifier:
+    """
+    Checks Discord's Ed25519 signature over timestamp + raw request body.
+
+    The public key is decoded once per container (discord_interactions.verify_key
+    rebuilt it on every request). Cheap checks run first, so junk traffic is turned
+    away before the signature check: malformed headers, timestamps more than
+    `max_age` seconds off, and signatures this container has already accepted.
+    Accepted signatures are remembered in a bounded, insertion-ordered set; entries
+    older than `max_age` are dropped since their timestamp is rejected anyway.
+    """
+    def __init__(self, public_key: str, max_age: int = SIGNATURE_MAX_AGE, seen_size: int = SEEN_SIGNATURES_SIZE):
+        self.verify_key = VerifyKey(bytes.fromhex(public_key)) if public_key else None
+        self.max_age = max_age
+        self.seen_size = seen_size
+        self._seen: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, raw_body: bytes, signature: str, timestamp: str, now: float = None) -> Verification:
+        """
+        Input:
+            raw_body: the request body exactly as received (never re-serialized JSON)
+            signature: X-Signature-Ed25519 header (hex)
+            timestamp: X-Signature-Timestamp header (unix seconds)
+        """
+        if not signature or not timestamp:
+            return Verification.MISSING_HEADERS
+        if self.verify_key is None or len(signature) != SIGNATURE_HEX_LENGTH or not timestamp.isdigit():
+            return Verification.MALFORMED
+
+        now = time.time() if now is None else now
+        signed_at = int(timestamp)
+        if abs(now - signed_at) > self.max_age:
+            return Verification.STALE
+
+        signature = signature.lower()
+        if signature in self._seen:
+            return Verification.REPLAYED
+
+        try:
+            self.verify_key.verify(timestamp.encode() + raw_body, bytes.fromhex(signature))
+        except (BadSignatureError, ValueError):
+            return Verification.BAD_SIGNATURE
+
+        with self._lock:
+            # a concurrent request may have accepted the same signature meanwhile
+            if signature in self._seen:
+                return Verification.REPLAYED
+            self._seen[signature] = signed_at
+            self._evict(now)
+        return Verification.OK
+
+    def _evict(self, now: float) -> None:
+        while self._seen:
+            oldest_signature, oldest_signed_at = next(iter(self._seen.items()))
+            if len(self._seen) <= self.seen_size and now - oldest_signed_at <= self.max_age:
+                return
+            del self._seen[oldest_signature]
+
+    def seen(self) -> int:
+        return len(self._seen)
@@ -0,0 +1,64 @@
+"""
+Size and encode/decode latency of a cached /search result: the raw Google
+Books items as JSON (what cache_book_list used to store) vs. the packed
+BookRecord blob it stores now.
+
+The sample response in data/google_books_search.json is a five-result
+`intitle:dune` search with the fields the API returns by default.
+
+Usage (from src/):
+    python benchmarks/book_cache_size.py [--iterations 5000]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "app"))
+
+from utils.book_record import pack_volumes, unpack_volumes  # noqa: E402
+
+SAMPLE = os.path.join(HERE, "data", "google_books_search.json")
+
+
+def time_us(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(SAMPLE, encoding="utf-8") as f:
+        items = json.load(f)["items"]
+
+    as_json = json.dumps(items)
+    packed = pack_volumes(items)
+
+    rows = [
+        ("json (before)", len(as_json.encode()),
+         time_us(lambda: json.dumps(items), args.iterations),
+         time_us(lambda: json.loads(as_json), args.iterations)),
+        ("packed (after)", len(packed),
+         time_us(lambda: pack_volumes(items), args.iterations),
+         time_us(lambda: unpack_volumes(packed), args.iterations)),
+    ]
+
+    print(f"{len(items)} results, median of {args.iterations} runs")
+    print(f"{'format':<16}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for name, size, encode, decode in rows:
+        print(f"{name:<16}{size:>8}{encode:>12.1f}{decode:>12.1f}")
+    print(f"size reduction: {rows[0][1] / rows[1][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
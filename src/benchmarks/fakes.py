@@ -0,0 +1,388 @@
+"""
+In-process fakes for everything the bot talks to, used by replay.py.
+
+- FakeDynamoDB: the subset of the boto3 resource/client API the bot uses
+  (Table get/put/update/delete/query, batch_get_item, transact_write_items),
+  including the condition and update expressions in utils.aws.dynamodb.
+- fake_http: replaces requests.Session.request (which requests.get/post use as
+  well) and answers Discord, Google Books, the Dictionary API and Hugging Face
+  from canned responses.
+- FakeLambda: records the async self-invokes made by utils.deferred.
+
+Every call sleeps for the service's injected latency and is counted in
+`calls`, so the replay can report outbound calls per interaction.
+"""
+import copy
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# milliseconds added to every call, roughly what the Lambda sees in us-east-1
+DEFAULT_LATENCY_MS = {
+    "dynamodb": 6,
+    "discord": 60,
+    "google_books": 180,
+    "dictionary": 90,
+    "huggingface": 700,
+    "lambda": 20,
+}
+
+_calls_lock = threading.Lock()
+calls = Counter()
+latency_ms = dict(DEFAULT_LATENCY_MS)
+
+
+def outbound(service):
+    """
+    Counts one call to `service` and waits for its injected latency.
+    """
+    with _calls_lock:
+        calls[service] += 1
+    delay = latency_ms.get(service, 0)
+    if delay:
+        time.sleep(delay / 1000)
+
+
+def snapshot_calls():
+    with _calls_lock:
+        return Counter(calls)
+
+
+# DYNAMODB
+class FakeClientError(Exception):
+    """
+    Looks like botocore's ClientError to utils.aws.dynamodb._error_code.
+    """
+    def __init__(self, code, reasons=None):
+        super().__init__(f"An error occurred ({code})")
+        self.response = {"Error": {"Code": code}}
+        if reasons is not None:
+            self.response["CancellationReasons"] = [{"Code": reason} for reason in reasons]
+
+
+SET_ASSIGNMENTS = re.compile(r",\s*(?![^()]*\))")
+IF_NOT_EXISTS_PLUS = re.compile(r"if_not_exists\((\S+),\s*(\S+)\)\s*\+\s*(\S+)")
+
+
+def _resolve(token, names, values):
+    if token.startswith("#"):
+        return names[token]
+    if token.startswith(":"):
+        return values[token]
+    return token
+
+
+def check_condition(item, condition, names, values):
+    """
+    Evaluates the AND-ed attribute_exists / attribute_not_exists / equality
+    conditions the bot writes with.
+    """
+    if not condition:
+        return True
+    for term in condition.split(" AND "):
+        term = term.strip()
+        if term.startswith("attribute_exists("):
+            if item is None or _resolve(term[len("attribute_exists("):-1], names, values) not in item:
+                return False
+        elif term.startswith("attribute_not_exists("):
+            if item is not None and _resolve(term[len("attribute_not_exists("):-1], names, values) in item:
+                return False
+        else:
+            left, right = (part.strip() for part in term.split("="))
+            if item is None or item.get(_resolve(left, names, values)) != _resolve(right, names, values):
+                return False
+    return True
+
+
+def apply_update(item, expression, names, values):
+    """
+    Applies a `SET a = :x, b = if_not_exists(b, :zero) + :one` update expression.
+    """
+    assert expression.startswith("SET "), expression
+    for assignment in SET_ASSIGNMENTS.split(expression[len("SET "):]):
+        left, right = (part.strip() for part in assignment.split("=", 1))
+        match = IF_NOT_EXISTS_PLUS.fullmatch(right)
+        if match:
+            current = item.get(_resolve(match.group(1), names, values), _resolve(match.group(2), names, values))
+            item[_resolve(left, names, values)] = current + _resolve(match.group(3), names, values)
+        else:
+            item[_resolve(left, names, values)] = _resolve(right, names, values)
+
+
+class FakeTable:
+    def __init__(self, name, key_schema=("guild_id",)):
+        self.name = name
+        self.key_schema = key_schema
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def _key(self, item):
+        return tuple(item[attribute] for attribute in self.key_schema)
+
+    def get_item(self, Key):
+        outbound("dynamodb")
+        with self._lock:
+            item = self.items.get(self._key(Key))
+        return {"Item": copy.deepcopy(item)} if item is not None else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **kwargs):
+        outbound("dynamodb")
+        with self._lock:
+            if not check_condition(self.items.get(self._key(Item)), ConditionExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {}):
+                raise FakeClientError("ConditionalCheckFailedException")
+            self.items[self._key(Item)] = copy.deepcopy(Item)
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None):
+        outbound("dynamodb")
+        with self._lock:
+            item = self.items.get(self._key(Key))
+            if not check_condition(item, ConditionExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {}):
+                raise FakeClientError("ConditionalCheckFailedException")
+            self.items.pop(self._key(Key), None)
+        return {"Attributes": copy.deepcopy(item)} if ReturnValues == "ALL_OLD" and item else {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None):
+        outbound("dynamodb")
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        with self._lock:
+            old = self.items.get(self._key(Key))
+            if not check_condition(old, ConditionExpression, names, values):
+                raise FakeClientError("ConditionalCheckFailedException")
+            item = copy.deepcopy(old) if old else dict(Key)
+            apply_update(item, UpdateExpression, names, values)
+            self.items[self._key(Key)] = item
+        return {"Attributes": copy.deepcopy(old)} if ReturnValues == "ALL_OLD" and old else {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ScanIndexForward=True, Limit=None,
+              ExclusiveStartKey=None, ProjectionExpression=None, ExpressionAttributeNames=None):
+        outbound("dynamodb")
+        partition, sort = self.key_schema
+        # the bot only queries on the partition key
+        partition_value = ExpressionAttributeValues[KeyConditionExpression.split("=")[1].strip()]
+        with self._lock:
+            items = sorted(
+                (item for item in self.items.values() if item[partition] == partition_value),
+                key=lambda item: item[sort],
+                reverse=not ScanIndexForward,
+            )
+        if ExclusiveStartKey:
+            start = ExclusiveStartKey[sort]
+            items = [item for item in items if (item[sort] < start if not ScanIndexForward else item[sort] > start)]
+        page, rest = (items[:Limit], items[Limit:]) if Limit else (items, [])
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            attributes = [_resolve(name.strip(), names, {}) for name in ProjectionExpression.split(",")]
+            page = [{a: item[a] for a in attributes if a in item} for item in page]
+        response = {"Items": copy.deepcopy(page)}
+        if rest:
+            response["LastEvaluatedKey"] = {partition: partition_value, sort: page[-1][sort]}
+        return response
+
+
+class FakeDynamoDB:
+    """
+    Stands in for boto3.resource("dynamodb"); `meta.client` is itself, for
+    transact_write_items.
+    """
+    def __init__(self, key_schemas=None):
+        self.key_schemas = key_schemas or {}
+        self.tables = {}
+        self.meta = SimpleNamespace(client=self)
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name, self.key_schemas.get(name, ("guild_id",)))
+        return self.tables[name]
+
+    def reset(self):
+        """
+        Empties every table but keeps the Table objects (modules hold on to them).
+        """
+        for table in self.tables.values():
+            table.items.clear()
+
+    def batch_get_item(self, RequestItems):
+        outbound("dynamodb")
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            with table._lock:
+                found = [table.items.get(table._key(key)) for key in request["Keys"]]
+            responses[name] = [copy.deepcopy(item) for item in found if item is not None]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None):
+        from boto3.dynamodb.types import TypeDeserializer # type: ignore
+        deserializer = TypeDeserializer()
+
+        def deserialize(attributes):
+            return {k: deserializer.deserialize(v) for k, v in (attributes or {}).items()}
+
+        outbound("dynamodb")
+        # check every condition before writing anything, like the real transaction
+        reasons = []
+        for operation in TransactItems:
+            (kind, spec), = operation.items()
+            reasons.append("None")
+            if kind == "Delete":
+                table = self.Table(spec["TableName"])
+                item = table.items.get(table._key(deserialize(spec["Key"])))
+                if not check_condition(item, spec.get("ConditionExpression"), spec.get("ExpressionAttributeNames") or {},
+                                       deserialize(spec.get("ExpressionAttributeValues"))):
+                    reasons[-1] = "ConditionalCheckFailed"
+        if "ConditionalCheckFailed" in reasons:
+            raise FakeClientError("TransactionCanceledException", reasons)
+        for operation in TransactItems:
+            (kind, spec), = operation.items()
+            table = self.Table(spec["TableName"])
+            with table._lock:
+                if kind == "Put":
+                    item = deserialize(spec["Item"])
+                    table.items[table._key(item)] = item
+                elif kind == "Delete":
+                    table.items.pop(table._key(deserialize(spec["Key"])), None)
+        return {}
+
+
+# LAMBDA
+class FakeLambda:
+    """
+    Records Event invocations instead of running them; the replay runs them
+    through main.handler afterwards.
+    """
+    def __init__(self):
+        self.invocations = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        outbound("lambda")
+        self.invocations.append(json.loads(Payload))
+        return {"StatusCode": 202}
+
+    def drain(self):
+        events, self.invocations = self.invocations, []
+        return events
+
+
+# HTTP
+def load_json(name):
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+GOOGLE_BOOKS_RESPONSE = load_json("google_books_search.json")
+GOOGLE_BOOKS_TOTAL = 100
+CHANNELS = [
+    {"id": "900000000000000001", "type": 2, "name": "General"},
+    {"id": "900000000000000002", "type": 0, "name": "megathreads"},
+    {"id": "900000000000000003", "type": 5, "name": "announcements"},
+]
+DEFINITIONS = {
+    "ephemeral": [{
+        "word": "ephemeral",
+        "meanings": [
+            {"partOfSpeech": "adjective", "definitions": [
+                {"definition": "Lasting for a short period of time."},
+                {"definition": "Existing for only one day, as with some flowers or insects."},
+            ]},
+            {"partOfSpeech": "noun", "definitions": [
+                {"definition": "Something which lasts for a short period of time."},
+            ]},
+        ],
+    }],
+}
+GREETING_TEXT = "\n".join(f"Hello there, reader number {i}! 👋" for i in range(20))
+_ids = itertools.count(1)
+
+
+def make_response(status_code, body=None, url=""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.reason = "OK" if status_code < 400 else "Error"
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+    response.encoding = "utf-8"
+    response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+    return response
+
+
+def discord_response(method, path):
+    if method == "GET" and path.endswith("/channels"):
+        return 200, CHANNELS
+    if method == "DELETE":
+        return 204, None
+    if method == "POST" and (path.endswith("/scheduled-events") or path.endswith("/threads")):
+        return 200, {"id": str(910000000000000000 + next(_ids))}
+    if method == "POST" and path.endswith("/messages"):
+        return 200, {"id": str(920000000000000000 + next(_ids))}
+    return 200, {}
+
+
+def google_books_response(params):
+    """
+    A Google Books page of GOOGLE_BOOKS_TOTAL results, made by cycling through the
+    recorded items so paging through them behaves like the real API.
+    """
+    items = GOOGLE_BOOKS_RESPONSE["items"]
+    start = int(params.get("startIndex", 0))
+    end = min(start + int(params.get("maxResults", 10)), GOOGLE_BOOKS_TOTAL)
+    page = []
+    for index in range(start, end):
+        item = copy.deepcopy(items[index % len(items)])
+        if index >= len(items):
+            item["id"] = f"{item['id']}-{index}"
+            item["volumeInfo"]["title"] = f"{item['volumeInfo']['title']} (vol. {index // len(items) + 1})"
+        page.append(item)
+    return {"kind": "books#volumes", "totalItems": GOOGLE_BOOKS_TOTAL, "items": page}
+
+
+def fake_request(session, method, url, **kwargs):
+    """
+    Replacement for requests.Session.request.
+    """
+    method = method.upper()
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("discord.com"):
+        outbound("discord")
+        status, body = discord_response(method, parsed.path)
+    elif parsed.netloc == "www.googleapis.com":
+        outbound("google_books")
+        status, body = 200, google_books_response(kwargs.get("params") or {})
+    elif parsed.netloc == "api.dictionaryapi.dev":
+        outbound("dictionary")
+        word = parsed.path.rsplit("/", 1)[-1]
+        body = DEFINITIONS.get(word)
+        status = 200 if body else 404
+        if not body:
+            body = {"title": "No Definitions Found"}
+    elif parsed.netloc == "router.huggingface.co":
+        outbound("huggingface")
+        status, body = 200, {"choices": [{"message": {"content": GREETING_TEXT}}]}
+    else:
+        raise AssertionError(f"Unexpected outbound request to {url}")
+    return make_response(status, body, url)
+
+
+@contextmanager
+def fake_http():
+    original = requests.Session.request
+    requests.Session.request = fake_request
+    try:
+        yield
+    finally:
+        requests.Session.request = original
@@ -0,0 +1,115 @@
+"""
+Per-request overhead of the native Lambda handler vs. the previous
+Mangum -> WsgiToAsgi -> Flask stack, for the same signed PING.
+
+Both paths run the same signature check and the same `interact`, so the
+difference is the adapter layers. Needs flask, mangum and asgiref installed
+(all in requirements-dev.txt).
+
+Usage (from src/):
+    python benchmarks/handler_overhead.py [--requests 2000]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from nacl.signing import SigningKey
+
+SIGNING_KEY = SigningKey.generate()
+os.environ["DISCORD_PUBLIC_KEY"] = SIGNING_KEY.verify_key.encode().hex()
+os.environ["METRICS_ENABLED"] = "false"
+
+import main  # noqa: E402
+
+
+def signed_event(body):
+    raw_body = json.dumps(body)
+    timestamp = str(int(time.time()))
+    signature = SIGNING_KEY.sign(f"{timestamp}{raw_body}".encode()).signature.hex()
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": "/",
+        "rawQueryString": "",
+        "headers": {
+            "content-type": "application/json",
+            "content-length": str(len(raw_body)),
+            "host": "example.lambda-url.us-east-1.on.aws",
+            "x-signature-ed25519": signature,
+            "x-signature-timestamp": timestamp,
+        },
+        "requestContext": {
+            "http": {"method": "POST", "path": "/", "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "bench"},
+            "domainName": "example.lambda-url.us-east-1.on.aws",
+            "requestId": "bench",
+            "stage": "$default",
+        },
+        "body": raw_body,
+        "isBase64Encoded": False,
+    }
+
+
+def previous_stack_handler():
+    """
+    Rebuilds the pre-native stack: Mangum(WsgiToAsgi(Flask)) with an async route.
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    from flask import Flask, abort, request
+    from mangum import Mangum
+
+    app = Flask("previous_stack")
+
+    @app.route("/", methods=["POST"])
+    async def interactions():
+        if not main.verify_request(request.get_data(), request.headers.get("X-Signature-Ed25519"), request.headers.get("X-Signature-Timestamp")):
+            abort(401)
+        return main.interact(request.json)
+
+    return Mangum(WsgiToAsgi(app), lifespan="off")
+
+
+def signed_pings(count):
+    # replayed signatures are rejected, so every request is signed separately
+    return [signed_event({"type": 1, "id": os.urandom(8).hex()}) for _ in range(count)]
+
+
+def measure(handler, requests):
+    timings = []
+    for event in signed_pings(requests):
+        started = time.perf_counter()
+        response = handler(event, None)
+        timings.append((time.perf_counter() - started) * 1000)
+    assert response["statusCode"] == 200, response
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{name:<28} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+    return p50
+
+
+def main_():
+    parser = argparse.ArgumentParser(description="Native handler vs Mangum/WsgiToAsgi/Flask overhead")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    previous = previous_stack_handler()
+    # warm up both paths
+    measure(main.handler, 50)
+    measure(previous, 50)
+
+    native_p50 = report("native handler", measure(main.handler, args.requests))
+    previous_p50 = report("mangum + wsgi-to-asgi + flask", measure(previous, args.requests))
+    print(f"overhead removed per request: {previous_p50 - native_p50:.3f} ms (p50)")
+
+
+if __name__ == "__main__":
+    main_()
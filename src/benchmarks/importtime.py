@@ -0,0 +1,70 @@
+"""
+Import-time profile of the Lambda entry point.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter (so nothing is
+cached in sys.modules) and summarizes the slowest imports by cumulative time.
+
+Usage (from src/):
+    python benchmarks/importtime.py [--module main] [--top 15] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+# the modules read these at import/first use; the values don't matter here
+DUMMY_ENV = {
+    "CURRENT_BOOK_TABLE": "benchmark-current-book",
+    "HISTORY_BOOK_TABLE": "benchmark-history",
+    "CACHE_TABLE": "benchmark-cache",
+    "DISCORD_PUBLIC_KEY": "00" * 32,
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+
+def profile_import(module):
+    """
+    Returns [(self_us, cumulative_us, depth, name)] for one cold import of `module`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env={**os.environ, **DUMMY_ENV},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the Lambda entry point")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    totals = [next(cumulative for _, cumulative, _, name in rows if name == args.module) for rows in runs]
+
+    print(f"import {args.module}: median {statistics.median(totals) / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms, {args.runs} runs)")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module (top {args.top}, last run)")
+    slowest = sorted(runs[-1], key=lambda row: row[1], reverse=True)[:args.top]
+    for self_us, cumulative_us, depth, name in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main()
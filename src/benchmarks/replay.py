@@ -0,0 +1,339 @@
+"""
+Replays a recorded book club session (data/interactions.json) through
+main.interact with DynamoDB, Discord, Google Books, the Dictionary API and
+Hugging Face replaced by the in-process fakes in fakes.py, and reports per
+step:
+
+- p50/p95/p99 latency of the interaction response (what Discord waits for)
+- outbound calls per service
+- peak allocated KiB while handling the step (tracemalloc, separate pass)
+
+Deferred stages (the modal submits' background work) are dispatched through a
+fake Lambda client and replayed through main.handler as "<step> [deferred]".
+
+Every pass starts from empty tables and empty in-process caches, like a fresh
+container that has already imported its handlers. Steps can take their
+custom_id from an earlier step's response ("custom_id_from": the Nth button,
+or the modal it opened), so the corpus keeps working when custom_ids carry
+state. "{{future_date}}" in a payload becomes a date 30 days ahead.
+
+The results are compared against data/replay_baseline.json. Without --latency or
+--no-latency a comparison run injects the latencies the baseline was recorded
+with, so p50/p95 are always compared; with other latencies only calls and
+allocations are. Exits with status 1 on a regression.
+
+Usage (from src/):
+    python benchmarks/replay.py [--iterations 20] [--latency discord=0 ...]
+    python benchmarks/replay.py --no-latency --save-baseline
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, redirect_stdout
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "app"))
+sys.path.insert(0, HERE)
+
+import fakes  # noqa: E402
+
+CORPUS = os.path.join(HERE, "data", "interactions.json")
+BASELINE = os.path.join(HERE, "data", "replay_baseline.json")
+
+TABLES = {
+    "CURRENT_BOOK_TABLE": "replay-current-book",
+    "HISTORY_BOOK_TABLE": "replay-reading-history",
+    "CACHE_TABLE": "replay-cache",
+}
+ENVIRONMENT = {
+    **TABLES,
+    # deferred stages go through the (fake) async self-invoke, like on Lambda
+    "AWS_LAMBDA_FUNCTION_NAME": "replay",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+# allowed growth before a step counts as regressed
+DEFAULT_TOLERANCE = 0.25
+MIN_LATENCY_DELTA_MS = 5.0
+MIN_ALLOC_DELTA_KIB = 16.0
+MIN_SAMPLES_FOR_TAIL = 20
+
+
+@contextmanager
+def fake_backends():
+    """
+    Points the bot's AWS handles and HTTP sessions at the fakes; everything
+    is restored on exit.
+    """
+    saved_env = {name: os.environ.get(name) for name in ENVIRONMENT}
+    os.environ.update(ENVIRONMENT)
+
+    import main
+    from utils.aws import dynamodb, lambda_invoke
+    from utils.catalog import catalog, Catalog
+
+    fake_dynamodb = fakes.FakeDynamoDB({TABLES["HISTORY_BOOK_TABLE"]: ("guild_id", "finished_at")})
+    fake_lambda = fakes.FakeLambda()
+    lazy = [dynamodb.dynamodb, dynamodb.current_book_table, dynamodb.history_book_table, dynamodb.cache_table, lambda_invoke.lambda_client, catalog]
+    saved_instances = [resource._instance for resource in lazy]
+    dynamodb.dynamodb._instance = fake_dynamodb
+    lambda_invoke.lambda_client._instance = fake_lambda
+    catalog_dir = tempfile.mkdtemp(prefix="replay-catalog-")
+    catalog._instance = Catalog(catalog_dir)
+    # tables resolve again, against the fake
+    for resource in lazy[1:4]:
+        resource._instance = None
+
+    try:
+        with fakes.fake_http():
+            yield main, fake_dynamodb, fake_lambda
+    finally:
+        for resource, instance in zip(lazy, saved_instances):
+            resource._instance = instance
+        shutil.rmtree(catalog_dir, ignore_errors=True)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def reset_process_state(main, fake_dynamodb):
+    """
+    Empty tables and in-process caches, with a full greeting pool persisted so
+    /hello doesn't start a refill in the middle of the replay.
+    """
+    from config import STAGE
+    from command_handler import greeting_pool
+    from utils.google_books import search_cache
+    from utils.dictionary import definition_cache
+    from utils.discord_actions import channel_directories
+    from utils.circuit_breaker import breakers
+    from utils.autocomplete import guild_indexes
+    from utils.catalog import catalog
+
+    fake_dynamodb.reset()
+    search_cache.memory.clear()
+    definition_cache.memory.clear()
+    channel_directories.clear()
+    breakers.clear()
+    guild_indexes.memory.clear()
+    catalog.clear()
+    greeting_pool.greetings.clear()
+    greeting_pool.loaded = False
+
+    cache = fake_dynamodb.Table(TABLES["CACHE_TABLE"])
+    greetings = [f"Hello from the replay, reader {i}! 👋" for i in range(greeting_pool.batch_size + greeting_pool.low_water + 10)]
+    cache.items[(f"greetings#{STAGE}",)] = {
+        "guild_id": f"greetings#{STAGE}",
+        "value": json.dumps(greetings),
+        "ttl": int(time.time()) + 24*60*60,
+    }
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["steps"]
+
+
+def resolve_interaction(step, responses):
+    """
+    The step's payload with {{future_date}} filled in and its custom_id taken
+    from an earlier response when the step asks for it.
+    """
+    future_date = (date.today() + timedelta(days=30)).strftime("%m-%d-%Y")
+    interaction = json.loads(json.dumps(step["interaction"]).replace("{{future_date}}", future_date))
+
+    source = step.get("custom_id_from")
+    if source:
+        response = responses[source["step"]]
+        if source.get("modal"):
+            custom_id = response["data"]["custom_id"]
+        else:
+            buttons = [component for row in response["data"]["components"] for component in row["components"]]
+            custom_id = buttons[source["button"]]["custom_id"]
+        interaction["data"]["custom_id"] = custom_id
+    return interaction
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.calls = Counter()
+        self.alloc_kib = None
+
+    def summary(self):
+        if len(self.latencies_ms) > 1:
+            cuts = statistics.quantiles(self.latencies_ms, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = self.latencies_ms[0]
+        return {
+            "n": len(self.latencies_ms),
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "alloc_kib": self.alloc_kib,
+            "calls": dict(sorted(self.calls.items())),
+        }
+
+
+def timed(fn, stats, measure_memory):
+    """
+    Runs fn, recording its latency (or its peak allocations) and outbound calls.
+    """
+    before = fakes.snapshot_calls()
+    if measure_memory:
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if measure_memory:
+        stats.alloc_kib = round((tracemalloc.get_traced_memory()[1] - start_bytes) / 1024, 1)
+    else:
+        stats.latencies_ms.append(elapsed_ms)
+    stats.calls = fakes.snapshot_calls() - before
+    return result
+
+
+def replay_pass(main, fake_dynamodb, fake_lambda, steps, stats, measure_memory=False):
+    reset_process_state(main, fake_dynamodb)
+    responses = {}
+    for step in steps:
+        name = step["name"]
+        interaction = resolve_interaction(step, responses)
+        response = timed(lambda: main.interact(interaction), stats.setdefault(name, StepStats()), measure_memory)
+        if response.get("type") != step["expect_type"]:
+            raise AssertionError(f"{name}: expected response type {step['expect_type']}, got {response}")
+        responses[name] = response
+
+        for event in fake_lambda.drain():
+            timed(lambda: main.handler(event, None), stats.setdefault(f"{name} [deferred]", StepStats()), measure_memory)
+    return responses
+
+
+def replay(steps, iterations, verbose=False):
+    """
+    One warm-up pass, `iterations` timed passes and one tracemalloc pass.
+    Returns {step name: summary}.
+    """
+    stats = {}
+    output = sys.stdout if verbose else io.StringIO()
+    with fake_backends() as (main, fake_dynamodb, fake_lambda), redirect_stdout(output):
+        replay_pass(main, fake_dynamodb, fake_lambda, steps, {})
+        for _ in range(iterations):
+            replay_pass(main, fake_dynamodb, fake_lambda, steps, stats)
+        tracemalloc.start()
+        try:
+            replay_pass(main, fake_dynamodb, fake_lambda, steps, stats, measure_memory=True)
+        finally:
+            tracemalloc.stop()
+    return {name: step_stats.summary() for name, step_stats in stats.items()}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns a list of regressions (empty when the run is within tolerance).
+    """
+    compare_latency = baseline.get("latency_ms") == fakes.latency_ms
+    regressions = []
+    for name, result in results.items():
+        base = baseline["steps"].get(name)
+        if base is None:
+            continue
+        if compare_latency:
+            # tail percentiles of a handful of samples are just the slowest sample
+            metrics = ("p50_ms", "p95_ms") if result["n"] >= MIN_SAMPLES_FOR_TAIL else ("p50_ms",)
+            for metric in metrics:
+                if result[metric] > base[metric] * (1 + tolerance) and result[metric] - base[metric] > MIN_LATENCY_DELTA_MS:
+                    regressions.append(f"{name}: {metric} {base[metric]:.2f} -> {result[metric]:.2f}")
+        for service, count in result["calls"].items():
+            if count > base["calls"].get(service, 0):
+                regressions.append(f"{name}: {service} calls {base['calls'].get(service, 0)} -> {count}")
+        if result["alloc_kib"] > base["alloc_kib"] * (1 + tolerance) and result["alloc_kib"] - base["alloc_kib"] > MIN_ALLOC_DELTA_KIB:
+            regressions.append(f"{name}: alloc {base['alloc_kib']} KiB -> {result['alloc_kib']} KiB")
+    return regressions
+
+
+def print_report(results):
+    print(f"{'step':<38}{'n':>4}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc KiB':>11}  outbound calls")
+    totals = Counter()
+    for name, result in results.items():
+        totals.update(result["calls"])
+        calls = ", ".join(f"{service} {count}" for service, count in result["calls"].items()) or "-"
+        print(f"{name:<38}{result['n']:>4}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['alloc_kib']:>11.1f}  {calls}")
+    print("outbound calls per session: " + ", ".join(f"{service} {count}" for service, count in sorted(totals.items())))
+
+
+def parse_latency(values):
+    latency = {}
+    for value in values:
+        service, _, ms = value.partition("=")
+        if service not in fakes.DEFAULT_LATENCY_MS:
+            raise SystemExit(f"Unknown service {service!r}, expected one of {', '.join(fakes.DEFAULT_LATENCY_MS)}")
+        latency[service] = float(ms)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", nargs="*", default=[], metavar="SERVICE=MS",
+                        help=f"injected latency per call (defaults: {fakes.DEFAULT_LATENCY_MS})")
+    parser.add_argument("--no-latency", action="store_true", help="no injected latency, measures the bot's own overhead")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.no_latency:
+        fakes.latency_ms.update({service: 0 for service in fakes.latency_ms})
+    elif not args.latency and baseline:
+        # measure under the baseline's profile so its latencies can be compared
+        fakes.latency_ms.update(baseline.get("latency_ms", {}))
+    fakes.latency_ms.update(parse_latency(args.latency))
+
+    results = replay(load_corpus(args.corpus), args.iterations, verbose=args.verbose)
+    print(f"latency injected per call (ms): {fakes.latency_ms}")
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"latency_ms": fakes.latency_ms, "steps": results}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"saved baseline to {args.baseline}")
+        return
+
+    if baseline is None:
+        print("no baseline to compare against (run with --save-baseline)")
+        return
+    if baseline.get("latency_ms") != fakes.latency_ms:
+        print("baseline was recorded with different injected latencies, comparing calls and allocations only")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
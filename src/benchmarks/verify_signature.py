@@ -0,0 +1,69 @@
+"""
+Cost of checking an interaction's signature: discord_interactions.verify_key
+(decodes the public key on every call) vs. utils.verification.InteractionVerifier
+(key decoded once), and how cheaply the verifier turns away stale and replayed
+requests. Needs discord-interactions for the "before" row
+(`pip install discord-interactions==0.4.0`).
+
+Usage (from src/):
+    python benchmarks/verify_signature.py [--requests 5000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from nacl.signing import SigningKey
+from utils.verification import InteractionVerifier, Verification  # noqa: E402
+
+SIGNING_KEY = SigningKey.generate()
+PUBLIC_KEY = SIGNING_KEY.verify_key.encode().hex()
+
+
+def signed(count, timestamp):
+    requests = []
+    for i in range(count):
+        raw_body = f'{{"type":1,"id":"{i}"}}'.encode()
+        requests.append((raw_body, SIGNING_KEY.sign(timestamp.encode() + raw_body).signature.hex(), timestamp))
+    return requests
+
+
+def median_us(check, requests):
+    samples = []
+    for raw_body, signature, timestamp in requests:
+        started = time.perf_counter()
+        check(raw_body, signature, timestamp)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    now = str(int(time.time()))
+    fresh = signed(args.requests, now)
+    verifier = InteractionVerifier(PUBLIC_KEY, seen_size=args.requests)
+
+    rows = []
+    try:
+        from discord_interactions import verify_key
+        rows.append(("verify_key (before)", median_us(lambda b, s, t: verify_key(b, s, t, PUBLIC_KEY), fresh)))
+    except ImportError:
+        print("discord-interactions not installed, skipping the before row")
+    rows.append(("verifier, valid", median_us(verifier.verify, fresh)))
+    assert verifier.seen() == args.requests
+    rows.append(("verifier, replayed", median_us(verifier.verify, fresh)))
+    rows.append(("verifier, stale", median_us(verifier.verify, signed(args.requests, str(int(now) - 3600)))))
+    assert verifier.verify(*fresh[0]) is Verification.REPLAYED
+
+    for name, us in rows:
+        print(f"{name:<22} p50 {us:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
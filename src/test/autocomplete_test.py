@@ -0,0 +1,108 @@
+import zlib
+from unittest.mock import Mock, patch
+import command_handler
+import helper_functions
+from utils.autocomplete import BookIndex, PrefixIndex, pack_index, unpack_index, guild_indexes, learn_books, suggest, HEADER, SECTION
+from utils.aws.dynamodb import LifecycleResult, LifecycleStatus
+from utils.cache import MISSING
+from utils.router import Interaction
+
+
+def test_prefix_matches_any_word_and_ranks_by_use():
+    index = PrefixIndex()
+    index.add("The Lord of the Rings")
+    index.add("Lord Jim")
+    index.add("Lord of the Flies", weight=3)
+    index.add("Brontë Sisters")
+
+    # names that start with the prefix come first, the more used ones first
+    assert index.lookup("lord") == ["Lord of the Flies", "Lord Jim", "The Lord of the Rings"]
+    assert index.lookup("RINGS") == ["The Lord of the Rings"]
+    assert index.lookup("bronte") == ["Brontë Sisters"]
+    assert index.lookup("lord", limit=1) == ["Lord of the Flies"]
+    assert index.lookup("")[0] == "Lord of the Flies"
+    assert index.lookup("zzz") == []
+
+
+def test_packed_index_loads_without_reindexing():
+    index = BookIndex()
+    index.add_volumes([
+        {"volumeInfo": {"title": "Dune", "authors": ["Frank Herbert"]}},
+        {"volumeInfo": {"title": "Dune Messiah", "authors": ["Frank Herbert"]}},
+        {"volumeInfo": {"title": "Children of Dune"}},
+    ])
+
+    loaded = unpack_index(pack_index(index))
+
+    assert loaded.fields["title"].keys == index.fields["title"].keys
+    assert loaded.lookup("title", "dune") == ["Dune", "Dune Messiah", "Children of Dune"]
+    assert loaded.lookup("author", "herb") == ["Frank Herbert"]
+    # still a working index after loading
+    assert loaded.fields["title"].add("Dune Road")
+    assert loaded.lookup("title", "dune r") == ["Dune Road"]
+
+
+def test_packed_weights_are_little_endian():
+    index = BookIndex()
+    index.fields["title"].add("Dune", weight=0x01020304)
+
+    data = zlib.decompress(pack_index(index))
+
+    weights = HEADER.size + SECTION.size + len(b"Dune")
+    assert data[weights:weights + 4] == bytes([4, 3, 2, 1])
+
+
+def test_trim_drops_the_least_used_names():
+    index = PrefixIndex()
+    for i, name in enumerate(["Emma", "Dune", "Circe"]):
+        index.add(name, weight=i + 1)
+
+    assert index.trim(2).lookup("") == ["Circe", "Dune"]
+
+
+@patch.object(guild_indexes, "persist", False)
+@patch("utils.aws.dynamodb.get_reading_history", return_value=([{"title": "Emmanuel", "authors": "Unknown Author"}], None))
+def test_suggestions_put_the_guilds_books_before_the_seed_list(mock_history):
+    guild_indexes.memory.clear()
+
+    response = command_handler.search_autocomplete(Interaction({
+        "type": 4,
+        "guild_id": "g",
+        "data": {"name": "search", "options": [{"name": "title", "value": "emm", "focused": True}]}
+    }))
+
+    assert response == {"type": 8, "data": {"choices": [{"name": "Emmanuel", "value": "Emmanuel"}, {"name": "Emma", "value": "Emma"}]}}
+    assert suggest("g", "author", "unknown") == []
+    assert guild_indexes.get("g") is not MISSING
+    mock_history.assert_called_once()
+
+
+@patch.object(guild_indexes, "set")
+@patch.object(guild_indexes, "get")
+def test_learned_weights_are_persisted(mock_get, mock_set):
+    index = BookIndex()
+    index.add_book("Dune", ["Frank Herbert"])
+    mock_get.return_value = index
+
+    learn_books("g", [{"volumeInfo": {"title": "Dune", "authors": ["Frank Herbert"]}}])
+
+    stored = mock_set.call_args.args[1]
+    assert stored.fields["title"].weights[0] == 2
+
+
+@patch.object(guild_indexes, "set")
+@patch.object(guild_indexes, "get")
+def test_finished_books_rank_like_history(mock_get, mock_set):
+    index = BookIndex()
+    index.add_book("Emma", ["Jane Austen"], weight=3)
+    mock_get.return_value = index
+    finished = {"guild_id": "g", "title": "Emmanuel", "authors": "Unknown Author", "version": 1}
+    state = Mock(current_book=finished, is_admin=Mock(return_value=True))
+
+    with patch.object(helper_functions, "finish_current_book", return_value=LifecycleResult(LifecycleStatus.OK, finished)), \
+            patch.object(helper_functions, "remember_book"):
+        helper_functions.handle_finish_book("g", "u", [], state, interaction_id="1")
+
+    stored = mock_set.call_args.args[1]
+    assert stored.lookup("title", "emm") == ["Emmanuel", "Emma"]
+    assert stored.lookup("author", "unknown") == []
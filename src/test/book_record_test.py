@@ -0,0 +1,37 @@
+import pytest
+
+VOLUME = {
+    "id": "B1hSG45JCX4C",
+    "volumeInfo": {
+        "title": "Dune",
+        "authors": ["Frank Herbert", "Brian Herbert"],
+        "description": "Set on the desert planet Arrakis...",
+        "industryIdentifiers": [
+            {"type": "ISBN_10", "identifier": "0441172717"},
+            {"type": "ISBN_13", "identifier": "9780441172719"},
+        ],
+        "imageLinks": {"thumbnail": "http://books.google.com/books/content?id=B1hSG45JCX4C"},
+        "previewLink": "http://books.google.com/books?id=B1hSG45JCX4C",
+    },
+    "saleInfo": {"country": "US", "saleability": "NOT_FOR_SALE"},
+}
+
+
+def test_pack_round_trip_keeps_fields_the_bot_reads():
+    from app.utils.book_record import pack_volumes, unpack_volumes
+
+    (volume,) = unpack_volumes(pack_volumes([VOLUME]))
+
+    assert volume["id"] == "B1hSG45JCX4C"
+    assert volume["volumeInfo"]["title"] == "Dune"
+    assert volume["volumeInfo"]["authors"] == ["Frank Herbert", "Brian Herbert"]
+    assert {"type": "ISBN_13", "identifier": "9780441172719"} in volume["volumeInfo"]["industryIdentifiers"]
+    assert volume["volumeInfo"]["previewLink"] == VOLUME["volumeInfo"]["previewLink"]
+    assert "saleInfo" not in volume and "description" not in volume["volumeInfo"]
+
+
+def test_unpack_rejects_garbage():
+    from app.utils.book_record import unpack_records
+
+    with pytest.raises(ValueError, match="Invalid packed book records."):
+        unpack_records(b"not zlib")
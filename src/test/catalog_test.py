@@ -0,0 +1,93 @@
+from unittest.mock import Mock, patch
+from utils.book_record import BookRecord
+from utils.catalog import Catalog
+
+
+def record(volume_id, title, authors=(), isbn_13="", isbn_10=""):
+    return BookRecord(volume_id, title, tuple(authors), isbn_13, isbn_10, "", "")
+
+
+DUNE = record("a", "Dune", ["Frank Herbert"], isbn_13="9780441172719", isbn_10="0441172717")
+MESSIAH = record("b", "Dune Messiah", ["Frank Herbert"])
+EMMA = record("c", "Emma", ["Jane Austen"], isbn_13="9780141439587")
+
+
+def test_search_by_words_and_isbn(tmp_path):
+    catalog = Catalog(str(tmp_path))
+    assert catalog.add([MESSIAH, DUNE, EMMA]) == 3
+
+    # exact title first, then in the order the volumes were seen
+    assert catalog.search({"title": "dune"}, limit=10) == [DUNE, MESSIAH]
+    assert catalog.search({"title": "Dune", "author": "herbert"}, limit=1) == [DUNE]
+    assert catalog.search({"author": "austen"}, limit=10) == [EMMA]
+    assert catalog.search({"isbn": "978-0-441-17271-9"}, limit=10) == [DUNE]
+    assert catalog.search({"isbn": "0441172717"}, limit=10) == [DUNE]
+    assert catalog.search({"title": "dune", "author": "austen"}, limit=10) == []
+    # publishers aren't stored, so only Google can answer
+    assert catalog.search({"publisher": "ace"}, limit=10) is None
+
+
+def test_known_volumes_and_isbns_are_not_stored_twice(tmp_path):
+    catalog = Catalog(str(tmp_path))
+    catalog.add([DUNE])
+
+    assert catalog.add([DUNE, record("isbn:9780441172719", "Dune", isbn_13="9780441172719")]) == 0
+    assert len(catalog) == 1
+
+
+def test_reindexed_catalog_is_read_through_the_index(tmp_path):
+    catalog = Catalog(str(tmp_path), reindex_after=2)
+    catalog.add([DUNE, MESSIAH])     # reaches reindex_after: goes into the index
+    catalog.add([EMMA])              # stays pending
+
+    assert (catalog.indexed, len(catalog.pending)) == (2, 1)
+    reopened = Catalog(str(tmp_path))
+    assert (reopened.indexed, len(reopened.pending)) == (2, 1)
+    assert reopened.search({"title": "dune"}, limit=10) == [DUNE, MESSIAH]
+    assert reopened.search({"title": "emma"}, limit=10) == [EMMA]
+    assert reopened.add([DUNE]) == 0
+
+
+def test_appends_and_rebuilds_by_another_process_are_picked_up(tmp_path):
+    reader = Catalog(str(tmp_path))
+    writer = Catalog(str(tmp_path))
+
+    writer.add([DUNE])
+    assert reader.search({"title": "dune"}, limit=10) == [DUNE]
+    writer.reindex()
+    writer.add([EMMA])
+    assert reader.search({"title": "emma"}, limit=10) == [EMMA]
+    assert reader.indexed == 1
+
+
+@patch("utils.search_results.search_books")
+@patch("utils.search_results.search_catalog")
+def test_search_prefers_the_catalog(mock_catalog, mock_search):
+    from utils.search_results import find_books
+
+    mock_catalog.return_value = [DUNE.to_volume()]
+    assert find_books({"title": "dune"}) == ([DUNE.to_volume()], "catalog")
+    mock_search.assert_not_called()
+
+    mock_catalog.return_value = []
+    mock_search.return_value = [MESSIAH.to_volume()]
+    assert find_books({"title": "dune"}) == ([MESSIAH.to_volume()], "google")
+    assert find_books({"title": "dune"}, online=True)[1] == "google"
+    assert mock_catalog.call_count == 2
+
+
+@patch("helper_functions.save_search_results")
+@patch("helper_functions.find_books", return_value=([MESSIAH.to_volume()], "google"))
+def test_search_google_button_replaces_catalog_results(mock_find, mock_save):
+    from helper_functions import handle_search_online, search_page
+    catalog_results = {"books": [DUNE.to_volume()], "query": {"title": "dune"}, "exhausted": True, "source": "catalog"}
+    assert search_page("1", catalog_results, 0)["components"][1]["components"][0]["custom_id"] == "search_online_1"
+
+    mock_save.return_value = {**catalog_results, "books": [MESSIAH.to_volume()], "source": "google"}
+    response = handle_search_online(Mock(search_results=catalog_results), "1")
+
+    mock_find.assert_called_once_with({"title": "dune"}, online=True)
+    assert mock_save.call_args.kwargs["source"] == "google"
+    assert response["type"] == 7
+    assert response["data"]["embeds"][0]["title"] == "1) Dune Messiah"
+    assert len(response["data"]["components"]) == 1
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+import pytest
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, DependencyUnavailable, guarded, OPEN, CLOSED
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    circuit_breaker.breakers.clear()
+    yield
+    circuit_breaker.breakers.clear()
+
+
+def test_breaker_opens_on_error_rate_and_probes_after_open_seconds():
+    breaker = CircuitBreaker("google_books", min_calls=4, error_rate=0.5, open_seconds=30, shared=False)
+    for failed in (False, True, False, True):
+        breaker.before_call()
+        breaker.record(failed, 10)
+
+    assert breaker.state == OPEN
+    with pytest.raises(DependencyUnavailable):
+        breaker.before_call()
+
+    # once open_seconds have passed one probe goes through, others still fail fast
+    breaker.open_until = 0
+    breaker.before_call()
+    with pytest.raises(DependencyUnavailable):
+        breaker.before_call()
+    breaker.record(False, 10)
+    assert breaker.state == CLOSED
+    assert breaker.health()["rejected"] == 2
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("dictionary", min_calls=2, slow_call_ms=100, shared=False)
+    breaker.record(False, 500)
+    breaker.record(False, 500)
+
+    assert breaker.state == OPEN
+    assert breaker.health()["error_rate"] == 1.0
+
+
+def test_guarded_counts_5xx_but_not_429():
+    for status in (429, 429, 503):
+        with guarded("discord", "GET /channels/:id") as call:
+            call.status_code = status
+
+    health = circuit_breaker.dependency_health()["discord"]
+    assert health["calls"] == 3
+    assert health["error_rate"] == pytest.approx(1 / 3, abs=0.001)
+
+
+@patch("utils.discord_client.requests.Session")
+def test_passed_deadline_is_not_a_dependency_failure(mock_session):
+    from utils.deadline import DeadlineExceeded, deadline_scope
+    from utils.discord_client import DiscordClient
+
+    client = DiscordClient("token")
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            client.request("GET", "/channels/123456789012345678")
+
+    client.session.request.assert_not_called()
+    assert "discord" not in circuit_breaker.dependency_health()
+
+
+@patch("utils.aws.dynamodb.put_cache_entry")
+@patch("utils.aws.dynamodb.get_cache_entry")
+def test_open_breaker_is_shared_through_the_cache_table(mock_get_entry, mock_put_entry):
+    opening = CircuitBreaker("huggingface", min_calls=1, shared=True)
+    mock_get_entry.return_value = (False, None)
+    opening.before_call()
+    opening.record(True, 10)
+
+    key, value = mock_put_entry.call_args.args
+    assert key == "breaker#huggingface"
+
+    # another container picks it up on its next call
+    other = CircuitBreaker("huggingface", shared=True)
+    mock_get_entry.return_value = (True, value)
+    with pytest.raises(DependencyUnavailable):
+        other.before_call()
+
+
+@patch("utils.dictionary.requests.get")
+def test_open_breaker_answers_with_ephemeral_reply(mock_get):
+    import main
+    from utils.dictionary import definition_cache
+    definition_cache.memory.clear()
+    breaker = circuit_breaker.get_breaker("dictionary")
+    breaker.state = OPEN
+    breaker.open_until = float("inf")
+
+    with patch.object(main, "GuildState"):
+        response = main.dispatch({"type": 2, "id": "1", "data": {"name": "define", "options": [{"name": "word", "value": "quixotic"}]}})
+
+    mock_get.assert_not_called()
+    assert response["data"]["flags"] == 64
+    assert "The dictionary is having trouble" in response["data"]["content"]
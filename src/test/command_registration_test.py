@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest.mock import Mock
+from utils.command_registration import diff_commands, sync_commands, sync_guilds
+
+LOCAL = [
+    {"name": "hello", "description": "Say hello!"},
+    {"name": "define", "description": "Define a word", "options": [
+        {"name": "word", "description": "Get the definition of this word", "type": 3, "required": True},
+    ]},
+]
+# what Discord returns for LOCAL, with its own ids, versions and defaults
+REGISTERED = [
+    {"id": "1", "application_id": "9", "version": "5", "type": 1, "name": "hello", "description": "Say hello!",
+     "default_member_permissions": None, "nsfw": False, "dm_permission": True},
+    {"id": "2", "application_id": "9", "version": "5", "type": 1, "name": "define", "description": "Define a word",
+     "options": [{"type": 3, "name": "word", "description": "Get the definition of this word", "required": True}]},
+]
+
+
+def response(json_body=None):
+    return Mock(status_code=200, json=Mock(return_value=json_body))
+
+
+def test_diff_ignores_discord_fields_and_defaults():
+    diff = diff_commands(LOCAL, REGISTERED)
+    assert not diff.changed
+    assert diff.unchanged == ["hello", "define"]
+
+
+def test_diff_keeps_zero_values():
+    local = [{"name": "roll", "description": "Roll a die", "options": [
+        {"name": "min", "description": "Lowest roll", "type": 4, "min_value": 0},
+    ]}]
+    registered = [{"id": "3", "type": 1, "name": "roll", "description": "Roll a die", "options": [
+        {"type": 4, "name": "min", "description": "Lowest roll"},
+    ]}]
+
+    assert diff_commands(local, registered).updated == ["roll"]
+
+
+def test_diff_finds_created_updated_and_deleted_commands():
+    local = [{"name": "hello", "description": "Say hi!"}, {"name": "search", "description": "Search for a book"}]
+    diff = diff_commands(local, REGISTERED)
+
+    assert (diff.created, diff.updated, diff.deleted) == (["search"], ["hello"], ["define"])
+    assert diff.describe() == "+search ~hello -define"
+
+
+def test_sync_skips_the_put_when_nothing_changed():
+    discord = Mock()
+    discord.get.return_value = response(REGISTERED)
+
+    result = sync_commands(discord, "9", LOCAL)
+
+    assert not result.applied and result.error is None
+    discord.put.assert_not_called()
+
+
+def test_sync_overwrites_all_commands_in_one_put():
+    discord = Mock()
+    discord.get.return_value = response(REGISTERED[:1])
+    discord.put.return_value = response([])
+
+    result = sync_commands(discord, "9", LOCAL, guild_id="42")
+
+    assert result.applied and result.diff.created == ["define"]
+    discord.put.assert_called_once_with("/applications/9/guilds/42/commands", json=LOCAL)
+
+
+def test_guild_fan_out_is_bounded_and_keeps_going_past_failures():
+    in_flight = 0
+    most_in_flight = 0
+    lock = threading.Lock()
+
+    def get(path):
+        nonlocal in_flight, most_in_flight
+        with lock:
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        if "/guilds/13/" in path:
+            raise Exception("403 Missing Access")
+        return response([])
+
+    discord = Mock(get=Mock(side_effect=get), put=Mock(return_value=response([])))
+    guild_ids = [str(i) for i in range(40)]
+
+    started = time.monotonic()
+    results = sync_guilds(discord, "9", LOCAL, guild_ids, concurrency=8)
+
+    assert time.monotonic() - started < 40 * 0.02 / 2
+    assert most_in_flight <= 8
+    assert [result.scope for result in results] == guild_ids
+    assert results[13].error == "403 Missing Access"
+    assert sum(result.applied for result in results) == 39
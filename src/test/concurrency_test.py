@@ -0,0 +1,33 @@
+import time
+
+
+def test_run_concurrently_wall_clock_is_slowest_task():
+    from utils.concurrency import run_concurrently
+
+    started = time.monotonic()
+    outcome = run_concurrently({
+        "a": lambda: time.sleep(0.2) or "a",
+        "b": lambda: time.sleep(0.2) or "b",
+        "c": lambda: time.sleep(0.2) or "c",
+    })
+    elapsed = time.monotonic() - started
+
+    assert outcome.results == {"a": "a", "b": "b", "c": "c"}
+    assert not outcome.errors
+    assert elapsed < 0.5
+
+
+def test_run_concurrently_collects_errors_and_timeouts():
+    from utils.concurrency import run_concurrently
+
+    def fail():
+        raise ValueError("bad channel")
+
+    outcome = run_concurrently(
+        {"ok": lambda: 1, "fail": fail, "slow": lambda: time.sleep(1)},
+        timeouts={"slow": 0.1},
+    )
+
+    assert outcome.status("ok") == "ok"
+    assert outcome.status("fail") == "bad channel"
+    assert isinstance(outcome.errors["slow"], TimeoutError)
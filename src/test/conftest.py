@@ -1,6 +1,13 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import os
+import sys
+import tempfile
+
+# the lambda runs with src/app as its root, so modules import each other as `utils.<...>`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+# a fresh local book catalog per test run instead of the one in /tmp
+os.environ.setdefault("CATALOG_DIR", tempfile.mkdtemp(prefix="catalog-"))
 
 @pytest.fixture()
 def mock_env_vars():
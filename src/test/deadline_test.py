@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+import pytest
+from utils.deadline import DeadlineExceeded, bounded_timeout, deadline_scope, lambda_deadline, remaining
+from utils.concurrency import run_concurrently
+
+
+def test_timeouts_are_unbounded_without_a_deadline():
+    assert remaining() is None
+    assert bounded_timeout((3.05, 10)) == (3.05, 10)
+
+
+def test_lambda_context_bounds_timeouts():
+    context = Mock(get_remaining_time_in_millis=Mock(return_value=2500))
+
+    with lambda_deadline(context, margin=0.5):
+        connect, read = bounded_timeout((3.05, 10))
+        assert 1.9 < read <= 2.0
+        assert connect == read
+        # an inner scope can shorten the deadline but never extend it
+        with deadline_scope(60):
+            assert remaining() <= 2.0
+    assert remaining() is None
+
+
+def test_passed_deadline_stops_outbound_calls():
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            bounded_timeout(5)
+
+
+def test_concurrent_tasks_stop_at_the_deadline():
+    with deadline_scope(0.05):
+        outcome = run_concurrently({"slow": lambda: time.sleep(1)}, default_timeout=8)
+
+    assert isinstance(outcome.errors["slow"], TimeoutError)
+
+
+@patch("utils.discord_actions.hf_query")
+def test_announcement_uses_template_when_llm_budget_is_short(mock_hf_query):
+    from utils.discord_actions import announcement_text
+
+    with deadline_scope(1.5):
+        text = announcement_text("FIRST", "Dune", "Chapters 1-3", datetime(2099, 9, 25), "07:00 PM")
+
+    mock_hf_query.assert_not_called()
+    assert "**Dune**" in text
+    assert "Friday, September 25th 2099 at 07:00 PM" in text
+
+
+@patch("utils.discord_actions.hf_query", side_effect=TimeoutError("read timed out"))
+def test_announcement_falls_back_when_llm_fails(mock_hf_query):
+    from utils.discord_actions import announcement_text
+
+    with deadline_scope(9):
+        text = announcement_text("FOLLOW_UP", "Dune", "Chapters 4-6", datetime(2099, 9, 25), "07:00 PM")
+
+    # the LLM only gets what is left after keeping time back to post the message
+    _, read_timeout = mock_hf_query.call_args.kwargs["timeout"]
+    assert read_timeout <= 8
+    assert text.startswith("📖 Reminder: we're reading Chapters 4-6 from **Dune**")
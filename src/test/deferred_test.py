@@ -0,0 +1,50 @@
+import pytest
+import threading
+from unittest.mock import patch
+import os
+
+
+@patch("boto3.client")
+def test_dispatch_deferred_runs_locally_on_thread(mock_client):
+    from utils.deferred import deferred_stage, dispatch_deferred
+
+    done = threading.Event()
+    received = {}
+
+    @deferred_stage("test_local_stage")
+    def stage(payload):
+        received.update(payload)
+        done.set()
+
+    with patch.dict(os.environ, {}, clear=False):
+        os.environ.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+        dispatch_deferred("test_local_stage", {"guild_id": "123"})
+
+    assert done.wait(timeout=2)
+    assert received == {"guild_id": "123"}
+
+
+@patch("boto3.client")
+def test_dispatch_deferred_invokes_lambda_async(mock_client):
+    from utils.deferred import deferred_stage, dispatch_deferred
+    import utils.aws.lambda_invoke as lambda_invoke
+
+    @deferred_stage("test_lambda_stage")
+    def stage(payload):
+        pass
+
+    with patch.object(lambda_invoke, "lambda_client") as mock_lambda, \
+            patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "test-function"}):
+        dispatch_deferred("test_lambda_stage", {"guild_id": "123"})
+
+    kwargs = mock_lambda.invoke.call_args.kwargs
+    assert kwargs["FunctionName"] == "test-function"
+    assert kwargs["InvocationType"] == "Event"
+
+
+def test_dispatch_deferred_unknown_stage():
+    with patch("boto3.client"):
+        from utils.deferred import dispatch_deferred
+
+    with pytest.raises(Exception, match="Unknown deferred stage missing_stage."):
+        dispatch_deferred("missing_stage", {})
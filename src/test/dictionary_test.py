@@ -0,0 +1,52 @@
+from unittest.mock import Mock, patch
+
+DUNE_ENTRY = [{
+    "meanings": [
+        {"partOfSpeech": "noun", "definitions": [{"definition": f"a ridge of sand {i}"} for i in range(5)]},
+    ]
+}]
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.dictionary.requests")
+def test_lookup_definition_cached(mock_requests, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import utils.dictionary as dictionary
+    dictionary.definition_cache.memory.clear()
+    mock_cache_table.get_item.return_value = {}
+    mock_requests.get.return_value = Mock(ok=True, status_code=200, json=Mock(return_value=DUNE_ENTRY))
+
+    fields = dictionary.lookup_definition("Dune")
+    assert dictionary.lookup_definition("dune") == fields
+    assert fields[0]["name"] == "Noun"
+    assert fields[0]["value"].count("\n") == dictionary.MAX_DEFS_PER_POS - 1
+    assert mock_requests.get.call_count == 1
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.dictionary.requests")
+def test_lookup_definition_negative_cache(mock_requests, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import utils.dictionary as dictionary
+    dictionary.definition_cache.memory.clear()
+    mock_cache_table.get_item.return_value = {}
+    mock_requests.get.return_value = Mock(ok=False, status_code=404)
+
+    assert dictionary.lookup_definition("dunee") is None
+    assert dictionary.lookup_definition("dunee") is None
+    assert mock_requests.get.call_count == 1
+    item = mock_cache_table.put_item.call_args.kwargs["Item"]
+    assert item["guild_id"] == "define#dunee"
+    assert item["value"] == "null"
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.dictionary.requests")
+def test_table_hit_is_not_kept_past_its_ttl(mock_requests, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import time
+    import utils.dictionary as dictionary
+    dictionary.definition_cache.memory.clear()
+    # a negative result another container cached, one second before it expires
+    mock_cache_table.get_item.return_value = {"Item": {"guild_id": "define#dunee", "value": "null", "ttl": int(time.time()) + 1}}
+
+    assert dictionary.lookup_definition("dunee") is None
+    expires_at, _ = dictionary.definition_cache.memory._entries["dunee"]
+    assert expires_at <= time.monotonic() + 1
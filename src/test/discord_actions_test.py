@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import Mock, patch
+
+
+def channels_response(status_code=200):
+    response = Mock(status_code=status_code)
+    response.json.return_value = [
+        {"id": "1", "type": 2, "name": "General"},
+        {"id": "2", "type": 0, "name": "general"},
+        {"id": "3", "type": 0, "name": "Megathreads"},
+        {"id": "4", "type": 5, "name": "announcements"},
+    ]
+    return response
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.discord_actions.discord")
+def test_channel_directory_lists_guild_once(mock_discord, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import utils.discord_actions as discord_actions
+    discord_actions.channel_directories.clear()
+    mock_cache_table.get_item.return_value = {}
+    mock_discord.get.return_value = channels_response()
+
+    assert discord_actions.get_general_voice_channel_id("guild") == "1"
+    assert discord_actions.get_channel_id_by_name("guild", "megathreads") == "3"
+    assert discord_actions.get_channel_id_by_name("guild", "Announcements") == "4"
+    assert discord_actions.get_channel_id_by_name("guild", "missing") is None
+
+    assert mock_discord.get.call_count == 1
+    mock_cache_table.put_item.assert_called_once()
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.discord_actions.hf_query", return_value="We're reading!")
+@patch("utils.discord_actions.discord")
+def test_channel_directory_invalidated_on_404(mock_discord, mock_hf_query, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import utils.discord_actions as discord_actions
+    discord_actions.channel_directories.clear()
+    mock_cache_table.get_item.return_value = {}
+    mock_discord.get.return_value = channels_response()
+    not_found = Mock(status_code=404)
+    not_found.raise_for_status.side_effect = Exception("404 Not Found")
+    mock_discord.post.return_value = not_found
+
+    with pytest.raises(Exception, match="404"):
+        discord_actions.create_event_announcement("guild", "FINISH", "Dune")
+
+    assert discord_actions.channel_directories.get("guild") is None
+    mock_cache_table.delete_item.assert_called_once()
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import Mock, patch
+
+
+def make_response(status_code, json_body=None, headers=None):
+    response = Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = json_body or {}
+    return response
+
+
+def test_route_for_keeps_major_parameter_only():
+    from utils.discord_client import DiscordClient
+
+    route = DiscordClient.route_for("PATCH", "/guilds/123456789012345678/scheduled-events/987654321098765432")
+    assert route == "PATCH /guilds/123456789012345678/scheduled-events/:id"
+
+    # guild scoped application commands are limited per guild
+    route = DiscordClient.route_for("PUT", "/applications/123456789012345678/guilds/234567890123456789/commands")
+    assert route == "PUT /applications/123456789012345678/guilds/234567890123456789/commands"
+
+
+@patch("utils.discord_client.time.sleep")
+def test_request_retries_429_after_retry_after(mock_sleep):
+    from utils.discord_client import DiscordClient
+
+    client = DiscordClient("token")
+    client.session = Mock()
+    client.session.request.side_effect = [
+        make_response(429, {"retry_after": 0.25, "global": False}),
+        make_response(200, {"id": "1"}),
+    ]
+
+    response = client.post("/channels/123456789012345678/messages", json={"content": "hi"})
+
+    assert response.status_code == 200
+    assert client.session.request.call_count == 2
+    mock_sleep.assert_called_once_with(0.25)
+    assert client.session.request.call_args.kwargs["timeout"] == client.timeout
+    assert client.session.request.call_args.kwargs["headers"]["Authorization"] == "Bot token"
+
+
+@patch("utils.discord_client.time.sleep")
+def test_request_raises_when_still_rate_limited(mock_sleep):
+    from utils.discord_client import DiscordClient, RateLimitedError
+
+    client = DiscordClient("token", max_retries=1)
+    client.session = Mock()
+    client.session.request.return_value = make_response(429, {"retry_after": 0.1})
+
+    with pytest.raises(RateLimitedError):
+        client.get("/guilds/123456789012345678/channels")
+    assert client.session.request.call_count == 2
+
+
+def test_requests_in_a_bucket_with_room_run_in_parallel():
+    import threading
+    import time
+    from utils.discord_client import DiscordClient
+
+    client = DiscordClient("token")
+    client.session = Mock()
+    headers = {"X-RateLimit-Remaining": "9", "X-RateLimit-Reset-After": "5"}
+    client.session.request.side_effect = lambda *args, **kwargs: time.sleep(0.2) or make_response(200, headers=headers)
+    client.get("/channels/123456789012345678/messages")
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client.get, args=("/channels/123456789012345678/messages",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.perf_counter() - started < 0.6
+    assert client.session.request.call_count == 5
+
+
+def test_interaction_token_buckets_are_bounded():
+    from utils import discord_client
+    from utils.discord_client import DiscordClient
+
+    route = DiscordClient.route_for("PATCH", "/webhooks/123456789012345678/aW50ZXJhY3Rpb246MTIzNDU2/messages/@original")
+    assert route == "PATCH /webhooks/123456789012345678/aW50ZXJhY3Rpb246MTIzNDU2/messages/@original"
+
+    client = DiscordClient("token")
+    client.session = Mock()
+    client.session.request.return_value = make_response(200, headers={
+        "X-RateLimit-Bucket": "abc", "X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "0",
+    })
+    for i in range(discord_client.MAX_BUCKETS + 50):
+        client.patch(f"/webhooks/123456789012345678/interaction-token-{i:08d}/messages/@original", json={})
+
+    assert len(client._buckets) <= discord_client.MAX_BUCKETS
+    assert len(client._route_buckets) <= discord_client.MAX_BUCKETS
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import Mock, patch
+
+
+def test_normalize_search_query():
+    from utils.google_books import normalize_search_query, search_cache_key
+
+    assert normalize_search_query({"author": " Frank  Herbert", "title": "DUNE"}) == "intitle:dune+inauthor:frank herbert"
+    assert normalize_search_query({"isbn": "978-0-441-17271-9"}) == "isbn:9780441172719"
+    assert search_cache_key({"title": "Dune "}, 5) == search_cache_key({"title": "dune"}, 5)
+    assert search_cache_key({"title": "dune"}, 5) != search_cache_key({"title": "dune"}, 40)
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.google_books.requests")
+def test_search_books_served_from_cache(mock_requests, mock_cache_table, mock_dynamodb, mock_env_vars):
+    import utils.google_books as google_books
+    google_books.search_cache.memory.clear()
+    mock_cache_table.get_item.return_value = {}
+    response = Mock(ok=True)
+    response.json.return_value = {"items": [{"volumeInfo": {"title": "Dune"}}]}
+    mock_requests.get.return_value = response
+
+    first = google_books.search_books({"title": "Dune"})
+    second = google_books.search_books({"title": "dune "})
+
+    assert first == second
+    assert first[0]["volumeInfo"]["title"] == "Dune"
+    assert mock_requests.get.call_count == 1
+    item = mock_cache_table.put_item.call_args.kwargs["Item"]
+    assert item["guild_id"].startswith("search#")
+    assert isinstance(item["blob"], bytes)
+    assert google_books.search_cache.stats()["memory_hits"] >= 1
+
+
+@patch("utils.google_books.remember_volumes")
+@patch("utils.aws.dynamodb.cache_table")
+@patch("utils.google_books.requests")
+def test_search_books_error_is_raised_not_cached(mock_requests, mock_cache_table, mock_remember, mock_dynamodb, mock_env_vars):
+    import utils.google_books as google_books
+    google_books.search_cache.memory.clear()
+    mock_cache_table.get_item.return_value = {}
+    response = Mock(ok=False, status_code=503)
+    mock_requests.get.return_value = response
+
+    with pytest.raises(google_books.GoogleBooksError, match="status 503"):
+        google_books.search_books({"title": "Dune"})
+
+    response.json.assert_not_called()
+    mock_cache_table.put_item.assert_not_called()
+    mock_remember.assert_not_called()
@@ -0,0 +1,18 @@
+from unittest.mock import patch
+
+
+@patch("utils.huggingface.greeting_pool.put_cache_entry")
+@patch("utils.huggingface.greeting_pool.get_cache_entry", return_value=(False, None))
+@patch("utils.huggingface.greeting_pool.hf_query", return_value="Hi! 👋\nHello! 😊\nHey! 🌟")
+def test_greeting_pool_refills_when_low(mock_hf_query, mock_get_entry, mock_put_entry, mock_dynamodb, mock_env_vars):
+    from utils.huggingface.greeting_pool import GreetingPool
+
+    pool = GreetingPool("test", batch_size=3, low_water=2)
+    with patch.object(pool, "refill_in_background", side_effect=pool.refill):
+        assert pool.take() is None  # empty pool -> caller falls back to random_greeting
+        assert pool.depth() == 3
+        assert pool.take() == "Hi! 👋"
+
+    assert pool.stats()["refills"] == 1
+    assert pool.stats()["last_refill_seconds"] is not None
+    assert mock_put_entry.call_args.args[0] == "greetings#test"
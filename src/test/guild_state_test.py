@@ -0,0 +1,44 @@
+import os
+import time
+from unittest.mock import patch
+
+
+@patch("utils.aws.guild_state.dynamodb")
+def test_guild_state_single_batch_get(mock_resource, mock_env_vars):
+    from utils.aws.guild_state import GuildState, DEFAULT_ADMIN_ROLE_ID
+
+    mock_resource.batch_get_item.return_value = {
+        "Responses": {
+            "test_current_book_table": [{"guild_id": "123", "title": "Dune"}],
+            "test_cache_table": [{"guild_id": "results#456", "book_list": '[{"volumeInfo": {"title": "Dune"}}]', "query": '{"title":"dune"}', "ttl": int(time.time()) + 60}],
+        },
+        "UnprocessedKeys": {},
+    }
+
+    state = GuildState("123")
+    state.include_search_results("456")
+    assert state.current_book["title"] == "Dune"
+    assert state.search_results["books"][0]["volumeInfo"]["title"] == "Dune"
+    assert state.search_results["query"] == {"title": "dune"}
+    assert state.is_admin([DEFAULT_ADMIN_ROLE_ID])
+    assert state.round_trips == 1
+    request_items = mock_resource.batch_get_item.call_args.kwargs["RequestItems"]
+    assert request_items["test_cache_table"] == {"Keys": [{"guild_id": "results#456"}]}
+
+
+@patch("utils.aws.guild_state.dynamodb")
+def test_guild_state_retries_unprocessed_keys(mock_resource, mock_env_vars):
+    from utils.aws.guild_state import GuildState
+
+    with patch.dict(os.environ, {"GUILD_SETTINGS_TABLE": "test_settings_table"}):
+        unprocessed = {"test_settings_table": {"Keys": [{"guild_id": "123"}]}}
+        mock_resource.batch_get_item.side_effect = [
+            {"Responses": {"test_current_book_table": []}, "UnprocessedKeys": unprocessed},
+            {"Responses": {"test_settings_table": [{"guild_id": "123", "admin_role_id": "999"}]}, "UnprocessedKeys": {}},
+        ]
+        state = GuildState("123")
+
+        assert state.current_book == {}
+        assert state.search_results is None
+        assert state.is_admin(["999"])
+        assert state.round_trips == 2
@@ -0,0 +1,75 @@
+from unittest.mock import Mock, patch
+import pytest
+import helper_functions
+from utils.aws.dynamodb import LifecycleResult, LifecycleStatus
+
+SIDE_EFFECTS = ("create_guild_event", "update_guild_event", "create_discussion_thread", "create_event_announcement")
+
+
+def schedule_job(reschedule):
+    job = {
+        "guild_id": "g",
+        "user_id": "u",
+        "discussion_date": "12-31-2099",
+        "discussion_time": "07:00 PM",
+        "pages_or_chapters": "1-3",
+        "reschedule": reschedule,
+        "selected_book": None,
+        "current_book": None,
+    }
+    if reschedule:
+        job["current_book"] = {"title": "Dune", "discord_event_id": "e1", "version": 2}
+    else:
+        job["selected_book"] = {"volumeInfo": {"title": "Dune"}}
+    return job
+
+
+@pytest.mark.parametrize("reschedule, status", [
+    (True, LifecycleStatus.NOT_FOUND),
+    (True, LifecycleStatus.CONFLICT),
+    (False, LifecycleStatus.CONFLICT),
+])
+def test_nothing_is_posted_when_the_current_book_write_fails(reschedule, status):
+    mocks = {name: Mock() for name in SIDE_EFFECTS}
+    write = Mock(return_value=LifecycleResult(status, {}))
+    with patch.multiple(helper_functions, **mocks), \
+            patch.object(helper_functions, "update_discussion_date_current_book", write), \
+            patch.object(helper_functions, "put_book", write):
+        steps = {}
+        content = helper_functions.run_schedule_select(schedule_job(reschedule), steps)
+
+    write.assert_called_once()
+    assert steps == {"database": status.value}
+    assert content.startswith(("❗", "⚠️", "📚"))
+    for mock in mocks.values():
+        mock.assert_not_called()
+
+
+def test_recreated_event_is_linked_after_reschedule():
+    write = Mock(return_value=LifecycleResult(LifecycleStatus.OK, {"title": "Dune", "version": 2}))
+    link = Mock(return_value=LifecycleResult(LifecycleStatus.OK, {}))
+    with patch.multiple(helper_functions,
+                        update_guild_event=Mock(side_effect=Exception("404 Unknown Guild Scheduled Event")),
+                        create_guild_event=Mock(return_value={"id": "e2"}),
+                        create_discussion_thread=Mock(),
+                        create_event_announcement=Mock(),
+                        update_discussion_date_current_book=write,
+                        set_current_book_event=link):
+        helper_functions.run_schedule_select(schedule_job(True), {})
+
+    assert "discord_event_id" not in write.call_args.kwargs
+    link.assert_called_once_with("g", "e2", expected_version=3)
+
+
+def test_reschedule_without_a_current_book_is_rejected():
+    fields = {"pages_or_chapters": "4-6", "discussion_date": "12-31-2099", "discussion_time": "07:00 PM"}
+    raw_request = {
+        "guild_id": "g",
+        "member": {"user": {"id": "u"}},
+        "data": {"components": [{"type": 1, "components": [{"custom_id": k, "value": v}]} for k, v in fields.items()]},
+    }
+
+    error, job = helper_functions.prepare_schedule_select(raw_request, Mock(current_book={}), reschedule=True, origin=None)
+
+    assert job is None
+    assert "No current book found" in error["data"]["content"]
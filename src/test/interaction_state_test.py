@@ -0,0 +1,90 @@
+import time
+from unittest.mock import Mock, patch
+from utils.interaction_state import MemoryStateStore, DynamoDBStateStore, RedisStateStore, make_state_store, state_key
+
+BOOK = {"volumeInfo": {"title": "Dune"}}
+
+
+def test_memory_store_take_removes_the_state():
+    store = MemoryStateStore()
+    store.put(state_key("1", "2", "3"), BOOK)
+
+    assert store.take("1#2#3") == BOOK
+    assert store.take("1#2#3") is None
+
+
+def test_memory_store_expires_state():
+    store = MemoryStateStore()
+    store.put("key", BOOK, ttl=0)
+
+    assert store.take("key") is None
+
+
+@patch("utils.aws.dynamodb.cache_table")
+def test_dynamodb_store_takes_with_one_delete(mock_table):
+    mock_table.delete_item.return_value = {"Attributes": {"guild_id": "state#key", "value": '{"volumeInfo":{"title":"Dune"}}', "ttl": int(time.time()) + 60}}
+
+    assert DynamoDBStateStore().take("key") == BOOK
+    mock_table.delete_item.assert_called_once_with(Key={"guild_id": "state#key"}, ReturnValues="ALL_OLD")
+    mock_table.get_item.assert_not_called()
+
+
+@patch("utils.aws.dynamodb.cache_table")
+def test_dynamodb_store_ignores_expired_state(mock_table):
+    mock_table.delete_item.return_value = {"Attributes": {"guild_id": "state#key", "value": "{}", "ttl": int(time.time()) - 1}}
+
+    assert DynamoDBStateStore().take("key") is None
+
+
+def test_redis_store_uses_getdel():
+    client = Mock()
+    client.getdel.return_value = b'{"volumeInfo":{"title":"Dune"}}'
+    store = RedisStateStore(client=client)
+
+    store.put("key", BOOK, ttl=60)
+    assert store.take("key") == BOOK
+    client.set.assert_called_once_with("state:key", '{"volumeInfo":{"title":"Dune"}}', ex=60)
+    client.getdel.assert_called_once_with("state:key")
+
+
+def test_unknown_backend_is_rejected():
+    try:
+        make_state_store("memcached")
+    except ValueError as e:
+        assert "memcached" in str(e)
+    else:
+        assert False, "expected a ValueError"
+
+
+def modal_submit(custom_id, date="12-31-2099"):
+    fields = {"pages_or_chapters": "1-3", "discussion_date": date, "discussion_time": "07:00 PM"}
+    return {
+        "id": "submit",
+        "guild_id": "g",
+        "member": {"user": {"id": "u"}},
+        "data": {
+            "custom_id": custom_id,
+            "components": [{"type": 1, "components": [{"custom_id": k, "value": v}]} for k, v in fields.items()],
+        },
+    }
+
+
+def test_selection_survives_a_container_switch():
+    import helper_functions
+
+    # both "containers" share the store, as they share the cache table on Lambda
+    store = MemoryStateStore()
+    state = Mock(current_book={}, search_results={"books": [{"volumeInfo": {"title": "Emma"}}, BOOK], "refresh_at": time.time() + 60})
+    with patch.object(helper_functions, "interaction_state", store):
+        response = helper_functions.handle_book_select({"id": "111", "guild_id": "g", "member": {"user": {"id": "u"}}}, state, reschedule=False, selected_idx=1, search_token="100")
+        custom_id = response["data"]["custom_id"]
+        assert custom_id == "select_schedule_new_111"
+
+        error, job = helper_functions.prepare_schedule_select(modal_submit(custom_id), Mock(), reschedule=False, origin="111")
+        assert error is None
+        assert job["selected_book"] == BOOK
+
+        # a second submit of the same modal finds nothing left to schedule
+        error, job = helper_functions.prepare_schedule_select(modal_submit(custom_id), Mock(), reschedule=False, origin="111")
+        assert job is None
+        assert "No book selected" in error["data"]["content"]
@@ -0,0 +1,81 @@
+import json
+import time
+from unittest.mock import patch
+from nacl.signing import SigningKey
+from utils.verification import InteractionVerifier
+
+SIGNING_KEY = SigningKey.generate()
+PUBLIC_KEY = SIGNING_KEY.verify_key.encode().hex()
+
+
+def function_url_event(body, timestamp=None, signature=None):
+    raw_body = json.dumps(body)
+    timestamp = timestamp or str(int(time.time()))
+    if signature is None:
+        signature = SIGNING_KEY.sign(f"{timestamp}{raw_body}".encode()).signature.hex()
+    return {
+        "version": "2.0",
+        "headers": {"x-signature-ed25519": signature, "x-signature-timestamp": timestamp},
+        "body": raw_body,
+        "isBase64Encoded": False,
+    }
+
+
+def test_handler_answers_ping_without_flask():
+    import main
+
+    with patch.object(main, "verifier", InteractionVerifier(PUBLIC_KEY)):
+        response = main.handler(function_url_event({"type": 1}), None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"type": 1}
+
+
+def test_handler_rejects_bad_signature():
+    import main
+
+    with patch.object(main, "verifier", InteractionVerifier(PUBLIC_KEY)):
+        response = main.handler(function_url_event({"type": 1}, signature="00" * 64), None)
+
+    assert response["statusCode"] == 401
+
+
+def test_handler_echo_command():
+    import main
+
+    body = {
+        "type": 2,
+        "guild_id": "123",
+        "member": {"user": {"id": "42"}, "roles": []},
+        "data": {"name": "echo", "options": [{"name": "message", "value": "hi"}]},
+    }
+    with patch.object(main, "verifier", InteractionVerifier(PUBLIC_KEY)):
+        response = main.handler(function_url_event(body), None)
+
+    assert json.loads(response["body"]) == {"type": 4, "data": {"content": "Echoing: hi"}}
+
+
+def test_handler_rejects_stale_and_replayed_requests():
+    import main
+
+    with patch.object(main, "verifier", InteractionVerifier(PUBLIC_KEY)):
+        stale = main.handler(function_url_event({"type": 1}, timestamp=str(int(time.time()) - 3600)), None)
+        event = function_url_event({"type": 1})
+        first = main.handler(event, None)
+        replayed = main.handler(event, None)
+
+    assert stale["statusCode"] == 401
+    assert first["statusCode"] == 200
+    assert replayed["statusCode"] == 401
+
+
+def test_delete_confirmation_from_another_guild_is_unknown():
+    import main
+
+    body = {
+        "type": 3,
+        "guild_id": "123",
+        "member": {"user": {"id": "42"}, "roles": []},
+        "data": {"custom_id": "delete_confirm_yes_999"},
+    }
+    assert main.interact(body) == {"type": 4, "data": {"content": "Unknown interaction"}}
@@ -0,0 +1,28 @@
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+
+import fakes
+import replay
+
+
+def test_replay_corpus_runs_against_fakes():
+    # one pass without injected latency keeps the corpus in step with the handlers
+    with patch.dict(fakes.latency_ms, {service: 0 for service in fakes.latency_ms}):
+        results = replay.replay(replay.load_corpus(), iterations=1)
+
+    assert results["/search"]["calls"]["google_books"] == 1
+    assert "google_books" not in results["/search (repeat)"]["calls"]
+    # the selection is taken from the shared interaction state in one round trip
+    assert results["modal: schedule"]["calls"] == {"dynamodb": 1, "lambda": 1}
+    assert results["modal: schedule [deferred]"]["calls"]["huggingface"] == 1
+    assert results["delete_confirm_yes"]["calls"]["discord"] == 1
+
+
+def test_compare_flags_extra_outbound_calls():
+    baseline = {"latency_ms": {}, "steps": {"/current": {"p50_ms": 1, "p95_ms": 1, "alloc_kib": 10, "calls": {"dynamodb": 1}}}}
+    results = {"/current": {"n": 1, "p50_ms": 1, "p95_ms": 1, "alloc_kib": 10, "calls": {"dynamodb": 2}}}
+
+    assert replay.compare(results, baseline) == ["/current: dynamodb calls 1 -> 2"]
@@ -0,0 +1,96 @@
+import pytest
+from utils.router import Router, Interaction, COMMAND, COMPONENT, AUTOCOMPLETE, MODAL
+
+
+def component(custom_id, guild_id="1"):
+    return Interaction({"type": COMPONENT, "guild_id": guild_id, "data": {"custom_id": custom_id}, "member": {"user": {"id": "42"}, "roles": []}})
+
+
+def test_resolve_exact_and_prefixed_routes():
+    router = Router()
+    router.component("finish_book", lambda i: "finish")
+    router.component("select_book_{index:int}", lambda i: i.params["index"])
+    router.component("delete_confirm_{answer}_{guild_id}", lambda i: (i.params["answer"], i.params["guild_id"]))
+    router.component("history_page_{cursor}", lambda i: i.params["cursor"])
+
+    assert router.dispatch(component("finish_book")) == "finish"
+    assert router.dispatch(component("select_book_3")) == 3
+    assert router.dispatch(component("delete_confirm_yes_123")) == ("yes", "123")
+    assert router.dispatch(component("history_page_2025-07-12T18:04:11+00:00")) == "2025-07-12T18:04:11+00:00"
+    assert router.dispatch(component("history_page_")) == ""
+
+
+def test_resolve_rejects_custom_ids_that_dont_fit():
+    router = Router()
+    router.component("select_book_{index:int}", lambda i: i.params["index"])
+    router.component("delete_confirm_{answer}_{guild_id}", lambda i: i.params)
+
+    assert router.dispatch(component("select_book_x")) is None
+    assert router.dispatch(component("delete_confirm_yes")) is None
+    assert router.dispatch(component("unknown")) is None
+
+
+def test_longest_prefix_wins_and_kinds_are_separate():
+    router = Router()
+    router.component("select_{rest}", lambda i: "short")
+    router.component("select_book_{index:int}", lambda i: "long")
+    router.modal("select_schedule_{mode}", lambda i: "modal")
+
+    assert router.dispatch(component("select_book_1")) == "long"
+    assert router.dispatch(component("select_schedule_new")) == "short"
+    assert router.resolve(MODAL, "select_schedule_new")[1] == {"mode": "new"}
+
+
+def test_duplicate_and_malformed_routes_are_rejected():
+    router = Router()
+    router.command("hello", lambda i: None)
+    with pytest.raises(ValueError):
+        router.command("hello", lambda i: None)
+    with pytest.raises(ValueError):
+        router.component("page{number}", lambda i: None)
+
+
+def test_handlers_are_imported_on_first_call():
+    router = Router()
+    route = router.component("ping_{value}", "json:loads")
+
+    assert route._handler is None
+    assert route.handler("[1]") == [1]
+
+
+def test_stats_count_calls_and_errors():
+    router = Router()
+    router.component("finish_book", lambda i: {"type": 4})
+
+    def fail(interaction):
+        raise RuntimeError()
+    router.component("delete_book", fail)
+
+    router.dispatch(component("finish_book"))
+    router.dispatch(component("finish_book"))
+    with pytest.raises(RuntimeError):
+        router.dispatch(component("delete_book"))
+
+    stats = router.stats()
+    assert stats["finish_book"]["calls"] == 2
+    assert stats["finish_book"]["errors"] == 0
+    assert stats["delete_book"]["errors"] == 1
+    assert "p95_ms" in stats["finish_book"]
+
+
+def test_routes_match_registered_commands():
+    from routes import check_command_definitions, router
+
+    assert check_command_definitions() == []
+    assert router.check_commands([{"name": "hello"}, {"name": "ghost"}])[0] == "/ghost is registered with Discord but has no route"
+
+
+def test_autocomplete_routes_by_command_name():
+    router = Router()
+    router.command("search", lambda i: "search")
+    router.autocomplete("search", lambda i: "suggest")
+
+    assert router.dispatch(Interaction({"type": AUTOCOMPLETE, "data": {"name": "search"}})) == "suggest"
+    assert router.dispatch(Interaction({"type": COMMAND, "data": {"name": "search"}})) == "search"
+    assert router.check_commands([{"name": "search", "options": [{"name": "title"}]}]) == ["/search has an autocomplete route but no autocomplete options"]
+    assert router.check_commands([{"name": "search", "options": [{"name": "title", "autocomplete": True}]}]) == []
@@ -0,0 +1,117 @@
+import time
+from unittest.mock import Mock, patch
+from utils.router import Interaction
+from utils.search_results import selected_search_result
+
+DUNE = {"id": "a", "volumeInfo": {"title": "Dune"}}
+EMMA = {"id": "b", "volumeInfo": {"title": "Emma"}}
+
+
+def stored(refresh_at, books=(DUNE, EMMA)):
+    return {"books": list(books), "query": {"title": "d"}, "max_results": 5, "refresh_at": refresh_at, "exhausted": True, "ttl": int(time.time()) + 600}
+
+
+def test_fresh_results_are_used_as_stored():
+    state = Mock(search_results=stored(time.time() + 60))
+
+    with patch("utils.search_results.search_books") as mock_search:
+        assert selected_search_result(state, "1", 1) == EMMA
+        assert selected_search_result(state, "1", 5) is None
+    mock_search.assert_not_called()
+    state.include_search_results.assert_called_with("1")
+
+
+@patch("utils.search_results.cache_search_results")
+@patch("utils.search_results.search_books")
+def test_stale_results_are_refreshed_in_place(mock_search, mock_cache):
+    # the search now returns the books in another order, with a new cover for Emma
+    new_emma = {"id": "b", "volumeInfo": {"title": "Emma", "imageLinks": {"thumbnail": "x"}}}
+    mock_search.return_value = [new_emma, DUNE]
+    state = Mock(search_results=stored(time.time() - 1))
+
+    assert selected_search_result(state, "1", 1) == new_emma
+    books = mock_cache.call_args.args[2]
+    assert books == [DUNE, new_emma]
+    assert 0 < mock_cache.call_args.kwargs["ttl"] <= 600
+
+
+@patch("utils.search_results.search_books", side_effect=Exception("down"))
+def test_failed_refresh_falls_back_to_stored_book(mock_search):
+    state = Mock(search_results=stored(time.time() - 1))
+
+    assert selected_search_result(state, "1", 0) == DUNE
+
+
+@patch("utils.aws.dynamodb.cache_table")
+@patch("command_handler.find_books", return_value=([DUNE, EMMA], "google"))
+def test_concurrent_searches_keep_their_own_results(mock_search, mock_table):
+    import command_handler
+
+    responses = [
+        command_handler.search(Interaction({"type": 2, "id": interaction_id, "guild_id": "g", "data": {"options": [{"name": "title", "value": "d"}]}}))
+        for interaction_id in ("111", "222")
+    ]
+
+    keys = [call.kwargs["Item"]["guild_id"] for call in mock_table.put_item.call_args_list]
+    assert sorted(key for key in keys if key.startswith("results#")) == ["results#111", "results#222"]
+    assert responses[0]["data"]["components"][0]["components"][1]["custom_id"] == "select_book_111_1"
+    assert responses[1]["data"]["components"][0]["components"][1]["custom_id"] == "select_book_222_1"
+
+
+def paged(count, exhausted):
+    books = [{"id": str(i), "volumeInfo": {"title": f"Book {i}"}} for i in range(count)]
+    return {**stored(time.time() + 60, books), "max_results": 40, "exhausted": exhausted}
+
+
+@patch("helper_functions.dispatch_deferred")
+@patch("utils.search_results.search_books")
+def test_pages_render_from_stored_results(mock_search, mock_dispatch):
+    from helper_functions import handle_search_page
+    state = Mock(search_results=paged(40, exhausted=False))
+
+    response = handle_search_page(state, "1", 1)
+
+    assert response["type"] == 7
+    assert [embed["title"] for embed in response["data"]["embeds"]] == [f"{i+1}) Book {i}" for i in range(5, 10)]
+    selects, nav = response["data"]["components"]
+    assert selects["components"][0]["custom_id"] == "select_book_1_5"
+    assert [button["custom_id"] for button in nav["components"]] == ["search_page_1_0", "search_page_1_2"]
+    mock_search.assert_not_called()
+    mock_dispatch.assert_not_called()
+
+
+@patch("helper_functions.dispatch_deferred")
+def test_nearing_the_end_prefetches_the_next_page(mock_dispatch):
+    from helper_functions import handle_search_page
+    state = Mock(search_results=paged(40, exhausted=False))
+
+    handle_search_page(state, "1", 6)
+
+    mock_dispatch.assert_called_once_with("search_prefetch", {"token": "1", "start_index": 40})
+
+
+@patch("helper_functions.dispatch_deferred")
+def test_last_page_of_exhausted_results_disables_next(mock_dispatch):
+    from helper_functions import handle_search_page
+    state = Mock(search_results=paged(12, exhausted=True))
+
+    response = handle_search_page(state, "1", 9)
+
+    assert len(response["data"]["embeds"]) == 2
+    prev, next = response["data"]["components"][1]["components"]
+    assert prev["custom_id"] == "search_page_1_1" and next["disabled"]
+    mock_dispatch.assert_not_called()
+
+
+@patch("utils.search_results.cache_search_results")
+@patch("utils.search_results.search_books")
+def test_extend_appends_new_books_only(mock_search, mock_cache):
+    from utils.search_results import extend_search_results
+    results = paged(40, exhausted=False)
+    mock_search.return_value = [results["books"][-1], {"id": "new", "volumeInfo": {}}]
+
+    extended = extend_search_results("1", results)
+
+    assert mock_search.call_args.kwargs == {"max_results": 40, "start_index": 40}
+    assert len(extended["books"]) == 41 and extended["exhausted"]
+    assert mock_cache.call_args.kwargs["exhausted"]
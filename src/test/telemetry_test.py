@@ -0,0 +1,88 @@
+import json
+import pytest
+import boto3
+from botocore.stub import Stubber
+from utils import telemetry
+from utils.concurrency import run_concurrently
+
+
+def emitted(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+
+
+def test_interaction_span_emits_emf_per_dependency(capsys):
+    with telemetry.interaction_span("/search", guild_id="1"):
+        with telemetry.dependency("google_books", "volumes.list") as call:
+            call.status_code = 200
+        with telemetry.dependency("discord", "POST /channels/1") as call:
+            call.status_code = 503
+        with pytest.raises(TimeoutError):
+            with telemetry.dependency("discord", "POST /channels/1"):
+                raise TimeoutError()
+
+    interaction, *dependencies = emitted(capsys)
+    assert interaction["Command"] == "/search"
+    assert interaction["InteractionErrors"] == 0
+    assert interaction["guild_id"] == "1"
+    assert [span["dependency"] for span in interaction["Spans"]] == ["google_books", "discord", "discord"]
+    assert interaction["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Stage", "Command"]]
+
+    discord = next(line for line in dependencies if line["Dependency"] == "discord")
+    assert discord["DependencyCalls"] == 2
+    assert discord["DependencyErrors"] == 2
+    assert len(discord["DependencyLatency"]) == 2
+    assert discord["TraceId"] == interaction["TraceId"]
+
+
+def test_interaction_span_counts_failed_interactions(capsys):
+    with pytest.raises(ValueError):
+        with telemetry.interaction_span("finish_book"):
+            raise ValueError()
+
+    interaction, = emitted(capsys)
+    assert interaction["InteractionErrors"] == 1
+    assert interaction["Error"] == "ValueError"
+
+
+def test_concurrent_tasks_stay_in_the_trace(capsys):
+    def call(name):
+        with telemetry.dependency("discord", name):
+            return name
+
+    with telemetry.interaction_span("select_schedule_new"):
+        run_concurrently({"a": lambda: call("a"), "b": lambda: call("b")})
+
+    interaction, _ = emitted(capsys)
+    assert sorted(span["operation"] for span in interaction["Spans"]) == ["a", "b"]
+
+
+def test_boto3_calls_are_timed_without_wrapping(capsys):
+    client = boto3.client("dynamodb", region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+    telemetry.instrument_boto3(client, "dynamodb")
+    stubber = Stubber(client)
+    stubber.add_response("get_item", {}, {"TableName": "t", "Key": {"guild_id": {"S": "1"}}})
+    stubber.add_client_error("delete_item", service_error_code="ConditionalCheckFailedException", http_status_code=400)
+
+    with stubber, telemetry.interaction_span("delete_confirm_yes"):
+        client.get_item(TableName="t", Key={"guild_id": {"S": "1"}})
+        with pytest.raises(client.exceptions.ConditionalCheckFailedException):
+            client.delete_item(TableName="t", Key={"guild_id": {"S": "1"}})
+
+    interaction, dynamodb = emitted(capsys)
+    assert [span["operation"] for span in interaction["Spans"]] == ["GetItem", "DeleteItem"]
+    # losing a conditional write isn't a dependency failure
+    assert dynamodb["DependencyErrors"] == 0
+
+
+@pytest.mark.parametrize("raw_request, name", [
+    ({"type": 1}, "ping"),
+    ({"type": 2, "data": {"name": "search"}}, "/search"),
+    ({"type": 4, "data": {"name": "search"}}, "/search autocomplete"),
+    ({"type": 3, "data": {"custom_id": "select_book_3"}}, "select_book"),
+    ({"type": 3, "data": {"custom_id": "delete_confirm_yes_1393651462000000000"}}, "delete_confirm_yes"),
+    ({"type": 3, "data": {"custom_id": "history_page_2025-07-12T18:04:11.123000+00:00"}}, "history_page"),
+    ({"type": 3, "data": {"custom_id": "history_page_"}}, "history_page"),
+    ({"type": 5, "data": {"custom_id": "select_schedule_new"}}, "select_schedule_new"),
+])
+def test_interaction_name_drops_ids(raw_request, name):
+    assert telemetry.interaction_name(raw_request) == name
@@ -16,7 +16,7 @@ def test_put_book_into_table_success(mock_dynamodb, mock_env_vars):
         discussion_time='10:28 PM',
         pages_or_chapters='Pages 1-10'
     )
-    assert not res
+    assert res.ok
 
 def test_put_book_into_table_fail_missing_data(mock_dynamodb, mock_env_vars):
 
@@ -50,6 +50,26 @@ def test_put_book_into_table_failed_put(mock_book_table, mock_dynamodb, mock_env
             pages_or_chapters='Pages 1-10'
         )
 
+@patch("app.utils.aws.dynamodb.current_book_table")
+def test_put_book_into_table_conflict(mock_book_table, mock_env_vars):
+    error = Exception("conditional check failed")
+    error.response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+    mock_book_table.put_item.side_effect = error
+
+    from app.utils.aws.dynamodb import put_book, LifecycleStatus
+
+    result = put_book(
+        guild_id='123456',
+        user_id='test_user',
+        selected_book={'info' : {}},
+        discussion_date=datetime.now(),
+        discussion_time='07:00 PM',
+        pages_or_chapters='Pages 1-10'
+    )
+
+    assert result.status is LifecycleStatus.CONFLICT
+    assert mock_book_table.put_item.call_args.kwargs["ConditionExpression"] == "attribute_not_exists(guild_id)"
+
 def test_is_valid_future_date_success():
     date_one = (datetime.now() + timedelta(days=1)).strftime("%m-%d-%Y")
     date_two = (datetime.now() + timedelta(days=10)).strftime("%m-%d-%Y")
@@ -70,4 +90,98 @@ def test_is_valid_future_date_type_error():
 
     from app.utils.utils import is_valid_future_date
 
-    assert not is_valid_future_date("this is not a date.")
\ No newline at end of file
+    assert not is_valid_future_date("this is not a date.")
+
+
+def test_parse_greeting_batch():
+
+    from app.utils.utils import parse_greeting_batch
+
+    text = "1. Hello there! 👋\n- Hey friend! 😊\n\n\"Howdy! 🤠\"\n" + "x" * 200
+    assert parse_greeting_batch(text) == ["Hello there! 👋", "Hey friend! 😊", "Howdy! 🤠"]
+
+@patch("app.utils.aws.dynamodb.dynamodb")
+@patch("app.utils.aws.dynamodb.history_book_table")
+@patch("app.utils.aws.dynamodb.current_book_table")
+def test_finish_current_book_single_transaction(mock_book_table, mock_history_table, mock_resource, mock_env_vars):
+    mock_book_table.name = "test_current_book_table"
+    mock_history_table.name = "test_history_book_table"
+
+    from app.utils.aws.dynamodb import finish_current_book, LifecycleStatus
+
+    result = finish_current_book(
+        guild_id='123456',
+        current_book={'guild_id': '123456', 'title': 'Dune', 'version': 2},
+        request_token='interaction-1'
+    )
+
+    assert result.status is LifecycleStatus.OK
+    kwargs = mock_resource.meta.client.transact_write_items.call_args.kwargs
+    assert kwargs["ClientRequestToken"] == 'interaction-1'
+    put, delete = kwargs["TransactItems"]
+    assert put["Put"]["Item"]["title"] == {"S": "Dune"}
+    assert delete["Delete"]["ExpressionAttributeValues"] == {":expected_version": {"N": "2"}}
+    mock_book_table.get_item.assert_not_called()
+
+@patch("app.utils.aws.dynamodb.dynamodb")
+@patch("app.utils.aws.dynamodb.history_book_table")
+@patch("app.utils.aws.dynamodb.current_book_table")
+def test_finish_current_book_retry_sends_same_item(mock_book_table, mock_history_table, mock_resource, mock_env_vars):
+    from app.utils.aws.dynamodb import finish_current_book
+
+    current_book = {'guild_id': '123456', 'title': 'Dune', 'version': 2}
+    first = finish_current_book(guild_id='123456', current_book=current_book, request_token='1262524485432709120')
+    second = finish_current_book(guild_id='123456', current_book=current_book, request_token='1262524485432709120')
+
+    assert first.book["finished_at"] == second.book["finished_at"]
+    assert first.book["finished_at"].startswith("2024-07-15T21:41:33")
+    calls = mock_resource.meta.client.transact_write_items.call_args_list
+    assert calls[0].kwargs == calls[1].kwargs
+
+@patch("app.utils.aws.dynamodb.dynamodb")
+@patch("app.utils.aws.dynamodb.history_book_table")
+@patch("app.utils.aws.dynamodb.current_book_table")
+def test_finish_current_book_raises_on_non_conditional_cancel(mock_book_table, mock_history_table, mock_resource, mock_env_vars):
+    error = Exception("transaction cancelled")
+    error.response = {
+        "Error": {"Code": "TransactionCanceledException"},
+        "CancellationReasons": [{"Code": "None"}, {"Code": "TransactionConflict"}],
+    }
+    mock_resource.meta.client.transact_write_items.side_effect = error
+
+    from app.utils.aws.dynamodb import finish_current_book
+
+    with pytest.raises(Exception, match="Failed to finish current book for guild 123456"):
+        finish_current_book(guild_id='123456', current_book={'guild_id': '123456', 'title': 'Dune', 'version': 2})
+    mock_book_table.get_item.assert_not_called()
+
+@patch("app.utils.aws.dynamodb.current_book_table")
+def test_delete_current_book_conflict(mock_book_table, mock_env_vars):
+    error = Exception("conditional check failed")
+    error.response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+    mock_book_table.delete_item.side_effect = error
+    mock_book_table.get_item.return_value = {"Item": {"guild_id": "123456", "version": 3}}
+
+    from app.utils.aws.dynamodb import delete_current_book, LifecycleStatus
+
+    result = delete_current_book(guild_id='123456', expected_version=2)
+
+    assert result.status is LifecycleStatus.CONFLICT
+    assert not result.ok
+
+@patch("app.utils.aws.dynamodb.history_book_table")
+def test_get_reading_history_paginates_with_cursor(mock_history_table, mock_env_vars):
+    mock_history_table.query.return_value = {
+        "Items": [{"title": "Dune", "authors": "Frank Herbert", "finished_at": "2025-01-01T00:00:00+00:00"}],
+        "LastEvaluatedKey": {"guild_id": "123456", "finished_at": "2025-01-01T00:00:00+00:00"},
+    }
+
+    from app.utils.aws.dynamodb import get_reading_history
+
+    books, cursor = get_reading_history(guild_id='123456', limit=1, cursor='2025-06-01T00:00:00+00:00')
+
+    assert books[0]["title"] == "Dune"
+    assert cursor == "2025-01-01T00:00:00+00:00"
+    kwargs = mock_history_table.query.call_args.kwargs
+    assert kwargs["ExclusiveStartKey"] == {"guild_id": "123456", "finished_at": "2025-06-01T00:00:00+00:00"}
+    assert kwargs["Limit"] == 1 and kwargs["ScanIndexForward"] is False
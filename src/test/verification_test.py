@@ -0,0 +1,53 @@
+from nacl.signing import SigningKey
+from utils.verification import InteractionVerifier, Verification
+
+SIGNING_KEY = SigningKey.generate()
+PUBLIC_KEY = SIGNING_KEY.verify_key.encode().hex()
+NOW = 1_750_000_000
+
+
+def sign(raw_body, timestamp=NOW):
+    return SIGNING_KEY.sign(f"{timestamp}".encode() + raw_body).signature.hex(), str(timestamp)
+
+
+def test_verify_accepts_valid_signature_over_raw_bytes():
+    verifier = InteractionVerifier(PUBLIC_KEY)
+    # the exact bytes Discord sent, whitespace and key order included
+    raw_body = b'{"type": 1,  "id":"1"}'
+    signature, timestamp = sign(raw_body)
+
+    assert verifier.verify(raw_body, signature, timestamp, now=NOW) is Verification.OK
+    assert InteractionVerifier(PUBLIC_KEY).verify(b'{"type":1,"id":"1"}', signature, timestamp, now=NOW) is Verification.BAD_SIGNATURE
+
+
+def test_verify_rejects_cheap_cases_before_checking_the_signature():
+    verifier = InteractionVerifier(PUBLIC_KEY)
+    raw_body = b'{"type":1}'
+    signature, timestamp = sign(raw_body)
+
+    assert verifier.verify(raw_body, None, timestamp, now=NOW) is Verification.MISSING_HEADERS
+    assert verifier.verify(raw_body, "abc", timestamp, now=NOW) is Verification.MALFORMED
+    assert verifier.verify(raw_body, signature, "yesterday", now=NOW) is Verification.MALFORMED
+    assert verifier.verify(raw_body, signature, timestamp, now=NOW + 301) is Verification.STALE
+    assert verifier.verify(raw_body, "zz" * 64, timestamp, now=NOW) is Verification.BAD_SIGNATURE
+
+
+def test_verify_rejects_replays_and_bounds_the_seen_set():
+    verifier = InteractionVerifier(PUBLIC_KEY, seen_size=2)
+    requests = [sign(f'{{"id":"{i}"}}'.encode()) + (f'{{"id":"{i}"}}'.encode(),) for i in range(3)]
+
+    for signature, timestamp, raw_body in requests:
+        assert verifier.verify(raw_body, signature, timestamp, now=NOW) is Verification.OK
+    signature, timestamp, raw_body = requests[2]
+    assert verifier.verify(raw_body, signature, timestamp, now=NOW) is Verification.REPLAYED
+    assert verifier.seen() == 2
+
+
+def test_verify_forgets_signatures_once_they_are_stale():
+    verifier = InteractionVerifier(PUBLIC_KEY)
+    old_body, new_body = b'{"id":"old"}', b'{"id":"new"}'
+    verifier.verify(old_body, *sign(old_body, NOW - 200), now=NOW)
+    verifier.verify(new_body, *sign(new_body, NOW + 200), now=NOW + 200)
+
+    # the old signature can't pass the timestamp check any more, so it's dropped
+    assert verifier.seen() == 1